@@ -0,0 +1,77 @@
+from typing import Any, Dict
+
+import yaml
+
+
+def build_descriptor(output_ports: int, columns: int) -> Dict[str, Any]:
+    """
+    Builds a `DATAPRODUCT_DESCRIPTOR` payload (the `dataproduct` document) with
+    a workload and `output_ports` output ports of `columns` columns each.
+    """  # noqa: E501
+    dp_id = "urn:dmb:dp:finance:sales:0"
+    workload_id = f"{dp_id}:wl"
+    components: list = [
+        {
+            "id": workload_id,
+            "name": "Sales Workload",
+            "description": "Workload",
+            "kind": "workload",
+            "version": "0.1.0",
+            "infrastructureTemplateId": "tpl",
+            "dependsOn": [],
+            "connectionType": "HouseKeeping",
+            "tags": [],
+            "specific": {},
+        }
+    ]
+    for i in range(output_ports):
+        components.append(
+            {
+                "id": f"{dp_id}:op{i}",
+                "name": f"Sales Output Port {i}",
+                "description": "Output port",
+                "kind": "outputport",
+                "version": "0.1.0",
+                "infrastructureTemplateId": "tpl",
+                "dependsOn": [workload_id],
+                "outputPortType": "SQL",
+                "dataContract": {
+                    "schema": [
+                        {
+                            "name": f"column_{j}",
+                            "dataType": "VARCHAR" if j % 2 else "INT",
+                            "dataLength": 255 if j % 2 else None,
+                        }
+                        for j in range(columns)
+                    ]
+                },
+                "dataSharingAgreement": {},
+                "semanticLinking": [],
+                "specific": {},
+            }
+        )
+    return {
+        "id": dp_id,
+        "name": "Sales",
+        "description": "Sales data product",
+        "kind": "dataproduct",
+        "domain": "finance",
+        "domainId": "urn:dmb:dmn:finance",
+        "version": "0.1.0",
+        "environment": "development",
+        "dataProductOwner": "user:john",
+        "ownerGroup": "owners",
+        "devGroup": "devs",
+        "tags": [],
+        "specific": {},
+        "components": components,
+    }
+
+
+def build_descriptor_yaml(output_ports: int, columns: int) -> str:
+    """
+    The YAML text of a provisioning descriptor, as sent by Witboost.
+    """
+    return yaml.safe_dump(
+        {"dataproduct": build_descriptor(output_ports, columns)}, sort_keys=False
+    )
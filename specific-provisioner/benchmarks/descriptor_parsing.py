@@ -0,0 +1,110 @@
+"""
+Compares the original descriptor parsing path (pure-Python `yaml.safe_load` on
+the event loop) with `load_descriptor` (libyaml, bounded, run in a thread).
+
+    python -m benchmarks.descriptor_parsing [--ports 20] [--columns 100]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Callable
+
+import yaml
+
+from benchmarks.descriptor_fixture import build_descriptor_yaml
+from src.models.data_product_descriptor import DataProduct
+from src.utility.descriptor_cache import DescriptorCache
+from src.utility.descriptor_loader import (
+    LIBYAML_AVAILABLE,
+    load_descriptor,
+    load_descriptor_async,
+)
+
+
+def original(text: str) -> DataProduct:
+    return DataProduct(**yaml.safe_load(text)["dataproduct"])
+
+
+def engine(text: str) -> DataProduct:
+    return DataProduct(**load_descriptor(text)["dataproduct"])
+
+
+def throughput(parse: Callable[[str], Any], text: str, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        parse(text)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+async def loop_stall(load: Callable[[str], Any], text: str, requests: int) -> float:
+    """
+    Parses `requests` descriptors concurrently and returns the longest time the
+    event loop could not run a ticking coroutine, in seconds.
+    """
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        nonlocal worst
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0)
+            worst = max(worst, time.perf_counter() - before)
+
+    async def parse() -> None:
+        result = load(text)
+        if asyncio.iscoroutine(result):
+            await result
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    await asyncio.gather(*(parse() for _ in range(requests)))
+    done.set()
+    await task
+    return worst
+
+
+async def on_loop(text: str) -> Any:
+    # the original path: parsed inline, blocking the loop
+    return yaml.safe_load(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ports", type=int, default=20)
+    parser.add_argument("--columns", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    text = build_descriptor_yaml(args.ports, args.columns)
+    print(
+        f"descriptor: {args.ports} output ports x {args.columns} columns, "
+        f"{len(text) / 1024:.0f} KB, libyaml={LIBYAML_AVAILABLE}"
+    )
+
+    before = throughput(original, text, args.seconds)
+    after = throughput(engine, text, args.seconds)
+    print(f"yaml.safe_load + DataProduct  {before:8.1f} descriptors/s")
+    print(
+        f"load_descriptor + DataProduct {after:8.1f} descriptors/s  "
+        f"x{after / before:.1f}"
+    )
+    cache: DescriptorCache[DataProduct] = DescriptorCache(1 << 30, 16)
+    cached = throughput(lambda t: cache.get_or_parse(t, engine), text, args.seconds)
+    print(
+        f"DescriptorCache hit           {cached:8.1f} descriptors/s  "
+        f"x{cached / before:.0f}"
+    )
+
+    stall_before = asyncio.run(loop_stall(on_loop, text, 10))
+    stall_after = asyncio.run(loop_stall(load_descriptor_async, text, 10))
+    print(
+        f"event loop stall, 10 concurrent: {stall_before * 1000:.0f} ms on the loop, "
+        f"{stall_after * 1000:.0f} ms with load_descriptor_async"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+End-to-end load test: the adapter served by uvicorn, provisioning against the
+IcePanel stand-in (`benchmarks.fake_icepanel`) with injected latency, at a
+target concurrency.
+
+Every request provisions a data product drawn from generated descriptors (see
+`benchmarks.generator`) and polls its job until it completes, so the measured
+latency covers the whole provisioning. Reports p50/p95/p99 latency,
+throughput, and the IcePanel calls made per request.
+
+    python -m benchmarks.e2e [--concurrency 16] [--requests 200]
+        [--latency 0.05] [--data-products 50] [--objects 5000]
+        [--app-workers 1] [--output e2e.json]
+
+Extra settings of the adapter can be given through the environment, e.g.
+`ICEPANEL_SNAPSHOT_STORE_PATH` with `--app-workers 4`.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List
+
+import httpx
+
+from benchmarks.generator import (
+    DescriptorShape,
+    LandscapeShape,
+    descriptor_yaml,
+    generate_descriptors,
+    generate_export,
+)
+
+LANDSCAPE_ID = "e2e"
+TERMINAL_STATUSES = {"COMPLETED", "FAILED"}
+
+
+@dataclass
+class LoadResult:
+    latencies: List[float] = field(default_factory=list)
+    completed: int = 0
+    failed: int = 0
+    # requests the adapter refused or answered with an error
+    rejected: int = 0
+    duration: float = 0.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _process(command: List[str], env: Dict[str, str], quiet: bool) -> Iterator[None]:
+    output = subprocess.DEVNULL if quiet else None
+    process = subprocess.Popen(command, env=env, stdout=output, stderr=output)
+    try:
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                response = await client.get(url)
+                if response.status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up in {timeout}s")
+            await asyncio.sleep(0.1)
+
+
+async def _provision(
+    client: httpx.AsyncClient, descriptor: str, poll_interval: float
+) -> str:
+    body = {"descriptorKind": "DATAPRODUCT_DESCRIPTOR", "descriptor": descriptor}
+    response = await client.post("/v1/provision", json=body)
+    if response.status_code != 202:
+        return "REJECTED"
+    token = response.text
+    while True:
+        await asyncio.sleep(poll_interval)
+        response = await client.get(f"/v1/provision/{token}/status")
+        if response.status_code != 200:
+            return "REJECTED"
+        status = response.json()["status"]
+        if status in TERMINAL_STATUSES:
+            return status
+
+
+async def run_load(
+    app_url: str,
+    descriptors: List[str],
+    concurrency: int,
+    requests: int,
+    poll_interval: float,
+    seed: int,
+) -> LoadResult:
+    """
+    Sends `requests` provisioning requests, `concurrency` at a time.
+    """
+    rng = random.Random(seed)
+    order = [rng.choice(descriptors) for _ in range(requests)]
+    result = LoadResult()
+    limits = httpx.Limits(max_connections=concurrency * 2)
+    async with httpx.AsyncClient(
+        base_url=app_url, limits=limits, timeout=300
+    ) as client:
+
+        async def worker() -> None:
+            while order:
+                descriptor = order.pop()
+                start = time.perf_counter()
+                status = await _provision(client, descriptor, poll_interval)
+                if status == "REJECTED":
+                    result.rejected += 1
+                    continue
+                result.latencies.append(time.perf_counter() - start)
+                if status == "COMPLETED":
+                    result.completed += 1
+                else:
+                    result.failed += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.duration = time.perf_counter() - start
+    return result
+
+
+def summarize(
+    result: LoadResult, calls: Dict[str, Any], concurrency: int
+) -> Dict[str, Any]:
+    latencies = sorted(result.latencies)
+    cuts = latencies * 99
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100)
+    answered = sum(calls["calls"].values())
+    finished = max(result.completed + result.failed, 1)
+    return {
+        "concurrency": concurrency,
+        "requests": result.completed + result.failed + result.rejected,
+        "completed": result.completed,
+        "failed": result.failed,
+        "rejected": result.rejected,
+        "duration_seconds": result.duration,
+        "throughput_per_second": finished / result.duration,
+        "latency_seconds": {
+            "p50": cuts[49] if cuts else None,
+            "p95": cuts[94] if cuts else None,
+            "p99": cuts[98] if cuts else None,
+            "max": latencies[-1] if latencies else None,
+        },
+        "icepanel_calls_per_request": answered / finished,
+        "icepanel_calls": calls["calls"],
+        "icepanel_injected_failures": calls["failures"],
+    }
+
+
+async def benchmark(args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    documents = generate_descriptors(
+        args.seed,
+        args.data_products,
+        DescriptorShape(output_ports=args.output_ports, columns=args.columns),
+    )
+    generated = generate_export(
+        args.seed,
+        documents,
+        LandscapeShape(
+            objects=args.objects,
+            connections=args.objects,
+            provisioned=args.provisioned,
+        ),
+    )
+    export_path = os.path.join(workdir, "export.json")
+    with open(export_path, "w") as file:
+        json.dump(generated.export, file)
+    descriptors = [descriptor_yaml(document) for document in documents]
+
+    fake_port, app_port = _free_port(), _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+    env = {
+        **os.environ,
+        "ICEPANEL_BASE_URL": f"{fake_url}/v1",
+        "IcePanelLandscapeId": LANDSCAPE_ID,
+        "API_KEY": "e2e",
+        "JOB_STORE_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "FINGERPRINT_STORE_PATH": os.path.join(workdir, "fingerprints.sqlite3"),
+    }
+    fake_command = [
+        sys.executable,
+        "-m",
+        "benchmarks.fake_icepanel",
+        f"--port={fake_port}",
+        f"--landscape={LANDSCAPE_ID}",
+        f"--export={export_path}",
+        f"--latency={args.latency}",
+        f"--jitter={args.jitter}",
+        f"--throttle-rate={args.throttle_rate}",
+        f"--error-rate={args.error_rate}",
+        f"--seed={args.seed}",
+    ]
+    app_command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "src.main:app",
+        f"--port={app_port}",
+        f"--workers={args.app_workers}",
+        "--log-level=warning",
+        "--no-access-log",
+    ]
+    quiet = not args.verbose
+    with _process(fake_command, env, quiet), _process(app_command, env, quiet):
+        await _wait_ready(f"{fake_url}/_fake/calls")
+        await _wait_ready(f"{app_url}/v1/admin/icepanel/stats")
+        if args.warmup:
+            await run_load(
+                app_url, descriptors, args.concurrency, args.warmup, 0.01, args.seed
+            )
+        async with httpx.AsyncClient(base_url=fake_url) as fake:
+            await fake.post("/_fake/reset")
+            result = await run_load(
+                app_url,
+                descriptors,
+                args.concurrency,
+                args.requests,
+                args.poll_interval,
+                args.seed + 1,
+            )
+            calls = (await fake.get("/_fake/calls")).json()
+    return summarize(result, calls, args.concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--poll-interval", type=float, default=0.01)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--data-products", type=int, default=50)
+    parser.add_argument("--output-ports", type=int, default=3)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--objects", type=int, default=5_000)
+    parser.add_argument("--provisioned", type=float, default=0.5)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="where to save the report as JSON")
+    parser.add_argument(
+        "--verbose", action="store_true", help="show the output of the servers"
+    )
+    args = parser.parse_args()
+    # the calls of the load generator itself are not worth a log line each
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = asyncio.run(benchmark(args, workdir))
+
+    latency = report["latency_seconds"]
+    print(
+        f"{report['requests']} requests at concurrency {report['concurrency']}: "
+        f"{report['completed']} completed, {report['failed']} failed, "
+        f"{report['rejected']} rejected in {report['duration_seconds']:.1f}s"
+    )
+    print(f"throughput   {report['throughput_per_second']:8.1f} requests/s")
+    for name in ["p50", "p95", "p99", "max"]:
+        if latency[name] is not None:
+            print(f"latency {name:<4} {latency[name] * 1000:8.1f} ms")
+    print(f"IcePanel calls per request {report['icepanel_calls_per_request']:.2f}")
+    for call, count in sorted(report["icepanel_calls"].items()):
+        print(f"  {call:<20} {count}")
+    for status, count in sorted(report["icepanel_injected_failures"].items()):
+        print(f"  injected {status:<11} {count}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares the ways of decoding an IcePanel landscape export into `IcePanelData`.
+
+    python -m benchmarks.export_decoding [--objects 10000] [--rounds 3]
+"""
+import argparse
+import gc
+import json
+import time
+from typing import Callable
+
+import yaml
+
+from benchmarks.export_fixture import build_export
+from src.icepanel.export_reader import ExportReader
+from src.models.icepanel import IcePanelData
+from src.utility.parsing_pydantic_models import parse_yaml_with_model
+
+CHUNK_SIZE = 64 * 1024
+
+
+def yaml_safe_load(body: bytes) -> IcePanelData:
+    # the original path: pure-Python YAML scanner, then the full pydantic tree
+    return parse_yaml_with_model(yaml.safe_load(body), IcePanelData)
+
+
+def stdlib_json(body: bytes) -> IcePanelData:
+    return IcePanelData(**json.loads(body))
+
+
+def streamed(body: bytes) -> IcePanelData:
+    reader = ExportReader()
+    for i in range(0, len(body), CHUNK_SIZE):
+        reader.feed(body[i : i + CHUNK_SIZE])
+    return reader.close()
+
+
+def measure(decode: Callable[[bytes], IcePanelData], body: bytes, rounds: int) -> float:
+    # like timeit, keep the garbage collector out of the timings
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            decode(body)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objects", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    body = json.dumps(build_export(args.objects)).encode()
+    print(f"export: {args.objects} objects, {len(body) / 1e6:.1f} MB")
+
+    baseline = None
+    for name, decode, rounds in [
+        # a single round: the YAML scanner takes tens of seconds on 10k objects
+        ("yaml.safe_load", yaml_safe_load, 1),
+        ("json (stdlib)", stdlib_json, args.rounds),
+        ("streamed (ExportReader)", streamed, args.rounds),
+    ]:
+        seconds = measure(decode, body, rounds)
+        baseline = baseline or seconds
+        print(f"{name:<26} {seconds * 1000:9.1f} ms  x{baseline / seconds:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
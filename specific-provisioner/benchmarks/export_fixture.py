@@ -0,0 +1,84 @@
+from typing import Any, Dict
+
+
+def build_export(objects: int, connections_per_object: int = 1) -> Dict[str, Any]:
+    """
+    Builds a synthetic IcePanel landscape export with `objects` model objects
+    (a root, one system every 10 objects and apps below them), a connection
+    from every app to its system, and a flow per system, so that the document
+    has the shape and the noise of a real export.
+    """  # noqa: E501
+    model_objects: Dict[str, Any] = {
+        "root": _object("root", "Root", None, [], "root"),
+    }
+    model_connections: Dict[str, Any] = {}
+    flows: Dict[str, Any] = {}
+    system_id = "root"
+    for i in range(objects - 1):
+        if i % 10 == 0:
+            system_id = f"sys{i}"
+            model_objects[system_id] = _object(
+                system_id, f"System {i}", "root", ["root"], "system"
+            )
+            flows[f"flow{i}"] = {
+                "id": f"flow{i}",
+                "name": f"Flow {i}",
+                "steps": {
+                    f"step{j}": {"id": f"step{j}", "description": "x" * 64}
+                    for j in range(5)
+                },
+            }
+            continue
+        obj_id = f"obj{i}"
+        model_objects[obj_id] = _object(
+            obj_id, f"App {i}", system_id, ["root", system_id], "app"
+        )
+        for j in range(connections_per_object):
+            conn_id = f"conn{i}-{j}"
+            model_connections[conn_id] = {
+                "description": "",
+                "direction": "outgoing",
+                "id": conn_id,
+                "name": "dependsOn",
+                "originId": obj_id,
+                "status": "live",
+                "tagIds": [],
+                "targetId": system_id,
+                "technologies": {},
+                "createdAt": "2023-01-01T00:00:00.000Z",
+            }
+    return {
+        "domains": {"d1": {"id": "d1", "name": "Default domain"}},
+        "flows": flows,
+        "modelConnections": model_connections,
+        "modelObjects": model_objects,
+        "tagGroups": {},
+        "tags": {},
+        "teams": {},
+    }
+
+
+def _object(
+    obj_id: str, name: str, parent_id: str | None, parent_ids: list, type: str
+) -> Dict[str, Any]:
+    return {
+        "caption": f"Caption of {name}",
+        "description": f"Description of {name}",
+        "domainId": "d1",
+        "external": False,
+        "icon": None,
+        "id": obj_id,
+        "links": {},
+        "name": name,
+        "parentId": parent_id,
+        "parentIds": parent_ids,
+        "status": "live",
+        "tagIds": [],
+        "teamIds": [],
+        "technologies": {},
+        "type": type,
+        # fields of a real export the adapter does not use
+        "createdAt": "2023-01-01T00:00:00.000Z",
+        "diagrams": {},
+        "labels": {"owner": "data-platform"},
+    }
@@ -0,0 +1,305 @@
+"""
+In-memory stand-in for the IcePanel REST API, for tests and load tests that
+must not reach the SaaS.
+
+It serves the endpoints the adapter calls (landscape export, creation, update
+and deletion of model objects and connections) and can add latency and inject
+429 / 5xx responses. Use it in-process by handing `httpx.ASGITransport(app=
+fake.app)` to `IcePanelClient`, or on localhost with
+
+    python -m benchmarks.fake_icepanel [--port 5003] [--objects 1000]
+        [--export export.json] [--latency 0.05] [--throttle-rate 0.01]
+        [--error-rate 0.01]
+
+and `ICEPANEL_BASE_URL=http://localhost:5003/v1` in the environment of the
+adapter. `GET /_fake/calls` returns the calls answered so far.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from benchmarks.export_fixture import build_export
+from src.utility import json_codec
+
+ROOT = "/v1/landscapes/{landscape_id}/versions/{version_id}"
+# counters of the stand-in, read by load tests; never degraded
+CONTROL_ROOT = "/_fake"
+
+# fields IcePanel fills in when a creation leaves them out
+OBJECT_DEFAULTS: Dict[str, Any] = {
+    "caption": "",
+    "description": "",
+    "domainId": "d1",
+    "external": False,
+    "icon": None,
+    "links": {},
+    "parentId": None,
+    "parentIds": [],
+    "status": "live",
+    "tagIds": [],
+    "teamIds": [],
+    "technologies": {},
+    "type": "app",
+}
+CONNECTION_DEFAULTS: Dict[str, Any] = {
+    "description": "",
+    "direction": "outgoing",
+    "status": "live",
+    "tagIds": [],
+    "technologies": {},
+}
+# section of the export written by each model endpoint, the key its responses
+# wrap the written item in, and the defaults of a created item
+SECTIONS = {
+    "objects": ("modelObjects", "modelObject", OBJECT_DEFAULTS),
+    "connections": ("modelConnections", "modelConnection", CONNECTION_DEFAULTS),
+}
+
+
+@dataclass
+class Faults:
+    """
+    Degradations applied to every call.
+
+    Attributes:
+        latency (float): Seconds every call waits before being answered.
+        jitter (float): Extra seconds drawn uniformly in [0, jitter] per call.
+        throttle_rate (float): Share of the calls answered 429 Too Many Requests.
+        error_rate (float): Share of the calls answered `error_status`.
+        error_status (int): Status of the injected server errors.
+        retry_after (float | None): `Retry-After` seconds sent with a 429.
+    """  # noqa: E501
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    retry_after: float | None = 1.0
+
+
+def _section(path: str) -> str:
+    # "export", "objects" or "connections", from .../versions/<id>/<route>
+    parts = path.strip("/").split("/")
+    return parts[6] if len(parts) > 6 and parts[5] == "model" else parts[-2]
+
+
+def empty_landscape() -> Dict[str, Any]:
+    """
+    An export holding only what the adapter needs to provision: a root object
+    and the default domain.
+    """
+    return build_export(objects=1)
+
+
+class FakeIcePanel:
+    """
+    In-memory IcePanel: each landscape is held as its export document and
+    updated by the model endpoints, so a later export returns what was
+    written. Every write bumps the version of the landscape, which is the ETag
+    of its export.
+
+    Args:
+        landscapes (Dict[str, Dict[str, Any]], optional): Initial export of each
+            landscape, e.g. from `empty_landscape` or `build_export`; unknown
+            landscapes answer 404.
+        faults (Faults, optional): Degradations applied to every call; can be
+            changed at any time through `faults`.
+        seed (int, optional): Seed of the draws deciding the injected failures.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        landscapes: Dict[str, Dict[str, Any]] | None = None,
+        faults: Faults | None = None,
+        seed: int | None = None,
+    ) -> None:
+        self.landscapes = landscapes or {}
+        self.faults = faults or Faults()
+        self.versions: Counter[str] = Counter()
+        # answered calls by "METHOD section", e.g. "POST objects", and injected
+        # failures by status
+        self.calls: Counter[str] = Counter()
+        self.failures: Counter[int] = Counter()
+        self._random = random.Random(seed)
+        self._scripted: Deque[int] = deque()
+        self._ids = itertools.count(1)
+        self.app = self._build_app()
+
+    def fail_next(self, *statuses: int) -> None:
+        """
+        Answers the next calls with the given statuses, one per call, before any
+        drawn failure.
+        """  # noqa: E501
+        self._scripted.extend(statuses)
+
+    def _injected_failure(self) -> Response | None:
+        status = self._scripted.popleft() if self._scripted else None
+        if status is None:
+            draw = self._random.random()
+            if draw < self.faults.throttle_rate:
+                status = 429
+            elif draw < self.faults.throttle_rate + self.faults.error_rate:
+                status = self.faults.error_status
+        if status is None:
+            return None
+        self.failures[status] += 1
+        headers = {}
+        if status == 429 and self.faults.retry_after is not None:
+            headers["Retry-After"] = f"{self.faults.retry_after:g}"
+        return JSONResponse({"message": "injected failure"}, status, headers)
+
+    def _etag(self, landscape_id: str) -> str:
+        return f'"{landscape_id}-{self.versions[landscape_id]}"'
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake IcePanel API")
+
+        @app.middleware("http")
+        async def degrade(request: Request, call_next):
+            if request.url.path.startswith(CONTROL_ROOT):
+                return await call_next(request)
+            delay = self.faults.latency + self._random.uniform(0, self.faults.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if not request.headers.get("Authorization", "").startswith("ApiKey "):
+                return JSONResponse({"message": "missing API key"}, 401)
+            failure = self._injected_failure()
+            if failure is not None:
+                return failure
+            self.calls[f"{request.method} {_section(request.url.path)}"] += 1
+            return await call_next(request)
+
+        @app.get(CONTROL_ROOT + "/calls")
+        async def calls():
+            # control endpoint of load tests, not part of the IcePanel API
+            return {"calls": self.calls, "failures": self.failures}
+
+        @app.post(CONTROL_ROOT + "/reset")
+        async def reset():
+            self.calls.clear()
+            self.failures.clear()
+            return {}
+
+        @app.get(ROOT + "/export/json")
+        async def export(landscape_id: str, version_id: str, request: Request):
+            landscape = self.landscapes.get(landscape_id)
+            if landscape is None:
+                return JSONResponse({"message": "landscape not found"}, 404)
+            etag = self._etag(landscape_id)
+            if request.headers.get("If-None-Match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            return Response(
+                json_codec.dumps(landscape),
+                media_type=json_codec.JSON_CONTENT_TYPE,
+                headers={"ETag": etag},
+            )
+
+        @app.post(ROOT + "/model/{section}")
+        async def create(landscape_id: str, version_id: str, section: str, body: dict):
+            if section not in SECTIONS or landscape_id not in self.landscapes:
+                return JSONResponse({"message": "not found"}, 404)
+            items, key, defaults = SECTIONS[section]
+            item = {**defaults, **body, "id": f"{section[:-1]}-{next(self._ids)}"}
+            self.landscapes[landscape_id][items][item["id"]] = item
+            self.versions[landscape_id] += 1
+            return JSONResponse({key: item}, 201)
+
+        @app.patch(ROOT + "/model/{section}/{item_id}")
+        async def update(
+            landscape_id: str, version_id: str, section: str, item_id: str, body: dict
+        ):
+            if section not in SECTIONS or landscape_id not in self.landscapes:
+                return JSONResponse({"message": "not found"}, 404)
+            items, key, _ = SECTIONS[section]
+            existing = self.landscapes[landscape_id][items].get(item_id)
+            if existing is None:
+                return JSONResponse({"message": f"{key} not found"}, 404)
+            existing.update({**body, "id": item_id})
+            self.versions[landscape_id] += 1
+            return {key: existing}
+
+        @app.delete(ROOT + "/model/{section}/{item_id}")
+        async def delete(
+            landscape_id: str, version_id: str, section: str, item_id: str
+        ):
+            if section not in SECTIONS or landscape_id not in self.landscapes:
+                return JSONResponse({"message": "not found"}, 404)
+            landscape = self.landscapes[landscape_id]
+            items, key, _ = SECTIONS[section]
+            if item_id not in landscape[items]:
+                return JSONResponse({"message": f"{key} not found"}, 404)
+            if section == "objects":
+                self._delete_object(landscape, item_id)
+            else:
+                del landscape[items][item_id]
+            self.versions[landscape_id] += 1
+            return {}
+
+        return app
+
+    def _delete_object(self, landscape: Dict[str, Any], object_id: str) -> None:
+        # as IcePanel does, the children and connections of an object go with it
+        objects = landscape["modelObjects"]
+        doomed = {object_id}
+        pending = [object_id]
+        while pending:
+            parent = pending.pop()
+            for obj in objects.values():
+                if obj.get("parentId") == parent and obj["id"] not in doomed:
+                    doomed.add(obj["id"])
+                    pending.append(obj["id"])
+        for doomed_id in doomed:
+            del objects[doomed_id]
+        landscape["modelConnections"] = {
+            conn_id: conn
+            for conn_id, conn in landscape["modelConnections"].items()
+            if conn["originId"] not in doomed and conn["targetId"] not in doomed
+        }
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5003)
+    parser.add_argument("--landscape", default="landscape")
+    parser.add_argument("--objects", type=int, default=1)
+    parser.add_argument("--export", help="initial export JSON, instead of --objects")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.export:
+        with open(args.export, "rb") as file:
+            export = json_codec.loads(file.read())
+    else:
+        export = build_export(objects=args.objects)
+    fake = FakeIcePanel(
+        {args.landscape: export},
+        Faults(
+            latency=args.latency,
+            jitter=args.jitter,
+            throttle_rate=args.throttle_rate,
+            error_rate=args.error_rate,
+        ),
+        seed=args.seed,
+    )
+    uvicorn.run(fake.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
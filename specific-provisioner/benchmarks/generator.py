@@ -0,0 +1,435 @@
+"""
+Deterministic generator of realistic inputs for scale tests: data product
+descriptors and a matching IcePanel landscape export.
+
+The same seed and options always give the same output, so benchmark runs are
+reproducible.
+
+    python -m benchmarks.generator --seed 1 --data-products 20 --output-ports 5
+        --columns 50 --depends-on-density 0.3 --objects 10000
+        --connections 20000 --domains 5 --out generated
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import yaml
+
+from src.icepanel.landscape_index import LandscapeIndex
+from src.icepanel.planner import DEFAULT_DOMAIN_NAME, plan_data_product
+from src.models.data_product_descriptor import DataProduct
+from src.models.icepanel import IcePanelData
+
+# column types, with the extra fields each one takes
+COLUMN_TYPES: Dict[str, Dict[str, int]] = {
+    "INT": {},
+    "BIGINT": {},
+    "DOUBLE": {},
+    "BOOLEAN": {},
+    "DATE": {},
+    "TIMESTAMP": {},
+    "VARCHAR": {"dataLength": 255},
+    "CHAR": {"dataLength": 3},
+    "DECIMAL": {"precision": 18, "scale": 4},
+}
+CONNECTION_NAMES = ["dependsOn", "readsFrom", "writesTo", "calls"]
+# noise fields of a real export, which the adapter does not use
+EXPORT_NOISE = {
+    "createdAt": "2023-01-01T00:00:00.000Z",
+    "createdBy": "user",
+    "diagrams": {},
+    "labels": {"owner": "data-platform"},
+}
+
+
+@dataclass(frozen=True)
+class DescriptorShape:
+    """
+    Shape of the generated data products.
+
+    Attributes:
+        output_ports (int): Output ports per data product.
+        workloads (int): Workloads per data product; every other one is a
+            `DataPipeline`, the only kind allowed to `readsFrom`.
+        storage_areas (int): Storage areas per data product.
+        columns (int): Mean width of the output port schemas; each width is drawn
+            in [columns / 2, columns * 3 / 2].
+        depends_on_density (float): Probability of every allowed `dependsOn`
+            edge: workloads on storage areas and earlier workloads, output ports
+            on workloads and storage areas.
+        reads_from_density (float): Probability of a pipeline reading from each
+            output port of the other data products, and from each of a few
+            external systems.
+    """  # noqa: E501
+
+    output_ports: int = 3
+    workloads: int = 2
+    storage_areas: int = 1
+    columns: int = 20
+    depends_on_density: float = 0.3
+    reads_from_density: float = 0.1
+
+
+@dataclass(frozen=True)
+class LandscapeShape:
+    """
+    Shape of the generated landscape, on top of what the provisioned data
+    products draw.
+
+    Attributes:
+        objects (int): Model objects in total, root and data products included;
+            the difference is filled with unrelated systems and apps.
+        connections (int): Connections in total, data products included.
+        domains (int): Domains; the first one is the adapter's default domain.
+        provisioned (float): Share of the data products already drawn in the
+            landscape, exactly as the adapter would draw them.
+    """  # noqa: E501
+
+    objects: int = 1_000
+    connections: int = 1_000
+    domains: int = 1
+    provisioned: float = 1.0
+
+
+@dataclass
+class GeneratedInputs:
+    descriptors: List[Dict[str, Any]]
+    export: Dict[str, Any]
+    # ids of the data products drawn in the export
+    provisioned: List[str] = field(default_factory=list)
+
+
+def _columns(rng: random.Random, mean: int) -> List[Dict[str, Any]]:
+    width = rng.randint(max(mean // 2, 1), max(mean * 3 // 2, 1))
+    columns = []
+    for i in range(width):
+        data_type = rng.choice(list(COLUMN_TYPES))
+        columns.append(
+            {"name": f"column_{i}", "dataType": data_type, **COLUMN_TYPES[data_type]}
+        )
+    return columns
+
+
+def generate_descriptor(
+    rng: random.Random,
+    index: int,
+    shape: DescriptorShape,
+    external_ports: List[str] | None = None,
+) -> Dict[str, Any]:
+    """
+    Generates the `dataproduct` document of a descriptor.
+
+    Args:
+        rng (random.Random): Source of every random choice.
+        index (int): Number of the data product, making its ids and names unique.
+        shape (DescriptorShape): How many components, edges and columns.
+        external_ports (List[str], optional): Output port names of the other
+            data products, which pipelines may read from as `DP_UK:<name>`.
+
+    Returns:
+        Dict[str, Any]: A document `DataProduct` validates.
+    """  # noqa: E501
+    domain = f"domain{index % 7}"
+    dp_id = f"urn:dmb:dp:{domain}:dp{index}:0"
+    storage_ids = [f"{dp_id}:storage{i}" for i in range(shape.storage_areas)]
+    workload_ids = [f"{dp_id}:workload{i}" for i in range(shape.workloads)]
+    components: List[Dict[str, Any]] = []
+
+    def depends_on(candidates: List[str]) -> List[str]:
+        return [c for c in candidates if rng.random() < shape.depends_on_density]
+
+    for i, storage_id in enumerate(storage_ids):
+        components.append(
+            {
+                "id": storage_id,
+                "name": f"DP {index} Storage {i}",
+                "description": f"Storage area {i} of data product {index}",
+                "kind": "storage",
+                "infrastructureTemplateId": "urn:dmb:itm:storage",
+                "dependsOn": [],
+                "storageType": "Files",
+                "tags": [],
+                "specific": {"bucket": f"bucket-{index}-{i}"},
+            }
+        )
+    for i, workload_id in enumerate(workload_ids):
+        pipeline = i % 2 == 1
+        reads_from = []
+        if pipeline:
+            sources = [f"DP_UK:{port}" for port in external_ports or []]
+            sources += [f"urn:dmb:ex:system{j}" for j in range(5)]
+            reads_from = [s for s in sources if rng.random() < shape.reads_from_density]
+        components.append(
+            {
+                "id": workload_id,
+                "name": f"DP {index} Workload {i}",
+                "description": f"Workload {i} of data product {index}",
+                "kind": "workload",
+                "version": "0.1.0",
+                "infrastructureTemplateId": "urn:dmb:itm:workload",
+                "dependsOn": depends_on(storage_ids + workload_ids[:i]),
+                "connectionType": "DataPipeline" if pipeline else "HouseKeeping",
+                "readsFrom": reads_from,
+                "tags": [],
+                "specific": {"schedule": f"{rng.randint(0, 59)} * * * *"},
+            }
+        )
+    for i in range(shape.output_ports):
+        components.append(
+            {
+                "id": f"{dp_id}:outputport{i}",
+                "name": f"DP {index} Output Port {i}",
+                "description": f"Output port {i} of data product {index}",
+                "kind": "outputport",
+                "version": "0.1.0",
+                "infrastructureTemplateId": "urn:dmb:itm:outputport",
+                "dependsOn": depends_on(workload_ids + storage_ids),
+                "outputPortType": "SQL",
+                "dataContract": {"schema": _columns(rng, shape.columns)},
+                "dataSharingAgreement": {"purpose": "analytics"},
+                "semanticLinking": [],
+                "specific": {},
+            }
+        )
+    return {
+        "id": dp_id,
+        "name": f"Data Product {index}",
+        "description": f"Generated data product {index}",
+        "kind": "dataproduct",
+        "domain": domain,
+        "domainId": f"urn:dmb:dmn:{domain}",
+        "version": "0.1.0",
+        "environment": "development",
+        "dataProductOwner": f"user:owner{index}",
+        "ownerGroup": "owners",
+        "devGroup": "devs",
+        "tags": [],
+        "specific": {},
+        "components": components,
+    }
+
+
+def generate_descriptors(
+    seed: int, count: int, shape: DescriptorShape = DescriptorShape()
+) -> List[Dict[str, Any]]:
+    """
+    Generates `count` data product documents, deterministically from `seed`.
+    """
+    rng = random.Random(seed)
+    ports = [
+        [f"DP {i} Output Port {j}" for j in range(shape.output_ports)]
+        for i in range(count)
+    ]
+    return [
+        generate_descriptor(
+            rng, i, shape, [p for k, own in enumerate(ports) if k != i for p in own]
+        )
+        for i in range(count)
+    ]
+
+
+def descriptor_yaml(document: Dict[str, Any]) -> str:
+    """
+    The YAML text of a provisioning descriptor, as sent by Witboost.
+    """
+    return yaml.safe_dump({"dataproduct": document}, sort_keys=False)
+
+
+def _object(obj_id: str, name: str, parent_id: str | None, domain_id: str, type: str):
+    return {
+        "caption": "",
+        "description": f"Description of {name}",
+        "domainId": domain_id,
+        "external": False,
+        "icon": None,
+        "id": obj_id,
+        "links": {},
+        "name": name,
+        "parentId": parent_id,
+        "parentIds": [] if parent_id is None else [parent_id],
+        "status": "live",
+        "tagIds": [],
+        "teamIds": [],
+        "technologies": {},
+        "type": type,
+        **EXPORT_NOISE,
+    }
+
+
+def _connection(conn_id: str, name: str, origin_id: str, target_id: str):
+    return {
+        "description": "",
+        "direction": "outgoing",
+        "id": conn_id,
+        "name": name,
+        "originId": origin_id,
+        "status": "live",
+        "tagIds": [],
+        "targetId": target_id,
+        "technologies": {},
+        **EXPORT_NOISE,
+    }
+
+
+def _draw(
+    export: Dict[str, Any],
+    base: LandscapeIndex,
+    document: Dict[str, Any],
+    number: int,
+) -> None:
+    # draws a data product as the adapter would, planning it against the bare
+    # landscape; the ids IcePanel would assign derive from the data product
+    # number
+    plan = plan_data_product(DataProduct(**document), base)
+    system = plan.system.desired.model_dump()
+    ids = {plan.system.key: f"dp{number}"}
+    export["modelObjects"][ids[plan.system.key]] = {
+        **system,
+        **EXPORT_NOISE,
+        "id": ids[plan.system.key],
+    }
+    for i, operation in enumerate(plan.components):
+        ids[operation.key] = f"dp{number}-c{i}"
+        export["modelObjects"][ids[operation.key]] = {
+            **operation.desired.model_dump(),
+            **EXPORT_NOISE,
+            "id": ids[operation.key],
+            "parentId": ids[plan.system.key],
+        }
+    for i, operation in enumerate(plan.connections):
+        conn_id = f"dp{number}-conn{i}"
+        export["modelConnections"][conn_id] = {
+            **operation.desired.model_dump(),
+            **EXPORT_NOISE,
+            "id": conn_id,
+            "originId": ids[operation.origin],
+            "targetId": ids[operation.target],
+        }
+
+
+def generate_export(
+    seed: int,
+    descriptors: List[Dict[str, Any]],
+    shape: LandscapeShape = LandscapeShape(),
+) -> GeneratedInputs:
+    """
+    Generates a landscape export matching the given data product documents:
+    the `provisioned` share of them is drawn exactly as the adapter would, and
+    unrelated systems, apps and connections fill the landscape up to the sizes
+    of `shape`.
+
+    Returns:
+        GeneratedInputs: The descriptors, the export and the ids of the data
+            products drawn in it.
+    """  # noqa: E501
+    rng = random.Random(seed)
+    domains = {"d0": {"id": "d0", "name": DEFAULT_DOMAIN_NAME}}
+    for i in range(1, shape.domains):
+        domains[f"d{i}"] = {"id": f"d{i}", "name": f"Domain {i}"}
+    export: Dict[str, Any] = {
+        "domains": domains,
+        "flows": {},
+        "modelConnections": {},
+        "modelObjects": {"root": _object("root", "Root", None, "d0", "root")},
+        "tagGroups": {},
+        "tags": {},
+        "teams": {},
+    }
+
+    base = LandscapeIndex(IcePanelData.model_validate(export))
+    provisioned = []
+    for number, document in enumerate(descriptors):
+        if rng.random() < shape.provisioned:
+            _draw(export, base, document, number)
+            provisioned.append(document["id"])
+
+    objects = export["modelObjects"]
+    apps: List[str] = []
+    system_id = "root"
+    for i in range(shape.objects - len(objects)):
+        domain_id = f"d{rng.randrange(shape.domains)}"
+        if i % 10 == 0:
+            system_id = f"sys{i}"
+            objects[system_id] = _object(
+                system_id, f"System {i}", "root", domain_id, "system"
+            )
+            continue
+        obj_id = f"obj{i}"
+        kind = "store" if rng.random() < 0.2 else "app"
+        objects[obj_id] = _object(obj_id, f"App {i}", system_id, domain_id, kind)
+        apps.append(obj_id)
+
+    connections = export["modelConnections"]
+    for i in range(shape.connections - len(connections)):
+        if len(apps) < 2:
+            break
+        origin, target = rng.sample(apps, 2)
+        conn_id = f"conn{i}"
+        connections[conn_id] = _connection(
+            conn_id, rng.choice(CONNECTION_NAMES), origin, target
+        )
+    return GeneratedInputs(descriptors, export, provisioned)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-products", type=int, default=10)
+    parser.add_argument("--output-ports", type=int, default=3)
+    parser.add_argument("--workloads", type=int, default=2)
+    parser.add_argument("--storage-areas", type=int, default=1)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--depends-on-density", type=float, default=0.3)
+    parser.add_argument("--reads-from-density", type=float, default=0.1)
+    parser.add_argument("--objects", type=int, default=1_000)
+    parser.add_argument("--connections", type=int, default=1_000)
+    parser.add_argument("--domains", type=int, default=1)
+    parser.add_argument("--provisioned", type=float, default=1.0)
+    parser.add_argument("--out", default="generated")
+    args = parser.parse_args()
+
+    descriptors = generate_descriptors(
+        args.seed,
+        args.data_products,
+        DescriptorShape(
+            output_ports=args.output_ports,
+            workloads=args.workloads,
+            storage_areas=args.storage_areas,
+            columns=args.columns,
+            depends_on_density=args.depends_on_density,
+            reads_from_density=args.reads_from_density,
+        ),
+    )
+    generated = generate_export(
+        args.seed,
+        descriptors,
+        LandscapeShape(
+            objects=args.objects,
+            connections=args.connections,
+            domains=args.domains,
+            provisioned=args.provisioned,
+        ),
+    )
+
+    os.makedirs(os.path.join(args.out, "descriptors"), exist_ok=True)
+    for i, document in enumerate(descriptors):
+        path = os.path.join(args.out, "descriptors", f"dp{i:04d}.yaml")
+        with open(path, "w") as file:
+            file.write(descriptor_yaml(document))
+    with open(os.path.join(args.out, "export.json"), "w") as file:
+        json.dump(generated.export, file)
+    print(
+        f"{len(descriptors)} descriptors and an export of "
+        f"{len(generated.export['modelObjects'])} objects, "
+        f"{len(generated.export['modelConnections'])} connections "
+        f"({len(generated.provisioned)} data products drawn) in {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
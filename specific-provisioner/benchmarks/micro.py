@@ -0,0 +1,283 @@
+"""
+Micro-benchmarks of the hot paths of the adapter, saved as JSON so that runs
+can be compared:
+
+- `parse_yaml_with_model` on small, medium and huge descriptors
+- `DataProduct` validation, `OpenMetadataColumn` schemas included
+- every `toIcePanel()` implementation
+- `IcePanelData` parsing of exports of 1k, 10k and 100k objects
+- `check_response` rendering, for each way of finding the route responses
+- the cost of recording a metric on the request path
+
+    python -m benchmarks.micro [--output micro.json] [--compare baseline.json]
+        [--filter toIcePanel] [--repeat 5]
+"""
+import argparse
+import gc
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+import yaml
+from prometheus_client import CollectorRegistry, Histogram
+
+from benchmarks.descriptor_fixture import build_descriptor
+from benchmarks.export_decoding import streamed
+from benchmarks.export_fixture import build_export
+from src.check_return_type import check_response
+from src.main import app
+from src.models.api_models import ProvisioningStatus, Status1, SystemErr
+from src.models.data_product_descriptor import (
+    DataProduct,
+    Observability,
+    OpenMetadataColumn,
+    OutputPort,
+    StorageArea,
+    Workload,
+)
+from src.utility.parsing_pydantic_models import parse_yaml_with_model
+from src.utility.route_responses import current_responses
+
+# output ports x columns of the descriptors: the huge one stays below the
+# default DESCRIPTOR_MAX_BYTES
+DESCRIPTOR_SIZES = {"small": (1, 10), "medium": (20, 100), "huge": (100, 250)}
+TO_ICEPANEL_KINDS = [
+    "DataProduct",
+    "OutputPort",
+    "Workload",
+    "StorageArea",
+    "Observability",
+]
+EXPORT_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# a case builds its inputs, then returns the call to time
+Case = Callable[[], Callable[[], Any]]
+
+
+def _descriptor_yaml(size: str) -> str:
+    return yaml.safe_dump(build_descriptor(*DESCRIPTOR_SIZES[size]), sort_keys=False)
+
+
+def parse_yaml_case(size: str) -> Case:
+    def setup() -> Callable[[], Any]:
+        text = _descriptor_yaml(size)
+        return lambda: parse_yaml_with_model(text, DataProduct)
+
+    return setup
+
+
+def data_product_case(size: str) -> Case:
+    def setup() -> Callable[[], Any]:
+        document = build_descriptor(*DESCRIPTOR_SIZES[size])
+        return lambda: DataProduct(**document)
+
+    return setup
+
+
+def columns_case() -> Callable[[], Any]:
+    columns = build_descriptor(1, 1000)["components"][1]["dataContract"]["schema"]
+    return lambda: [OpenMetadataColumn(**column) for column in columns]
+
+
+def _components() -> Dict[str, Any]:
+    document = build_descriptor(1, 10)
+    workload, output_port = document["components"]
+    common = {
+        "description": "x",
+        "infrastructureTemplateId": "tpl",
+        "dependsOn": [],
+        "tags": [],
+        "specific": {},
+    }
+    return {
+        "DataProduct": DataProduct(**document),
+        "OutputPort": OutputPort(**output_port),
+        "Workload": Workload(**workload),
+        "StorageArea": StorageArea(
+            id="urn:st", name="Storage", kind="storage", **common
+        ),
+        # inherits Component.toIcePanel
+        "Observability": Observability(
+            id="urn:obs",
+            name="Observability",
+            kind="observability",
+            description="x",
+            specific={},
+            endpoint="https://example.com",
+            completeness={},
+            dataProfiling={},
+            freshness={},
+            availability={},
+            dataQuality={},
+        ),
+    }
+
+
+def to_icepanel_case(kind: str) -> Case:
+    def setup() -> Callable[[], Any]:
+        component = _components()[kind]
+        return lambda: component.toIcePanel("d1", "parent")
+
+    return setup
+
+
+def export_case(size: str) -> Case:
+    def setup() -> Callable[[], Any]:
+        body = json.dumps(build_export(EXPORT_SIZES[size])).encode()
+        return lambda: streamed(body)
+
+    return setup
+
+
+def _status() -> ProvisioningStatus:
+    return ProvisioningStatus(status=Status1.COMPLETED, result="done")
+
+
+def get_status() -> Any:
+    # named after the route: without a current table, check_response finds the
+    # route from the caller name, as for the routes of other applications
+    return check_response(out_response=_status())
+
+
+def check_response_case(lookup: str) -> Case:
+    def setup() -> Callable[[], Any]:
+        status = _status()
+        if lookup == "responses":
+            responses = {
+                "200": {"model": ProvisioningStatus},
+                "500": {"model": SystemErr},
+            }
+            return lambda: check_response(out_response=status, responses=responses)
+        if lookup == "route_path":
+            path = "/v1/provision/{token}/status"
+            return lambda: check_response(
+                out_response=status, route_path=path, application=app
+            )
+        if lookup == "current_route":
+            # as set by the route while its endpoint runs
+            table = next(
+                route.response_table  # type: ignore[attr-defined]
+                for route in app.routes
+                if getattr(route, "name", "") == "get_status"
+            )
+            current_responses.set(table)
+            return lambda: check_response(out_response=status)
+        current_responses.set(None)
+        return get_status
+
+    return setup
+
+
+def metrics_case() -> Callable[[], Any]:
+    histogram = Histogram("bench_seconds", "", ["a", "b"], registry=CollectorRegistry())
+
+    def observe() -> None:
+        histogram.labels("POST", "objects").observe(0.042)
+
+    return observe
+
+
+CASES: Dict[str, Case] = {
+    **{f"parse_yaml_with_model[{s}]": parse_yaml_case(s) for s in DESCRIPTOR_SIZES},
+    **{f"DataProduct[{s}]": data_product_case(s) for s in DESCRIPTOR_SIZES},
+    "OpenMetadataColumn[1000]": columns_case,
+    **{f"toIcePanel[{kind}]": to_icepanel_case(kind) for kind in TO_ICEPANEL_KINDS},
+    **{f"IcePanelData[{s}]": export_case(s) for s in EXPORT_SIZES},
+    **{
+        f"check_response[{lookup}]": check_response_case(lookup)
+        for lookup in ["responses", "route_path", "current_route", "caller_name"]
+    },
+    "Histogram.observe": metrics_case,
+}
+
+
+def measure(call: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Times `call` like `timeit`: loops sized to last at least 0.2 s, repeated
+    `repeat` times, with the garbage collector disabled while timing.
+    """  # noqa: E501
+    timer = timeit.Timer(call)
+    loops, _ = timer.autorange()
+    gc.collect()
+    per_call = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_seconds": min(per_call),
+        "median_seconds": statistics.median(per_call),
+        "ops_per_second": 1 / min(per_call),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+
+def run(pattern: str, repeat: int) -> List[Tuple[str, Dict[str, Any]]]:
+    results = []
+    for name, case in CASES.items():
+        if not re.search(pattern, name):
+            continue
+        result = measure(case(), repeat)
+        print(f"{name:<36} {_format(result['min_seconds'])}", flush=True)
+        results.append((name, result))
+    return results
+
+
+def compare(results: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path) as file:
+        baseline = json.load(file)["results"]
+    print(f"\nagainst {baseline_path} (>1 is faster):")
+    for name, result in results.items():
+        if name in baseline:
+            ratio = baseline[name]["min_seconds"] / result["min_seconds"]
+            print(f"{name:<36} x{ratio:6.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default="micro.json")
+    parser.add_argument("--compare", help="results of a previous run")
+    parser.add_argument("--filter", default="", help="regex on the case names")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    started = time.time()
+    results = dict(run(args.filter, args.repeat))
+    report = {
+        "started_at": started,
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nsaved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
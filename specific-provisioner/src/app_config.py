@@ -1,8 +1,214 @@
+import os
+from contextlib import ExitStack, asynccontextmanager
+from typing import AsyncIterator, List
+
 from fastapi import FastAPI
+from prometheus_client import REGISTRY, Histogram
+
+from src.icepanel.client import IcePanelClient
+from src.icepanel.fingerprint_store import FingerprintStore
+from src.icepanel.shared_snapshot import (
+    SharedLandscapeSnapshotCache,
+    SharedSnapshotStore,
+)
+from src.icepanel.snapshot_cache import LandscapeSnapshotCache
+from src.provisioning.handlers import build_handlers
+from src.provisioning.job_store import JobStore
+from src.provisioning.jobs import JobManager
+from src.provisioning.write_scheduler import WriteScheduler
+from src.settings import settings
+from src.utility.logger import configure_logging, shutdown_logging
+from src.utility.metrics import (
+    LATENCY_BUCKETS,
+    Reading,
+    ReadingsCollector,
+    RouteMetricsMiddleware,
+)
+from src.utility.route_responses import ResponseCheckedRoute
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latency of the HTTP requests served, by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def _data_file(path: str, name: str) -> str:
+    # the store configured, or the file `name` in the data directory
+    if path:
+        return path
+    os.makedirs(settings.data_dir, exist_ok=True)
+    return os.path.join(settings.data_dir, name)
+
+
+def _shared_store(stack: ExitStack) -> SharedSnapshotStore | None:
+    if not settings.icepanel_snapshot_store_path:
+        return None
+    return stack.enter_context(
+        SharedSnapshotStore(settings.icepanel_snapshot_store_path)
+    )
+
+
+def _snapshot_cache(
+    icepanel_client: IcePanelClient, store: SharedSnapshotStore | None
+) -> LandscapeSnapshotCache:
+    if store is None:
+        return LandscapeSnapshotCache(
+            icepanel_client, ttl=settings.icepanel_snapshot_ttl
+        )
+    return SharedLandscapeSnapshotCache(
+        icepanel_client,
+        store,
+        ttl=settings.icepanel_snapshot_ttl,
+        lease=settings.icepanel_snapshot_lease,
+    )
+
+
+def _readings(
+    icepanel_client: IcePanelClient,
+    snapshot_cache: LandscapeSnapshotCache,
+    job_manager: JobManager,
+) -> List[Reading]:
+    """
+    The metrics read from the counters of the IcePanel client, of the snapshot
+    cache and of the job manager at scrape time.
+    """  # noqa: E501
+    calls = icepanel_client.stats
+    snapshots = snapshot_cache.stats
+    return [
+        Reading(
+            "icepanel_calls_total",
+            "HTTP calls sent to IcePanel, retries included",
+            lambda: calls.calls,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_retries_total",
+            "Calls to IcePanel sent again after a failure",
+            lambda: calls.retries,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_throttled_total",
+            "Calls IcePanel answered with 429 Too Many Requests",
+            lambda: calls.throttled,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_gave_up_total",
+            "Failed calls to IcePanel not retried (any more)",
+            lambda: calls.gave_up,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_limiter_wait_seconds_total",
+            "Seconds spent waiting for the IcePanel rate limiter",
+            lambda: calls.limiter_wait,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_backoff_wait_seconds_total",
+            "Seconds spent backing off before retrying IcePanel calls",
+            lambda: calls.backoff_wait,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_snapshot_cache_hits_total",
+            "Landscape reads served by a fresh snapshot since startup",
+            lambda: snapshots.hits,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_snapshot_cache_misses_total",
+            "Landscape reads that contacted IcePanel since startup",
+            lambda: snapshots.misses,
+            counter=True,
+        ),
+        Reading(
+            "icepanel_snapshot_cache_hit_ratio",
+            "Share of the landscape reads served by a fresh snapshot",
+            lambda: snapshots.hit_ratio,
+        ),
+        Reading(
+            "provisioner_jobs_in_flight",
+            "Jobs queued or running in this process",
+            lambda: job_manager.in_flight,
+        ),
+        Reading(
+            "provisioner_job_queue_depth",
+            "Jobs waiting for a worker",
+            lambda: job_manager.queue_depth,
+        ),
+    ]
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI) -> AsyncIterator[None]:
+    """
+    Opens the shared IcePanel connection pool, the landscape snapshot cache (and
+    the store sharing it between workers, if configured), the fingerprint store
+    and the background job workers at startup, and closes them at shutdown.
+    While the application runs, their counters are exposed on `/metrics`.
+    Starting the workers resumes the jobs interrupted by the previous shutdown.
+    Logging is configured first, and flushed last.
+    """  # noqa: E501
+    configure_logging(
+        settings.log_level,
+        json_output=settings.log_json,
+        max_length=settings.log_max_field_length,
+        secrets=[settings.icepanel_api_key],
+    )
+    with ExitStack() as stack:
+        stack.callback(shutdown_logging)
+        fingerprints = stack.enter_context(
+            FingerprintStore(
+                _data_file(settings.fingerprint_store_path, "fingerprints.sqlite3")
+            )
+        )
+        async with IcePanelClient.from_settings(settings) as icepanel_client:
+            application.state.icepanel_client = icepanel_client
+            shared_store = _shared_store(stack)
+            snapshot_cache = _snapshot_cache(icepanel_client, shared_store)
+            application.state.snapshot_cache = snapshot_cache
+            # the writes of the other workers sharing the store are serialized
+            # through it too
+            write_scheduler = WriteScheduler(leases=shared_store)
+            application.state.write_scheduler = write_scheduler
+            job_manager = JobManager(
+                JobStore(_data_file(settings.job_store_path, "jobs.sqlite3")),
+                build_handlers(
+                    icepanel_client,
+                    snapshot_cache,
+                    concurrency=settings.icepanel_write_concurrency,
+                    fingerprints=fingerprints,
+                    scheduler=write_scheduler,
+                ),
+                workers=settings.job_workers,
+                queue_size=settings.job_queue_size,
+                retention=settings.job_retention,
+                max_attempts=settings.job_max_attempts,
+            )
+            application.state.job_manager = job_manager
+            await job_manager.start()
+            collector = ReadingsCollector(
+                _readings(icepanel_client, snapshot_cache, job_manager)
+            )
+            REGISTRY.register(collector)
+            try:
+                yield
+            finally:
+                REGISTRY.unregister(collector)
+                await job_manager.stop()
+
 
 app = FastAPI(
     title="Specific Provisioner Micro Service",
     description="Microservice responsible to handle provisioning and access control requests for one or more data product components.",  # noqa: E501
     version="{{version}}",
     servers=[{"url": "/datamesh.specificprovisioner"}],
+    lifespan=lifespan,
 )
+# routes render their responses from tables built once, when they are declared
+app.router.route_class = ResponseCheckedRoute
+app.add_middleware(RouteMetricsMiddleware, histogram=HTTP_REQUEST_SECONDS)
@@ -1,19 +1,55 @@
-import inspect
-import json
-from typing import Any
+import sys
+from typing import Any, Dict
+from weakref import WeakKeyDictionary
 
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
-from pydantic import BaseModel
 from starlette.responses import Response
 
 from src.app_config import app
-from src.models.api_models import SystemErr
 from src.utility.logger import get_logger
+from src.utility.route_responses import (
+    ResponseCheckedRoute,
+    ResponseTable,
+    current_responses,
+    unexpected_error,
+)
 
 logger = get_logger()
 
 
+class _RouteTables:
+    """
+    The response tables of the routes of an application, by path and by name.
+    """
+
+    def __init__(self, application: FastAPI) -> None:
+        self.route_count = len(application.routes)
+        self.by_path: Dict[str, ResponseTable] = {}
+        self.by_name: Dict[str, ResponseTable] = {}
+        for route in application.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            if isinstance(route, ResponseCheckedRoute):
+                table = route.response_table
+            else:
+                table = ResponseTable(route.responses)
+            # the first route declared wins, as with a scan of app.routes
+            self.by_path.setdefault(route.path, table)
+            self.by_name.setdefault(route.name, table)
+
+
+_route_tables: "WeakKeyDictionary[FastAPI, _RouteTables]" = WeakKeyDictionary()
+
+
+def _tables(application: FastAPI) -> _RouteTables:
+    tables = _route_tables.get(application)
+    # rebuilt only if routes were added since
+    if tables is None or tables.route_count != len(application.routes):
+        tables = _route_tables[application] = _RouteTables(application)
+    return tables
+
+
 def check_response(
     out_response: Any,
     responses: dict | None = None,
@@ -30,6 +66,11 @@ def check_response(
     the JSON or the text corresponding to the out_response parameter.
     If the type is not accepted it returns a Response containing a SystemErr.
 
+    The responses of every route are turned into a lookup table once (see
+    `ResponseTable`). The routes of the main application are `ResponseCheckedRoute`s,
+    which make their table current while their endpoint runs; for the routes of other
+    applications, the caller route is found from the name of the calling function.
+
     Args:
         out_response: (Any) The response that the FastAPI route wants to return as output.
         responses: (dict, optional) A dictionary used to specify the possible responses for the route.
@@ -44,113 +85,34 @@ def check_response(
     """  # noqa: E501
 
     if responses is not None:
-        return _check_response_type(responses, out_response)
+        return ResponseTable(responses).render(out_response)
 
     if route_path is not None:
-        endpoint = _find_caller_endpoint_by_path(
-            application=application, caller_path=route_path
-        )
-
+        table = _tables(application).by_path.get(route_path)
     else:
-        caller_function = _find_caller_function()
-
-        if caller_function is None:
-            logger.error("Check_responses: caller function not found")
-            return Response(
-                status_code=500,
-                content=SystemErr(
-                    error="An unexpected error occurred while processing the request. "
-                    "If the issue still persists, contact the platform team for assistance!"  # noqa: E501
-                ).model_dump_json(),
-                media_type="application/json",
-            )
-
-        endpoint = _find_caller_endpoint_by_name(
-            application=application, caller_name=caller_function
-        )
-
-    responses = endpoint.responses if endpoint is not None else None
-
-    if responses is None:
+        table = current_responses.get()
+        if table is None:
+            caller_function = _find_caller_function()
+            if caller_function is None:
+                logger.error("Check_responses: caller function not found")
+                return unexpected_error()
+            table = _tables(application).by_name.get(caller_function)
+
+    if table is None:
         logger.error(
             "Check_responses: endpoint not found in app.routes or responses parameter has no value "  # noqa: E501
         )
-        return Response(
-            status_code=500,
-            content=SystemErr(
-                error="An unexpected error occurred while processing the request. "
-                "If the issue still persists, contact the platform team for assistance!"  # noqa: E501
-            ).model_dump_json(),
-            media_type="application/json",
-        )
-
-    return _check_response_type(responses, out_response)
-
-
-def _check_response_type(responses: dict, out_response: Any) -> Response:
-    """
-    Ensures that the type of the parameter 'out_response' is contained in the 'model'
-    field of the 'responses' dictionary.
-
-    Args:
-        responses: (dict) A dictionary used to specify the possible responses for the route.
-            It is used to define the possible HTTP response codes that the API can return along with their details,
-            including the data model to be returned.
-        out_response: (Any) The response that the FastAPI route wants to return as output.
-    Returns:
-        starlette.responses.Response: A Response object that includes the HTTP response code and
-        the JSON or the text corresponding to the out_response parameter.
-        If the type of 'out_response' is not accepted as per the 'model' field in 'responses',
-        it returns a Response containing a SystemErr.
-    """  # noqa: E501
-
-    # set default response_code = 500, if correct response type is found it will be changed  # noqa: E501
-    response_code = 500
-    correct_output_type = False
-    for k in responses.keys():
-        endpoint_response = responses.get(k)
-        if isinstance(endpoint_response, dict) and endpoint_response is not None:
-            if endpoint_response.get("model") == type(out_response):
-                correct_output_type = True
-                response_code = k
-                break
-
-    if not correct_output_type:
-        logger.error("Check response type: response type indicated not allowed")
-        return Response(
-            status_code=500,
-            content=SystemErr(
-                error="An unexpected error occurred while processing the request. "
-                "If the issue still persists, contact the platform team for assistance!"  # noqa: E501
-            ).model_dump_json(),
-            media_type="application/json",
-        )
-
-    if isinstance(out_response, BaseModel):
-        content = json.dumps(out_response.model_dump())
-        media_type = "application/json"
-    elif isinstance(out_response, list) and all(
-        isinstance(item, BaseModel) for item in out_response
-    ):  # noqa: E501
-        out_response_dicts = [item.dict() for item in out_response]
-        content = json.dumps(out_response_dicts)
-        media_type = "application/json"
-    else:
-        content = str(out_response)
-        media_type = "text/plain"
+        return unexpected_error()
 
-    return Response(
-        status_code=int(response_code), content=content, media_type=media_type
-    )
+    return table.render(out_response)
 
 
 def _find_caller_function(n_back: int = 2) -> str | None:
     """
     Returns the name of the caller function 'n_back' frames up the call stack.
 
-    This function inspects the call stack to find the name of the caller function
-    'n_back' frames up from the current function call. If 'n_back' is not specified,
-    it defaults to 2.
+    Only used for the routes that do not make their responses current (see
+    `ResponseCheckedRoute`).
 
     Args:
         n_back (int, optional): The number of frames up the call stack to look for
@@ -162,67 +124,7 @@ def _find_caller_function(n_back: int = 2) -> str | None:
         or when this function is executed at the highest level in the call stack).
     """  # noqa: E501
 
-    frame = inspect.currentframe()
-
-    if frame is not None:
-        for _ in range(n_back):
-            if frame is None:
-                return None
-            frame = frame.f_back
-
-    caller_function = frame.f_code.co_name if frame is not None else None
-    return caller_function
-
-
-def _find_caller_endpoint_by_path(
-    application: FastAPI, caller_path: str
-) -> APIRoute | None:
-    """
-    Find and return the FastAPI endpoint (APIRoute) based on the provided caller_path.
-
-    This function iterates through all registered routes in the FastAPI application and searches for an APIRoute
-    that matches the caller_path argument.
-    If a match is found, the corresponding APIRoute object is returned. If no match is found, the function returns None.
-
-    Args:
-        application (FastAPI): The FastAPI application instance to search for the endpoint.
-        caller_path (str): The path of the route to search for.
-
-    Returns:
-        APIRoute or None: If a matching route is found, it returns the corresponding APIRoute object.
-        If no matching route is found, it returns None.
-
-    """  # noqa: E501
-
-    for route in application.routes:
-        if isinstance(route, APIRoute) and route.path == caller_path:
-            return route
-
-    return None
-
-
-def _find_caller_endpoint_by_name(
-    application: FastAPI, caller_name: str
-) -> APIRoute | None:
-    """
-    Find and return the FastAPI endpoint (APIRoute) based on the provided caller_name.
-
-    This function iterates through all registered routes in the FastAPI application and searches for an APIRoute
-    that matches the caller_name argument.
-    If a match is found, the corresponding APIRoute object is returned. If no match is found, the function returns None.
-
-    Args:
-        application (FastAPI): The FastAPI application instance to search for the endpoint.
-        caller_name (str): The name of the route to search for.
-
-    Returns:
-        APIRoute or None: If a matching route is found, it returns the corresponding APIRoute object.
-        If no matching route is found, it returns None.
-
-    """  # noqa: E501
-
-    for route in application.routes:
-        if isinstance(route, APIRoute) and route.name == caller_name:
-            return route
-
-    return None
+    try:
+        return sys._getframe(n_back).f_code.co_name
+    except ValueError:
+        return None
@@ -1,8 +1,13 @@
+import asyncio
 from typing import Annotated, Tuple
 
 import yaml
-from fastapi import Depends
+from fastapi import Depends, Request
+from opentelemetry import trace
+from pydantic import ValidationError as PydanticValidationError
 
+from src.icepanel.client import IcePanelClient
+from src.icepanel.snapshot_cache import LandscapeSnapshotCache
 from src.models.api_models import (
     DescriptorKind,
     ProvisioningRequest,
@@ -10,10 +15,31 @@ from src.models.api_models import (
     ValidationError,
 )
 from src.models.data_product_descriptor import DataProduct
+from src.provisioning.jobs import JobManager
+from src.utility.descriptor_cache import DescriptorCache
+from src.utility.descriptor_loader import DescriptorLimitError, load_descriptor
 from src.utility.logger import get_logger
 from src.utility.parsing_pydantic_models import parse_yaml_with_model
 
 logger = get_logger()
+tracer = trace.get_tracer(__name__)
+
+# outcome of parsing the descriptors of provisioning requests, shared by the
+# endpoints and the background jobs
+descriptor_cache: DescriptorCache[
+    Tuple[DataProduct, str] | ValidationError
+] = DescriptorCache.from_settings()
+
+# what a descriptor that cannot be parsed raises: reported as a validation error
+# and cached. Anything else raised while building the model (e.g. a validator
+# failing on `readsFrom: null`) is reported as a validation error too, but not
+# cached
+_DESCRIPTOR_ERRORS = (yaml.YAMLError, PydanticValidationError, DescriptorLimitError)
+
+
+def _unexpected_error(ex: Exception) -> ValidationError:
+    logger.exception(f"Unexpected error while parsing a descriptor: {ex}")
+    return ValidationError(errors=["Unable to parse the descriptor.", str(ex)])
 
 
 async def unpack_provisioning_request(
@@ -38,9 +64,17 @@ async def unpack_provisioning_request(
     Note:
         - This function expects the `provisioning_request` to have a descriptor kind of `DescriptorKind.COMPONENT_DESCRIPTOR`.
         - It will attempt to parse the descriptor and return the relevant information. If parsing fails or the descriptor kind is unexpected, a `ValidationError` will be returned.
+        - Parsing and validation are CPU-bound and run in a worker thread, off the event loop.
+        - The outcome is cached by descriptor content: a descriptor already seen is not parsed again.
 
     """  # noqa: E501
 
+    return await asyncio.to_thread(_unpack_provisioning_request, provisioning_request)
+
+
+def _unpack_provisioning_request(
+    provisioning_request: ProvisioningRequest,
+) -> Tuple[DataProduct, str] | ValidationError:
     if not provisioning_request.descriptorKind == DescriptorKind.DATAPRODUCT_DESCRIPTOR:
         error = (
             "Expecting a DATAPRODUCT_DESCRIPTOR but got a "
@@ -49,24 +83,71 @@ async def unpack_provisioning_request(
         )
         return ValidationError(errors=[error])
     try:
-        request = yaml.safe_load(provisioning_request.descriptor)
-        data_product = parse_yaml_with_model(request.get("dataproduct"), DataProduct)
-        component_to_provision = request.get("componentIdToProvision")
+        return descriptor_cache.get_or_parse(
+            provisioning_request.descriptor, _parse_provisioning_descriptor
+        )
+    except Exception as ex:
+        # raised before anything was cached
+        return _unexpected_error(ex)
 
-        if isinstance(data_product, DataProduct):
-            return data_product, component_to_provision
-        elif isinstance(data_product, ValidationError):
-            return data_product
 
+def _parse_provisioning_descriptor(
+    descriptor: str,
+) -> Tuple[DataProduct, str] | ValidationError:
+    # only descriptors missing from the cache get a span
+    with tracer.start_as_current_span(
+        "parse_descriptor", attributes={"descriptor.bytes": len(descriptor)}
+    ) as span:
+        outcome = _parse_descriptor(descriptor)
+        if isinstance(outcome, ValidationError):
+            span.set_status(trace.StatusCode.ERROR, "; ".join(outcome.errors))
         else:
-            return ValidationError(
-                errors=[
-                    "An unexpected error occurred while parsing the provisioning request."  # noqa: E501
-                ]
+            span.set_attributes(
+                {
+                    "dataproduct.id": outcome[0].id,
+                    "dataproduct.components": len(outcome[0].components),
+                }
             )
+        return outcome
 
-    except Exception as ex:
+
+def _load_request(descriptor: str, section: str) -> dict | ValidationError:
+    # the descriptor as a mapping holding the `section` of the data product
+    try:
+        request = load_descriptor(descriptor)
+    except _DESCRIPTOR_ERRORS as ex:
         return ValidationError(errors=["Unable to parse the descriptor.", str(ex)])
+    if not isinstance(request, dict) or not isinstance(request.get(section), dict):
+        return ValidationError(
+            errors=[
+                "Unable to parse the descriptor.",
+                f"Expecting a mapping with a '{section}' mapping",
+            ]
+        )
+    return request
+
+
+def _parse_descriptor(descriptor: str) -> Tuple[DataProduct, str] | ValidationError:
+    request = _load_request(descriptor, "dataproduct")
+    if isinstance(request, ValidationError):
+        return request
+    try:
+        data_product = parse_yaml_with_model(request["dataproduct"], DataProduct)
+    except _DESCRIPTOR_ERRORS as ex:
+        return ValidationError(errors=["Unable to parse the descriptor.", str(ex)])
+    component_to_provision = request.get("componentIdToProvision")
+
+    if isinstance(data_product, DataProduct):
+        return data_product, component_to_provision
+    elif isinstance(data_product, ValidationError):
+        return data_product
+
+    else:
+        return ValidationError(
+            errors=[
+                "An unexpected error occurred while parsing the provisioning request."
+            ]
+        )
 
 
 UnpackedProvisioningRequestDep = Annotated[
@@ -99,33 +180,81 @@ async def unpack_update_acl_request(
         This function expects the `update_acl_request` to contain a valid YAML string
         in the 'provisionInfo.request' field. It will attempt to parse the YAML and
         return the relevant information. If parsing fails, a `ValidationError` will
-        be returned.
+        be returned. Parsing and validation run in a worker thread, off the event
+        loop.
 
     """  # noqa: E501
 
+    return await asyncio.to_thread(_unpack_update_acl_request, update_acl_request)
+
+
+def _unpack_update_acl_request(
+    update_acl_request: UpdateAclRequest,
+) -> Tuple[DataProduct, str, list[str]] | ValidationError:
     try:
-        request = yaml.safe_load(update_acl_request.provisionInfo.request)
-        data_product = parse_yaml_with_model(request.get("dataProduct"), DataProduct)
-        component_to_provision = request.get("componentIdToProvision")
-        if isinstance(data_product, DataProduct):
-            return (
-                data_product,
-                component_to_provision,
-                update_acl_request.refs,
-            )
-        elif isinstance(data_product, ValidationError):
-            return data_product
-        else:
-            return ValidationError(
-                errors=[
-                    "An unexpected error occurred while parsing the update acl request."
-                ]
-            )
+        return _parse_update_acl_request(update_acl_request)
     except Exception as ex:
+        return _unexpected_error(ex)
+
+
+def _parse_update_acl_request(
+    update_acl_request: UpdateAclRequest,
+) -> Tuple[DataProduct, str, list[str]] | ValidationError:
+    request = _load_request(update_acl_request.provisionInfo.request, "dataProduct")
+    if isinstance(request, ValidationError):
+        return request
+    try:
+        data_product = parse_yaml_with_model(request["dataProduct"], DataProduct)
+    except _DESCRIPTOR_ERRORS as ex:
         return ValidationError(errors=["Unable to parse the descriptor.", str(ex)])
+    component_to_provision = request.get("componentIdToProvision")
+    if isinstance(data_product, DataProduct):
+        return (
+            data_product,
+            component_to_provision,
+            update_acl_request.refs,
+        )
+    elif isinstance(data_product, ValidationError):
+        return data_product
+    else:
+        return ValidationError(
+            errors=[
+                "An unexpected error occurred while parsing the update acl request."
+            ]
+        )
 
 
 UnpackedUpdateAclRequestDep = Annotated[
     Tuple[DataProduct, str, list[str]] | ValidationError,
     Depends(unpack_update_acl_request),
 ]
+
+
+def get_icepanel_client(request: Request) -> IcePanelClient:
+    """
+    Returns the IcePanel client opened by the application lifespan.
+    """
+    return request.app.state.icepanel_client
+
+
+IcePanelClientDep = Annotated[IcePanelClient, Depends(get_icepanel_client)]
+
+
+def get_snapshot_cache(request: Request) -> LandscapeSnapshotCache:
+    """
+    Returns the landscape snapshot cache opened by the application lifespan.
+    """
+    return request.app.state.snapshot_cache
+
+
+SnapshotCacheDep = Annotated[LandscapeSnapshotCache, Depends(get_snapshot_cache)]
+
+
+def get_job_manager(request: Request) -> JobManager:
+    """
+    Returns the background job manager started by the application lifespan.
+    """
+    return request.app.state.job_manager
+
+
+JobManagerDep = Annotated[JobManager, Depends(get_job_manager)]
@@ -0,0 +1,535 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import tempfile
+import time
+from dataclasses import dataclass
+from types import TracebackType
+from typing import IO, AsyncIterator, Tuple, Type
+
+import httpx
+from opentelemetry import propagate, trace
+from prometheus_client import Histogram
+
+from src.icepanel.export_reader import ExportReader
+from src.icepanel.rate_limit import (
+    RETRYABLE_STATUSES,
+    RetryPolicy,
+    RetryStats,
+    TokenBucket,
+    parse_retry_after,
+    shared_bucket,
+)
+from src.models.icepanel import (
+    Domain,
+    IcePanelData,
+    ModelConnection,
+    ModelObject,
+)
+from src.settings import Settings
+from src.utility import json_codec
+from src.utility.logger import get_logger
+from src.utility.metrics import LATENCY_BUCKETS
+
+logger = get_logger()
+tracer = trace.get_tracer(__name__)
+
+ICEPANEL_API_URL = "https://api.icepanel.io/v1"
+
+# request bodies are encoded with the native JSON codec rather than by httpx
+JSON_HEADERS = {"Content-Type": json_codec.JSON_CONTENT_TYPE}
+
+# failures raised before the request reached IcePanel: any call can be replayed
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# bodies of revalidated exports are spooled to a temporary file past this size
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+SPOOL_CHUNK_BYTES = 64 * 1024
+
+ICEPANEL_REQUEST_SECONDS = Histogram(
+    "icepanel_request_duration_seconds",
+    "Latency of the HTTP calls to IcePanel, retries counted separately, up to the "
+    "response headers",
+    ["method", "operation", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@dataclass(frozen=True)
+class ExportResponse:
+    """
+    A landscape export, parsed while it was downloaded, together with its HTTP
+    cache validators.
+
+    `not_modified` is set when the copy held by the caller is still current:
+    IcePanel answered 304 Not Modified, or the body hashed to the caller's
+    `content_hash`. `data` is None then.
+    """
+
+    etag: str | None = None
+    last_modified: str | None = None
+    not_modified: bool = False
+    data: IcePanelData | None = None
+    content_hash: str | None = None
+
+
+async def _spool(response: httpx.Response) -> Tuple[IO[bytes], str]:
+    # the body and its SHA-256, without parsing it
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    digest = hashlib.sha256()
+    async for chunk in response.aiter_bytes():
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, digest.hexdigest()
+
+
+async def _read_spool(spool: IO[bytes]) -> AsyncIterator[bytes]:
+    while chunk := spool.read(SPOOL_CHUNK_BYTES):
+        yield chunk
+
+
+class IcePanelClient:
+    """
+    Asynchronous client for the IcePanel REST API.
+
+    A single instance owns a keep-alive connection pool that is shared by every
+    provisioning request, so it must be opened once (see `open`) and closed when
+    the application shuts down (see `close`). The client can also be used as an
+    async context manager.
+
+    Calls wait for the `rate_limiter`, if any, and failed calls are retried as
+    per the `retry_policy`: on 429 Too Many Requests (honouring `Retry-After`)
+    and on transient 5xx or network errors. Only idempotent calls (GET, PATCH,
+    DELETE) are retried on any of these; a POST, which could create a duplicate,
+    is only retried when IcePanel did not process it: on 429, or when the
+    connection could not be established. `stats` counts the calls, retries and
+    time spent waiting.
+
+    Every export and write runs in an OpenTelemetry span, whose context is
+    propagated to IcePanel in the request headers (`traceparent`).
+
+    Args:
+        landscape_id (str): The IcePanel landscape the adapter writes to.
+        api_key (str): The IcePanel API key.
+        base_url (str, optional): The IcePanel API root. Defaults to the public SaaS.
+        limits (httpx.Limits, optional): Size of the connection pool.
+        timeout (httpx.Timeout, optional): Timeouts applied to every call.
+        transport (httpx.AsyncBaseTransport, optional): Custom transport, mainly
+            useful to plug a mock transport in tests.
+        rate_limiter (TokenBucket, optional): Limiter shared by the clients using
+            the same API key. No limit by default.
+        retry_policy (RetryPolicy, optional): How failed calls are retried. No
+            retries by default.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        landscape_id: str,
+        api_key: str,
+        base_url: str = ICEPANEL_API_URL,
+        limits: httpx.Limits | None = None,
+        timeout: httpx.Timeout | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        rate_limiter: TokenBucket | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self.landscape_id = landscape_id
+        self.base_url = base_url.rstrip("/")
+        self._headers = {
+            "Accept": "application/json",
+            "Authorization": f"ApiKey {api_key}",
+        }
+        self._limits = limits or httpx.Limits()
+        self._timeout = timeout or httpx.Timeout(30.0)
+        self._transport = transport
+        self._limiter = rate_limiter
+        self._retry = retry_policy or RetryPolicy(max_attempts=1)
+        self._client: httpx.AsyncClient | None = None
+        self.stats = RetryStats()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> IcePanelClient:
+        """
+        Builds a client configured from the application settings.
+        """
+        return cls(
+            landscape_id=settings.icepanel_landscape_id,
+            api_key=settings.icepanel_api_key,
+            base_url=settings.icepanel_base_url,
+            limits=httpx.Limits(
+                max_connections=settings.icepanel_max_connections,
+                max_keepalive_connections=settings.icepanel_max_keepalive_connections,
+                keepalive_expiry=settings.icepanel_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.icepanel_connect_timeout,
+                read=settings.icepanel_read_timeout,
+                write=settings.icepanel_write_timeout,
+                pool=settings.icepanel_pool_timeout,
+            ),
+            rate_limiter=shared_bucket(
+                settings.icepanel_api_key,
+                rate=settings.icepanel_rate_limit,
+                burst=settings.icepanel_rate_burst,
+            ),
+            retry_policy=RetryPolicy(
+                max_attempts=settings.icepanel_max_attempts,
+                base_delay=settings.icepanel_retry_base_delay,
+                max_delay=settings.icepanel_retry_max_delay,
+            ),
+        )
+
+    @property
+    def version_url(self) -> str:
+        return self._version_url()
+
+    def _version_url(self, landscape_id: str | None = None) -> str:
+        landscape = landscape_id or self.landscape_id
+        return f"{self.base_url}/landscapes/{landscape}/versions/latest"
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    async def open(self) -> None:
+        """
+        Creates the underlying connection pool. Calling it twice is a no-op.
+        """
+        if self.is_open:
+            return
+        self._client = httpx.AsyncClient(
+            headers=self._headers,
+            limits=self._limits,
+            timeout=self._timeout,
+            transport=self._transport,
+        )
+
+    async def close(self) -> None:
+        """
+        Closes every pooled connection. Calling it twice is a no-op.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> IcePanelClient:
+        await self.open()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            raise RuntimeError("IcePanelClient is not open; call open() first")
+        return self._client
+
+    def _span(self, name: str, landscape_id: str | None = None, **attributes):
+        return tracer.start_as_current_span(
+            name,
+            kind=trace.SpanKind.CLIENT,
+            attributes={
+                "icepanel.landscape_id": landscape_id or self.landscape_id,
+                **{f"icepanel.{key}": value for key, value in attributes.items()},
+            },
+        )
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        replayable: bool,
+        operation: str,
+        stream: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Sends a request through the rate limiter, retrying it as per the retry
+        policy. The request carries the context of the current span, which
+        records the attempts made and the final status.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to call.
+            replayable (bool): Whether the request can be sent again after a 5xx
+                or a network error, i.e. whether it is idempotent.
+            operation (str): What is called (`export`, `objects`, `connections`),
+                to label the latency metrics.
+            stream (bool, optional): Whether to return before reading the body;
+                the caller must close the response.
+            **kwargs: Passed on to `httpx.AsyncClient.build_request`.
+
+        Returns:
+            httpx.Response: The first response that is not retried, possibly an
+                error response.
+
+        Raises:
+            httpx.TransportError: If the last attempt failed on a network error.
+        """  # noqa: E501
+        http = self._http()
+        request = http.build_request(method, url, **kwargs)
+        propagate.inject(request.headers)
+        span = trace.get_current_span()
+        attempt = 0
+        while True:
+            attempt += 1
+            span.set_attribute("icepanel.attempts", attempt)
+            if self._limiter is not None:
+                self.stats.limiter_wait += await self._limiter.acquire()
+            self.stats.calls += 1
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                response = await http.send(request, stream=stream)
+            except httpx.TransportError as ex:
+                ICEPANEL_REQUEST_SECONDS.labels(
+                    method, operation, type(ex).__name__
+                ).observe(time.perf_counter() - start)
+                if not replayable and not isinstance(ex, _NOT_SENT_ERRORS):
+                    raise
+                failure: httpx.Response | httpx.TransportError = ex
+                reason = type(ex).__name__
+            else:
+                ICEPANEL_REQUEST_SECONDS.labels(
+                    method, operation, str(response.status_code)
+                ).observe(time.perf_counter() - start)
+                span.set_attribute("http.status_code", response.status_code)
+                if response.status_code not in RETRYABLE_STATUSES:
+                    return response
+                if response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+                    self.stats.throttled += 1
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after and self._limiter is not None:
+                        self._limiter.pause(retry_after)
+                elif not replayable:
+                    return response
+                failure = response
+                reason = f"HTTP {response.status_code}"
+
+            delay = self._retry.backoff(attempt, retry_after)
+            if delay is None:
+                if self._retry.max_attempts > 1:
+                    self.stats.gave_up += 1
+                if isinstance(failure, httpx.TransportError):
+                    raise failure
+                return failure
+            if isinstance(failure, httpx.Response):
+                await failure.aclose()
+            logger.warning(
+                f"IcePanel {method} {url} failed ({reason}), "
+                f"retrying in {delay:.2f}s (attempt {attempt + 1})"
+            )
+            self.stats.retries += 1
+            self.stats.backoff_wait += delay
+            await asyncio.sleep(delay)
+
+    async def stream_export(
+        self,
+        landscape_id: str | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        content_hash: str | None = None,
+    ) -> ExportResponse:
+        """
+        Downloads the JSON export of the latest version of a landscape, parsing
+        it with an `ExportReader` as it is received instead of buffering it.
+
+        When `etag` or `last_modified` are given the request is made conditional
+        (If-None-Match / If-Modified-Since). When `content_hash` is given, the
+        body is hashed before being parsed, and only parsed if it changed: it is
+        spooled meanwhile (in memory up to `SPOOL_MAX_BYTES`, then on disk).
+        Either way, a copy still current is reported as `not_modified`.
+
+        Args:
+            landscape_id (str, optional): Landscape to export. Defaults to the
+                landscape the client is configured with.
+            etag (str, optional): ETag of the copy already held by the caller.
+            last_modified (str, optional): Last-Modified of the copy already held
+                by the caller.
+            content_hash (str, optional): SHA-256 of the body of the copy already
+                held by the caller.
+
+        Returns:
+            ExportResponse: The parsed export, the SHA-256 of its body and its
+                cache validators.
+
+        Raises:
+            ValueError: If the body does not match the `IcePanelData` model.
+        """  # noqa: E501
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
+        url = f"{self._version_url(landscape_id)}/export/json"
+        with self._span("icepanel.fetch_export", landscape_id) as span:
+            response = await self._send(
+                "GET",
+                url,
+                replayable=True,
+                operation="export",
+                stream=True,
+                headers=headers,
+            )
+            try:
+                if response.status_code == 304:
+                    return ExportResponse(
+                        etag=response.headers.get("ETag", etag),
+                        last_modified=response.headers.get(
+                            "Last-Modified", last_modified
+                        ),
+                        not_modified=True,
+                        content_hash=content_hash,
+                    )
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                if content_hash is None:
+                    return await self._parsed(response, span, response.aiter_bytes())
+                spool, digest = await _spool(response)
+                with spool:
+                    if digest == content_hash:
+                        span.set_attribute("icepanel.export.unchanged", True)
+                        return ExportResponse(
+                            etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified"),
+                            not_modified=True,
+                            content_hash=digest,
+                        )
+                    return await self._parsed(response, span, _read_spool(spool))
+            finally:
+                await response.aclose()
+
+    async def _parsed(
+        self,
+        response: httpx.Response,
+        span: trace.Span,
+        chunks: AsyncIterator[bytes],
+    ) -> ExportResponse:
+        reader = ExportReader()
+        # the body is parsed while it downloads: time the parsing apart
+        size, parsing = 0, 0.0
+        async for chunk in chunks:
+            start = time.perf_counter()
+            reader.feed(chunk)
+            parsing += time.perf_counter() - start
+            size += len(chunk)
+        start = time.perf_counter()
+        data = reader.close()
+        span.set_attributes(
+            {
+                "icepanel.export.bytes": size,
+                "icepanel.export.parse_seconds": parsing + time.perf_counter() - start,
+                "icepanel.export.objects": len(data.modelObjects),
+                "icepanel.export.connections": len(data.modelConnections),
+            }
+        )
+        return ExportResponse(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            data=data,
+            content_hash=reader.content_hash,
+        )
+
+    async def get_export(self, landscape_id: str | None = None) -> IcePanelData:
+        """
+        Downloads and parses the JSON export of the latest version of a landscape.
+        """
+        export = await self.stream_export(landscape_id)
+        assert export.data is not None
+        return export.data
+
+    async def get_situation(
+        self,
+    ) -> Tuple[list[Domain], list[ModelObject], list[ModelConnection]]:
+        """
+        Returns the domains, model objects and model connections of the landscape.
+        """
+        export = await self.get_export()
+        return (
+            list(export.domains.values()),
+            list(export.modelObjects.values()),
+            list(export.modelConnections.values()),
+        )
+
+    async def patch(self, objectDict: dict, objectType: str, objId: str) -> str:
+        patch_url = f"{self.version_url}/model/{objectType}/{objId}"
+        content = json_codec.dumps(objectDict)
+        with self._span(
+            "icepanel.patch",
+            object_type=objectType,
+            object_id=objId,
+            bytes=len(content),
+        ):
+            # a partial update with fixed values: safe to send twice
+            response = await self._send(
+                "PATCH",
+                patch_url,
+                replayable=True,
+                operation=objectType,
+                content=content,
+                headers=JSON_HEADERS,
+            )
+            # payloads are truncated by the log formatter
+            logger.debug(
+                f"IcePanel PATCH {objectType}/{objId}: HTTP {response.status_code}",
+                extra={"payload": objectDict, "response": response.content},
+            )
+            response.raise_for_status()
+        return objId
+
+    async def post(self, objectDict: dict, objectType: str) -> str:
+        post_url = f"{self.version_url}/model/{objectType}"
+        content = json_codec.dumps(objectDict)
+        with self._span(
+            "icepanel.post", object_type=objectType, bytes=len(content)
+        ) as span:
+            # IcePanel assigns the id: a replayed creation could draw a duplicate
+            response = await self._send(
+                "POST",
+                post_url,
+                replayable=False,
+                operation=objectType,
+                content=content,
+                headers=JSON_HEADERS,
+            )
+            response.raise_for_status()
+            created_object = json_codec.loads(response.content)
+            modelType = "modelConnection"
+            if objectType == "objects":
+                modelType = "modelObject"
+            created_id = created_object.get(modelType).get("id")
+            span.set_attribute("icepanel.object_id", created_id)
+        logger.debug(f"IcePanel {objectType} {created_id} created")
+        return created_id
+
+    async def delete(self, objectType: str, objId: str) -> str:
+        delete_url = f"{self.version_url}/model/{objectType}/{objId}"
+        with self._span("icepanel.delete", object_type=objectType, object_id=objId):
+            response = await self._send(
+                "DELETE", delete_url, replayable=True, operation=objectType
+            )
+            # already gone (e.g. a resumed removal): nothing left to do
+            if response.status_code != httpx.codes.NOT_FOUND:
+                response.raise_for_status()
+        return objId
+
+    async def patch_connection(self, conn_id: str, connection: ModelConnection) -> str:
+        return await self.patch(connection.dict(), "connections", conn_id)
+
+    async def patch_component(self, comp_id: str, component: ModelObject) -> str:
+        return await self.patch(component.dict(), "objects", comp_id)
+
+    async def post_connection(self, connection: ModelConnection) -> str:
+        return await self.post(connection.dict(), "connections")
+
+    async def post_component(self, component: ModelObject) -> str:
+        return await self.post(component.dict(), "objects")
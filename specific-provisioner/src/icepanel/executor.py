@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Sequence
+
+from opentelemetry import trace
+from prometheus_client import Counter
+
+from src.icepanel.client import IcePanelClient
+from src.icepanel.fingerprint_store import Fingerprint, FingerprintStore, fingerprint
+from src.icepanel.planner import (
+    Action,
+    ConnectionOperation,
+    ObjectOperation,
+    ReconciliationPlan,
+    RemovalPlan,
+)
+from src.utility.logger import get_logger
+
+logger = get_logger()
+tracer = trace.get_tracer(__name__)
+
+DEFAULT_CONCURRENCY = 8
+
+ICEPANEL_OPERATIONS = Counter(
+    "icepanel_operations_total",
+    "IcePanel objects and connections created, updated, skipped as unchanged or "
+    "deleted",
+    ["kind", "result"],
+)
+# bound once: recording an operation is a dict lookup and an addition
+_OPERATION_COUNTERS = {
+    (kind, action): ICEPANEL_OPERATIONS.labels(kind, result)
+    for kind in ("object", "connection")
+    for action, result in [
+        (Action.CREATE, "created"),
+        (Action.UPDATE, "updated"),
+        (Action.NOOP, "skipped"),
+        (Action.DELETE, "deleted"),
+    ]
+}
+
+# called after every operation that reached IcePanel with its target, its action
+# and the error message if it failed
+ProgressCallback = Callable[[str, Action, str | None], Awaitable[None]]
+
+
+@dataclass
+class OperationError:
+    """
+    A planned operation that could not be applied.
+
+    Attributes:
+        target (str): What the operation was about: the Witboost id of an object,
+            or `origin -[name]-> target` for a connection.
+        action (Action): The action that failed.
+        error (str): Why it failed.
+    """  # noqa: E501
+
+    target: str
+    action: Action
+    error: str
+
+    def __str__(self) -> str:
+        return f"{self.action} {self.target}: {self.error}"
+
+
+@dataclass
+class ExecutionResult:
+    """
+    Outcome of a plan execution.
+
+    Attributes:
+        object_ids (dict[str, str]): IcePanel id of every object that was written or
+            already existed, keyed by the Witboost id of the data product or component.
+        connection_ids (dict[str, str]): IcePanel id of every connection that was
+            written or already existed, keyed by `origin -[name]-> target`.
+        created (int): Number of objects and connections created.
+        updated (int): Number of objects and connections updated.
+        skipped (int): Number of objects and connections left untouched.
+        deleted (int): Number of objects and connections deleted.
+        errors (list[OperationError]): Operations that failed or could not run.
+    """  # noqa: E501
+
+    object_ids: dict[str, str] = field(default_factory=dict)
+    connection_ids: dict[str, str] = field(default_factory=dict)
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    errors: list[OperationError] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.errors
+
+    def record(self, action: Action) -> None:
+        if action == Action.CREATE:
+            self.created += 1
+        elif action == Action.UPDATE:
+            self.updated += 1
+        elif action == Action.DELETE:
+            self.deleted += 1
+        else:
+            self.skipped += 1
+
+
+def _record_result(span: trace.Span, result: ExecutionResult) -> None:
+    span.set_attributes(
+        {
+            "icepanel.created": result.created,
+            "icepanel.updated": result.updated,
+            "icepanel.skipped": result.skipped,
+            "icepanel.deleted": result.deleted,
+            "icepanel.errors": len(result.errors),
+        }
+    )
+    if result.errors:
+        span.set_status(trace.StatusCode.ERROR, str(result.errors[0]))
+
+
+class PlanExecutor:
+    """
+    Applies a `ReconciliationPlan` to IcePanel, sending only the create and update
+    operations: no-op operations never reach the network.
+
+    Operations run in dependency order: the data product system object first,
+    then all of its components in parallel, then all the connections in parallel
+    once the ids of their endpoints are known. At most `concurrency` calls are in
+    flight at the same time; pass a shared `semaphore` to bound several executors
+    together. A failing operation does not stop its siblings: every failure is
+    collected in `ExecutionResult.errors`, and the connections touching a
+    component that could not be written are reported as not run.
+
+    Updates are sent as partial PATCHes holding only the changed fields. With a
+    `fingerprints` store, the content of every object and connection written is
+    recorded once the plan ran, and forgotten once deleted.
+
+    Args:
+        client (IcePanelClient): The client used to write to IcePanel.
+        concurrency (int, optional): Maximum number of concurrent calls.
+        semaphore (asyncio.Semaphore, optional): Limiter shared with other
+            executors; takes precedence over `concurrency`.
+        on_progress (ProgressCallback, optional): Notified after every operation
+            sent to IcePanel, e.g. to persist the progress of a job.
+        fingerprints (FingerprintStore, optional): Where to record what was written.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        client: IcePanelClient,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        semaphore: asyncio.Semaphore | None = None,
+        on_progress: ProgressCallback | None = None,
+        fingerprints: FingerprintStore | None = None,
+    ) -> None:
+        self._client = client
+        self._semaphore = semaphore or asyncio.Semaphore(concurrency)
+        self._on_progress = on_progress
+        self._fingerprints = fingerprints
+
+    async def execute(self, plan: ReconciliationPlan) -> ExecutionResult:
+        with tracer.start_as_current_span(
+            "icepanel.execute", attributes={"dataproduct.id": plan.data_product_id}
+        ) as span:
+            result = await self._execute(plan)
+            _record_result(span, result)
+        return result
+
+    async def _execute(self, plan: ReconciliationPlan) -> ExecutionResult:
+        result = ExecutionResult()
+
+        await self._run_all([plan.system], self._apply_object, result)
+        system_id = result.object_ids.get(plan.system.key)
+        if system_id is None:
+            for operation in plan.components:
+                result.errors.append(
+                    OperationError(
+                        operation.key,
+                        operation.action,
+                        "not run: the data product system could not be written",
+                    )
+                )
+            return result
+
+        for operation in plan.components:
+            operation.desired.parentId = system_id
+        await self._run_all(plan.components, self._apply_object, result)
+
+        runnable = []
+        for connection in plan.connections:
+            origin_id = result.object_ids.get(connection.origin)
+            target_id = result.object_ids.get(connection.target)
+            if origin_id is None or target_id is None:
+                result.errors.append(
+                    OperationError(
+                        connection.key,
+                        connection.action,
+                        "not run: one of its endpoints could not be written",
+                    )
+                )
+                continue
+            connection.desired.originId = origin_id
+            connection.desired.targetId = target_id
+            runnable.append(connection)
+        await self._run_all(runnable, self._apply_connection, result)
+        await self._record_fingerprints(plan, result)
+
+        logger.info(
+            f"Data product {plan.data_product_id} reconciled: {result.created} "
+            f"created, {result.updated} updated, {result.skipped} unchanged, "
+            f"{len(result.errors)} failed"
+        )
+        return result
+
+    async def execute_removal(self, plan: RemovalPlan) -> ExecutionResult:
+        """
+        Applies a `RemovalPlan`: the connections are deleted first, then the
+        components, then the system object, each group in parallel. The next
+        group only starts if the previous one fully succeeded, so that a failure
+        never leaves connections pointing to deleted objects.
+        """  # noqa: E501
+        with tracer.start_as_current_span(
+            "icepanel.execute_removal",
+            attributes={"dataproduct.id": plan.data_product_id},
+        ) as span:
+            result = await self._execute_removal(plan)
+            _record_result(span, result)
+        return result
+
+    async def _execute_removal(self, plan: RemovalPlan) -> ExecutionResult:
+        result = ExecutionResult()
+        groups = [
+            ("connections", plan.connection_ids),
+            ("objects", plan.component_ids),
+            ("objects", [plan.system_id] if plan.system_id is not None else []),
+        ]
+        for object_type, ids in groups:
+            await self._run_all(
+                [(object_type, obj_id) for obj_id in ids],
+                self._apply_deletion,
+                result,
+            )
+            if not result.succeeded:
+                break
+        if plan.system_id is not None:
+            await self._forget_fingerprints(
+                [*plan.connection_ids, *plan.component_ids, plan.system_id]
+            )
+
+        logger.info(
+            f"Data product {plan.data_product_id} removed: {result.deleted} deleted, "
+            f"{len(result.errors)} failed"
+        )
+        return result
+
+    async def _run_all(
+        self,
+        operations: Sequence[Any],
+        apply: Callable[[Any], Awaitable[str]],
+        result: ExecutionResult,
+    ) -> None:
+        async def run(operation: Any) -> None:
+            action, target = self._describe(operation)
+            if action == Action.NOOP:
+                # nothing to send, so no need to wait for a slot
+                written = await apply(operation)
+            else:
+                async with self._semaphore:
+                    try:
+                        written = await apply(operation)
+                    except Exception as ex:
+                        logger.error(f"IcePanel {action} {target} failed: {ex}")
+                        result.errors.append(OperationError(target, action, str(ex)))
+                        await self._notify(target, action, str(ex))
+                        return
+                await self._notify(target, action, None)
+            kind = "object"
+            if isinstance(operation, ObjectOperation):
+                result.object_ids[operation.key] = written
+            elif isinstance(operation, ConnectionOperation):
+                result.connection_ids[operation.key] = written
+                kind = "connection"
+            elif operation[0] == "connections":
+                kind = "connection"
+            result.record(action)
+            _OPERATION_COUNTERS[kind, action].inc()
+
+        await asyncio.gather(*(run(operation) for operation in operations))
+
+    @staticmethod
+    def _describe(operation: Any) -> tuple[Action, str]:
+        if isinstance(operation, ObjectOperation):
+            return operation.action, operation.key
+        if isinstance(operation, ConnectionOperation):
+            return operation.action, operation.key
+        object_type, obj_id = operation
+        return Action.DELETE, f"{object_type}/{obj_id}"
+
+    async def _notify(self, target: str, action: Action, error: str | None) -> None:
+        if self._on_progress is not None:
+            await self._on_progress(target, action, error)
+
+    async def _record_fingerprints(
+        self, plan: ReconciliationPlan, result: ExecutionResult
+    ) -> None:
+        if self._fingerprints is None:
+            return
+        written_ids = {**result.object_ids, **result.connection_ids}
+        written = [
+            Fingerprint(
+                operation.key,
+                written_ids[operation.key],
+                fingerprint(operation.desired),
+            )
+            for operation in plan.operations()
+            if operation.action in (Action.CREATE, Action.UPDATE)
+            and operation.key in written_ids
+        ]
+        if not written:
+            return
+        try:
+            await asyncio.to_thread(self._fingerprints.record_many, written)
+        except Exception as ex:
+            # only an optimization: the next plans diff against IcePanel anyway
+            logger.warning(f"Unable to record the IcePanel fingerprints: {ex}")
+
+    async def _forget_fingerprints(self, icepanel_ids: list[str]) -> None:
+        if self._fingerprints is None:
+            return
+        try:
+            await asyncio.to_thread(self._fingerprints.forget, icepanel_ids)
+        except Exception as ex:
+            logger.warning(f"Unable to forget the IcePanel fingerprints: {ex}")
+
+    async def _apply_deletion(self, operation: tuple[str, str]) -> str:
+        object_type, obj_id = operation
+        return await self._client.delete(object_type, obj_id)
+
+    async def _apply_object(self, operation: ObjectOperation) -> str:
+        if operation.action == Action.CREATE:
+            return await self._client.post_component(operation.desired)
+        assert operation.current_id is not None
+        if operation.action == Action.UPDATE:
+            await self._client.patch(operation.changes, "objects", operation.current_id)
+        return operation.current_id
+
+    async def _apply_connection(self, operation: ConnectionOperation) -> str:
+        if operation.action == Action.CREATE:
+            return await self._client.post_connection(operation.desired)
+        assert operation.current_id is not None
+        if operation.action == Action.UPDATE:
+            await self._client.patch(
+                operation.changes, "connections", operation.current_id
+            )
+        return operation.current_id
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import codecs
+import hashlib
+import json
+import re
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+from pydantic import ValidationError as PydanticValidationError
+
+from src.models.icepanel import Domain, IcePanelData, ModelConnection, ModelObject
+
+# sections of the export the adapter reads, and the model of their entries
+KEPT_SECTIONS: Dict[str, Type[BaseModel]] = {
+    "domains": Domain,
+    "modelObjects": ModelObject,
+    "modelConnections": ModelConnection,
+}
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# the key of a section entry, when it has no escape sequence: the first one, and
+# the next ones after their separator
+_FIRST_KEY = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_NEXT_KEY = re.compile(r'[ \t\n\r]*,[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+# the C scanner behind JSONDecoder.raw_decode
+_SCAN = _DECODER.scan_once
+
+# consumed text is dropped from the buffer once it is longer than this
+_COMPACT_THRESHOLD = 1 << 16
+
+# parser states
+_START = "start"
+_TOP_KEY = "top key"
+_TOP_VALUE = "top value"
+_SECTION_KEY = "section key"
+_SECTION_VALUE = "section value"
+_DONE = "done"
+
+
+class _NeedMoreData(Exception):
+    pass
+
+
+def _build_entry(section: str, key: str, entry: Any) -> BaseModel:
+    # fields outside of the model are ignored by the validation
+    try:
+        return KEPT_SECTIONS[section].model_validate(entry)
+    except PydanticValidationError as ex:
+        raise ValueError(
+            f"Unable to parse the IcePanel export: {section}.{key}: {ex}"
+        ) from ex
+
+
+def _to_export(sections: Dict[str, Dict[str, BaseModel]]) -> IcePanelData:
+    missing = [name for name in KEPT_SECTIONS if name not in sections]
+    if missing:
+        raise ValueError(
+            f"Unable to parse the IcePanel export: missing {', '.join(missing)}"
+        )
+    return IcePanelData.model_construct(
+        domains=sections["domains"],
+        modelObjects=sections["modelObjects"],
+        modelConnections=sections["modelConnections"],
+        flows={},
+        tagGroups={},
+        tags={},
+        teams={},
+    )
+
+
+class ExportReader:
+    """
+    Incremental parser of an IcePanel landscape export.
+
+    The export is a JSON object whose sections (`modelObjects`, `flows`, ...)
+    map ids to entries. The reader is fed the body chunk by chunk as it is
+    downloaded and decodes one entry at a time, so the raw body is never held
+    in memory as a whole, nor is a full dictionary of it ever built. Only the
+    `domains`, `modelObjects` and `modelConnections` sections are kept, and of
+    their entries only the fields of the matching model: every other section
+    (flows, tags, teams, ...) and every other field is dropped as soon as it has
+    been read. Peak memory is therefore the size of the kept models plus the
+    largest single entry, whatever the size of the export.
+
+    The SHA-256 of the raw body is computed along the way (`content_hash`).
+
+    Example:
+        reader = ExportReader()
+        async for chunk in response.aiter_bytes():
+            reader.feed(chunk)
+        data = reader.close()
+    """  # noqa: E501
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._hash = hashlib.sha256()
+        self._buffer = ""
+        self._pos = 0
+        # characters already dropped from the buffer
+        self._consumed = 0
+        self._state = _START
+        self._section: str | None = None
+        self._key: str | None = None
+        # whether no key was read yet in the current object
+        self._first = True
+        self._closing = False
+        self._sections: Dict[str, Dict[str, BaseModel]] = {}
+
+    @property
+    def content_hash(self) -> str:
+        return self._hash.hexdigest()
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Parses as much of the export as the data received so far allows.
+
+        Raises:
+            ValueError: If the export is not valid JSON or an entry does not
+                match its model.
+        """
+        self._hash.update(chunk)
+        self._buffer += self._decoder.decode(chunk)
+        self._parse()
+
+    def close(self) -> IcePanelData:
+        """
+        Parses the rest of the export and returns its kept sections.
+
+        Raises:
+            ValueError: If the export is truncated, is not valid JSON, lacks one
+                of the kept sections or an entry does not match its model.
+        """
+        self._buffer += self._decoder.decode(b"", final=True)
+        self._closing = True
+        self._parse()
+        if self._state != _DONE:
+            raise ValueError("Unable to parse the IcePanel export: truncated body")
+        return _to_export(self._sections)
+
+    def _parse(self) -> None:
+        try:
+            while self._state != _DONE:
+                self._step()
+        except _NeedMoreData:
+            pass
+        if self._pos > _COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos :]
+            self._consumed += self._pos
+            self._pos = 0
+        if self._state == _DONE and self._buffer[self._pos :].strip():
+            raise ValueError("Unable to parse the IcePanel export: trailing data")
+
+    def _step(self) -> None:
+        if self._state == _START:
+            self._expect("{")
+            self._first = True
+            self._state = _TOP_KEY
+        elif self._state in (_TOP_KEY, _SECTION_KEY):
+            if self._state == _SECTION_KEY:
+                self._read_entries()
+            start = self._pos
+            closing = self._peek()
+            if closing == "}":
+                self._pos += 1
+                # a closed section was the value of a top key
+                self._first = False
+                self._state = _DONE if self._state == _TOP_KEY else _TOP_KEY
+                return
+            # entries are separated by exactly one comma
+            if not self._first:
+                if closing != ",":
+                    self._fail("expecting ','")
+                self._pos += 1
+            key_start = self._pos
+            try:
+                key = self._decode()
+                if not isinstance(key, str):
+                    self._pos = key_start
+                    self._fail("expecting a key")
+                self._expect(":")
+            except _NeedMoreData:
+                # read the separator and the key again once the colon is there
+                self._pos = start
+                raise
+            self._key = key
+            self._first = False
+            self._state = _TOP_VALUE if self._state == _TOP_KEY else _SECTION_VALUE
+        elif self._state == _TOP_VALUE:
+            if self._peek() == "{":
+                self._pos += 1
+                self._section = self._key
+                if self._section in KEPT_SECTIONS:
+                    self._sections[self._section] = {}
+                self._first = True
+                self._state = _SECTION_KEY
+            else:
+                # not a section: decoded and dropped
+                self._decode()
+                self._state = _TOP_KEY
+        elif self._state == _SECTION_VALUE:
+            entry = self._decode()
+            if self._section in KEPT_SECTIONS:
+                self._sections[self._section][self._key] = _build_entry(
+                    self._section, self._key, entry
+                )
+            self._state = _SECTION_KEY
+
+    def _read_entries(self) -> None:
+        # fast path over the entries of a section: a regex match for the key and
+        # a single scanner call for the value, no state machine round trip; any
+        # other case (escaped key, end of section, incomplete entry) is left to
+        # the state machine
+        buffer = self._buffer
+        size = len(buffer)
+        pos = self._pos
+        section = self._section
+        entries = self._sections.get(section) if section is not None else None
+        entry_key = _FIRST_KEY if self._first else _NEXT_KEY
+        while True:
+            match = entry_key.match(buffer, pos)
+            if match is None:
+                break
+            try:
+                entry, end = _SCAN(buffer, match.end())
+            except (StopIteration, json.JSONDecodeError):
+                break
+            if end >= size:
+                break
+            if entries is not None:
+                key = match.group(1)
+                entries[key] = _build_entry(section, key, entry)  # type: ignore[arg-type]  # noqa: E501
+            pos = end
+            entry_key = _NEXT_KEY
+            self._first = False
+        self._pos = pos
+
+    def _peek(self) -> str:
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()  # type: ignore[union-attr]  # noqa: E501
+        if self._pos >= len(self._buffer):
+            if self._closing:
+                self._fail("unexpected end of the body")
+            raise _NeedMoreData()
+        return self._buffer[self._pos]
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            self._fail(f"expecting '{char}'")
+        self._pos += 1
+
+    def _decode(self) -> Any:
+        self._peek()
+        try:
+            value, end = _DECODER.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError as ex:
+            if self._closing:
+                raise ValueError(f"Unable to parse the IcePanel export: {ex}") from ex
+            # most likely a value split across chunks: wait for the rest
+            raise _NeedMoreData() from ex
+        if end >= len(self._buffer) and not self._closing:
+            # a number at the end of the buffer may continue in the next chunk
+            raise _NeedMoreData()
+        self._pos = end
+        return value
+
+    def _fail(self, reason: str) -> None:
+        raise ValueError(
+            "Unable to parse the IcePanel export: "
+            f"{reason} at offset {self._consumed + self._pos}"
+        )
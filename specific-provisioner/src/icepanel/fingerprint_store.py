@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable
+
+from pydantic import BaseModel
+
+from src.models.icepanel import ModelConnection
+from src.utility import json_codec
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    key TEXT PRIMARY KEY,
+    icepanel_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    written_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprints_icepanel_id ON fingerprints (icepanel_id);
+"""
+
+# fields left out of a fingerprint: the ids, assigned by IcePanel, and the
+# position in the landscape, already identified by the key
+OBJECT_UNHASHED_FIELDS = frozenset({"id", "parentId", "parentIds"})
+CONNECTION_UNHASHED_FIELDS = frozenset({"id", "originId", "targetId"})
+
+
+def fingerprint(model: BaseModel) -> str:
+    """
+    Content hash of a model object or connection, as generated by `toIcePanel()`.
+    Two models with the same fingerprint lead to the same IcePanel content.
+    """  # noqa: E501
+    unhashed = (
+        CONNECTION_UNHASHED_FIELDS
+        if isinstance(model, ModelConnection)
+        else OBJECT_UNHASHED_FIELDS
+    )
+    content = json_codec.dumps(model.model_dump(exclude=set(unhashed)), sort_keys=True)
+    return hashlib.sha256(content).hexdigest()
+
+
+@dataclass
+class Fingerprint:
+    """
+    What the adapter last wrote to IcePanel for a data product, component or
+    connection.
+
+    Attributes:
+        key (str): Witboost id of the data product or component, or
+            `origin -[name]-> target` for a connection.
+        icepanel_id (str): IcePanel id of the written object or connection.
+        fingerprint (str): The `fingerprint` of the written content.
+        written_at (float): Epoch time of the write.
+    """  # noqa: E501
+
+    key: str
+    icepanel_id: str
+    fingerprint: str
+    written_at: float = field(default_factory=time.time)
+
+
+class FingerprintStore:
+    """
+    Durable record of the content the adapter last wrote to IcePanel, kept in a
+    local SQLite database shared by the workers of the provisioner.
+
+    Plans are diffed against a landscape snapshot that may predate the latest
+    writes (the snapshot is cached, and other workers write too): a fingerprint
+    written after the snapshot was taken tells that an object the snapshot
+    reports as different or missing was already written as desired, so the
+    write can be skipped (see `planner.skip_already_written`).
+
+    The methods are blocking: call them from a worker thread (`asyncio.to_thread`)
+    when running inside the event loop. A single connection is shared, guarded by
+    a lock.
+
+    Args:
+        path (str): Path of the database file, or `:memory:` for a throwaway store.
+    """  # noqa: E501
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def open(self) -> None:
+        if self._connection is not None:
+            return
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        self._connection = connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> FingerprintStore:
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise RuntimeError("The fingerprint store is not open")
+        return self._connection
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Fingerprint]:
+        """
+        Returns the fingerprints recorded for some keys; unknown keys are left out.
+        """  # noqa: E501
+        keys = list(keys)
+        found: Dict[str, Fingerprint] = {}
+        with self._lock:
+            db = self._db()
+            # stay below the SQLite limit of bound parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = db.execute(
+                    "SELECT key, icepanel_id, fingerprint, written_at "
+                    f"FROM fingerprints WHERE key IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    found[row[0]] = Fingerprint(*row)
+        return found
+
+    def record_many(self, fingerprints: Iterable[Fingerprint]) -> None:
+        """
+        Saves fingerprints, replacing the previous one of each key.
+        """
+        with self._lock, self._db() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO fingerprints "
+                "(key, icepanel_id, fingerprint, written_at) VALUES (?, ?, ?, ?)",
+                [
+                    (fp.key, fp.icepanel_id, fp.fingerprint, fp.written_at)
+                    for fp in fingerprints
+                ],
+            )
+
+    def forget(self, icepanel_ids: Iterable[str]) -> None:
+        """
+        Drops the fingerprints of IcePanel objects or connections that were
+        deleted.
+        """
+        with self._lock, self._db() as db:
+            db.executemany(
+                "DELETE FROM fingerprints WHERE icepanel_id = ?",
+                [(icepanel_id,) for icepanel_id in icepanel_ids],
+            )
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from contextlib import AbstractContextManager, nullcontext
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from src.models.icepanel import Domain, IcePanelData, ModelConnection, ModelObject
+from src.utility.logger import get_logger
+
+logger = get_logger()
+
+ObjectKey = Tuple[Optional[str], str]
+ConnectionKey = Tuple[str, str, str]
+
+
+class LandscapeGoneError(Exception):
+    """
+    Raised by `LandscapeView.reading` when the landscape snapshot the view reads
+    was dropped meanwhile: read the landscape again.
+    """
+
+
+class LandscapeView(Protocol):
+    """
+    The lookups the planner makes on a landscape, whatever holds it: an
+    in-memory `LandscapeIndex`, or a snapshot shared between processes (see
+    `shared_snapshot.StoredLandscapeIndex`).
+    """
+
+    root: ModelObject | None
+
+    def get_object(self, parent_id: str | None, name: str) -> ModelObject | None:
+        ...
+
+    def get_connection(
+        self, origin_id: str, target_id: str, name: str
+    ) -> ModelConnection | None:
+        ...
+
+    def get_children(self, parent_id: str) -> List[ModelObject]:
+        ...
+
+    def get_connections_of(self, object_id: str) -> List[ModelConnection]:
+        ...
+
+    def get_domain(self, name: str) -> Domain | None:
+        ...
+
+    def reading(self) -> AbstractContextManager[None]:
+        """
+        Makes the lookups of the block, from the calling thread, read the same
+        snapshot until it exits.
+
+        Raises:
+            LandscapeGoneError: If the snapshot is not readable anymore.
+        """
+        ...
+
+
+class LandscapeIndex:
+    """
+    Hash-indexed, read-only view of an IcePanel landscape export.
+
+    The export lists objects and connections as flat dictionaries keyed by their
+    IcePanel id; reconciling a data product against it needs lookups by natural
+    key instead. The index is built once per export in O(objects + connections),
+    after which every lookup is O(1):
+
+    - model objects by id, by (parentId, name) and by parentId
+    - model connections by id, by (originId, targetId, name) and by endpoint id
+    - domains by name
+
+    When the export holds several objects (or connections) with the same natural
+    key, the first one wins and a warning is logged.
+
+    Args:
+        data (IcePanelData): The parsed landscape export.
+    """  # noqa: E501
+
+    def __init__(self, data: IcePanelData) -> None:
+        self.data = data
+        self.objects_by_id: Dict[str, ModelObject] = {}
+        self.objects_by_key: Dict[ObjectKey, ModelObject] = {}
+        self.children_by_parent: Dict[Optional[str], List[ModelObject]] = {}
+        self.connections_by_id: Dict[str, ModelConnection] = {}
+        self.connections_by_key: Dict[ConnectionKey, ModelConnection] = {}
+        self.connections_by_endpoint: Dict[str, List[ModelConnection]] = {}
+        self.domains_by_name: Dict[str, Domain] = {}
+        self.root: ModelObject | None = None
+
+        for obj in data.modelObjects.values():
+            self.objects_by_id[obj.id] = obj
+            self.children_by_parent.setdefault(obj.parentId, []).append(obj)
+            key = (obj.parentId, obj.name)
+            if key in self.objects_by_key:
+                logger.warning(f"Duplicated IcePanel object {key}, keeping the first")
+            else:
+                self.objects_by_key[key] = obj
+            if obj.type == "root" and self.root is None:
+                self.root = obj
+
+        for conn in data.modelConnections.values():
+            self.connections_by_id[conn.id] = conn
+            self.connections_by_endpoint.setdefault(conn.originId, []).append(conn)
+            if conn.targetId != conn.originId:
+                self.connections_by_endpoint.setdefault(conn.targetId, []).append(conn)
+            conn_key = (conn.originId, conn.targetId, conn.name)
+            if conn_key in self.connections_by_key:
+                logger.warning(
+                    f"Duplicated IcePanel connection {conn_key}, keeping the first"
+                )
+            else:
+                self.connections_by_key[conn_key] = conn
+
+        for domain in data.domains.values():
+            self.domains_by_name.setdefault(domain.name, domain)
+
+    def get_object(self, parent_id: str | None, name: str) -> ModelObject | None:
+        """
+        Returns the object called `name` whose parent is `parent_id`, if any.
+        """
+        return self.objects_by_key.get((parent_id, name))
+
+    def get_connection(
+        self, origin_id: str, target_id: str, name: str
+    ) -> ModelConnection | None:
+        """
+        Returns the connection called `name` from `origin_id` to `target_id`, if any.
+        """  # noqa: E501
+        return self.connections_by_key.get((origin_id, target_id, name))
+
+    def get_children(self, parent_id: str) -> List[ModelObject]:
+        """
+        Returns the objects whose parent is `parent_id`.
+        """
+        return self.children_by_parent.get(parent_id, [])
+
+    def get_connections_of(self, object_id: str) -> List[ModelConnection]:
+        """
+        Returns the connections starting from or ending in `object_id`.
+        """
+        return self.connections_by_endpoint.get(object_id, [])
+
+    def get_domain(self, name: str) -> Domain | None:
+        """
+        Returns the domain called `name`, if any.
+        """
+        return self.domains_by_name.get(name)
+
+    def reading(self) -> AbstractContextManager[None]:
+        # held in memory: never dropped
+        return nullcontext()
@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any, Iterator, List, Mapping
+
+from pydantic import BaseModel
+
+from src.icepanel.fingerprint_store import Fingerprint, fingerprint
+from src.icepanel.landscape_index import LandscapeView
+from src.models.data_product_descriptor import (
+    Component,
+    DataProduct,
+    OutputPort,
+    Workload,
+)
+from src.models.icepanel import ModelConnection, ModelObject, buildConnection
+
+DEFAULT_DOMAIN_NAME = "Default domain"
+
+# fields computed by IcePanel (or that identify the object) and never diffed
+OBJECT_IGNORED_FIELDS = frozenset({"id", "parentIds"})
+CONNECTION_IGNORED_FIELDS = frozenset({"id"})
+
+
+class Action(StrEnum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    NOOP = "noop"
+
+
+@dataclass
+class ObjectOperation:
+    """
+    What to do with one IcePanel model object.
+
+    Attributes:
+        action (Action): Whether the object must be created, updated or left alone.
+        key (str): Witboost id of the data product or component the object maps to.
+        desired (ModelObject): The object as the adapter wants it to be.
+        current_id (str | None): IcePanel id of the existing object, if any.
+        changes (dict): For updates, the fields that differ and their new value.
+    """  # noqa: E501
+
+    action: Action
+    key: str
+    desired: ModelObject
+    current_id: str | None = None
+    changes: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ConnectionOperation:
+    """
+    What to do with one IcePanel model connection.
+
+    The endpoints are expressed as Witboost component ids (`origin`, `target`):
+    they are resolved to IcePanel ids once the objects have been written.
+    """
+
+    action: Action
+    origin: str
+    target: str
+    desired: ModelConnection
+    current_id: str | None = None
+    changes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.origin} -[{self.desired.name}]-> {self.target}"
+
+
+@dataclass
+class ReconciliationPlan:
+    """
+    Minimal set of IcePanel writes that brings a landscape in line with a data
+    product: the data product system object, its components and the connections
+    between them.
+    """  # noqa: E501
+
+    data_product_id: str
+    system: ObjectOperation
+    components: List[ObjectOperation] = field(default_factory=list)
+    connections: List[ConnectionOperation] = field(default_factory=list)
+
+    def operations(self) -> Iterator[ObjectOperation | ConnectionOperation]:
+        yield self.system
+        yield from self.components
+        yield from self.connections
+
+    def count(self, action: Action) -> int:
+        return sum(1 for op in self.operations() if op.action == action)
+
+    @property
+    def has_changes(self) -> bool:
+        return any(op.action != Action.NOOP for op in self.operations())
+
+
+@dataclass
+class RemovalPlan:
+    """
+    IcePanel deletions that remove a data product from a landscape: the
+    connections touching its objects first, then its components, then its
+    system object. An empty plan means the data product is not drawn.
+    """  # noqa: E501
+
+    data_product_id: str
+    system_id: str | None = None
+    component_ids: List[str] = field(default_factory=list)
+    connection_ids: List[str] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return self.system_id is not None
+
+
+@dataclass
+class BatchPlan:
+    """
+    Plans of several data products, all diffed against the same landscape
+    snapshot.
+
+    Attributes:
+        plans (List[ReconciliationPlan]): One plan per data product that can be
+            provisioned, in the order of the request.
+        errors (dict[str, str]): Why the other data products cannot be
+            provisioned, keyed by data product id.
+    """  # noqa: E501
+
+    plans: List[ReconciliationPlan] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def has_changes(self) -> bool:
+        return any(plan.has_changes for plan in self.plans)
+
+
+def diff_fields(
+    current: BaseModel, desired: BaseModel, ignored: frozenset[str]
+) -> dict[str, Any]:
+    """
+    Compares two models field by field.
+
+    Args:
+        current (BaseModel): The model as it is in IcePanel.
+        desired (BaseModel): The model as the adapter wants it to be.
+        ignored (frozenset[str]): Fields left out of the comparison.
+
+    Returns:
+        dict[str, Any]: The fields whose value differs, mapped to the desired value.
+            An empty dictionary means the two models are equivalent.
+    """  # noqa: E501
+    current_values = current.model_dump()
+    desired_values = desired.model_dump()
+    return {
+        name: value
+        for name, value in desired_values.items()
+        if name not in ignored and current_values.get(name) != value
+    }
+
+
+def _plan_object(
+    key: str, desired: ModelObject, current: ModelObject | None
+) -> ObjectOperation:
+    if current is None:
+        return ObjectOperation(action=Action.CREATE, key=key, desired=desired)
+    changes = diff_fields(current, desired, OBJECT_IGNORED_FIELDS)
+    return ObjectOperation(
+        action=Action.UPDATE if changes else Action.NOOP,
+        key=key,
+        desired=desired,
+        current_id=current.id,
+        changes=changes,
+    )
+
+
+def component_relationships(component: Component) -> dict[str, list]:
+    """
+    Returns the relationships of a component that are drawn as IcePanel
+    connections, keyed by connection name.
+    """
+    if isinstance(component, Workload):
+        return {
+            "dependsOn": component.dependsOn,
+            "readsFrom": component.readsFrom or [],
+        }
+    if isinstance(component, OutputPort):
+        return {"dependsOn": component.dependsOn}
+    return {}
+
+
+def plan_data_product(
+    data_product: DataProduct,
+    landscape: LandscapeView,
+    domain_name: str = DEFAULT_DOMAIN_NAME,
+) -> ReconciliationPlan:
+    """
+    Builds the IcePanel objects and connections wanted for a data product and
+    diffs them against the current landscape.
+
+    The data product is drawn as a system under the landscape root, each of its
+    components as a child of that system, and every `dependsOn`/`readsFrom`
+    reference between components of the same data product as a connection.
+    Existing objects are matched by (parentId, name), existing connections by
+    (originId, targetId, name).
+
+    Args:
+        data_product (DataProduct): The data product to provision.
+        landscape (LandscapeView): The current state of the landscape.
+        domain_name (str, optional): The IcePanel domain the objects belong to.
+
+    Returns:
+        ReconciliationPlan: The create, update and no-op operations.
+
+    Raises:
+        ValueError: If the landscape has no root object or no such domain.
+    """  # noqa: E501
+    domain = landscape.get_domain(domain_name)
+    if domain is None:
+        raise ValueError(f"Domain '{domain_name}' not found in the IcePanel landscape")
+    if landscape.root is None:
+        raise ValueError("Root object not found in the IcePanel landscape")
+
+    desired_system = data_product.toIcePanel(domain.id, landscape.root.id)
+    system = _plan_object(
+        data_product.id,
+        desired_system,
+        landscape.get_object(landscape.root.id, desired_system.name),
+    )
+    plan = ReconciliationPlan(data_product_id=data_product.id, system=system)
+
+    # IcePanel ids of the components that already exist, keyed by Witboost id
+    existing_ids: dict[str, str] = {}
+    for component in data_product.components:
+        desired = component.toIcePanel(domain.id, system.current_id or "")
+        if desired is None:
+            continue
+        current = None
+        if system.current_id is not None:
+            current = landscape.get_object(system.current_id, desired.name)
+        operation = _plan_object(component.id, desired, current)
+        plan.components.append(operation)
+        if operation.current_id is not None:
+            existing_ids[component.id] = operation.current_id
+
+    planned = {op.key for op in plan.components}
+    seen: set[tuple[str, str, str]] = set()
+    for component in data_product.components:
+        if component.id not in planned:
+            continue
+        for name, references in component_relationships(component).items():
+            for reference in references:
+                # only references to components of the same data product (plain
+                # ids) are drawn; readsFrom entries pointing outside of it are
+                # skipped
+                if not isinstance(reference, str) or reference not in planned:
+                    continue
+                if (component.id, reference, name) in seen:
+                    continue
+                seen.add((component.id, reference, name))
+
+                origin_id = existing_ids.get(component.id)
+                target_id = existing_ids.get(reference)
+                desired_conn = buildConnection(name, origin_id or "", target_id or "")
+                current_conn = None
+                if origin_id is not None and target_id is not None:
+                    current_conn = landscape.get_connection(origin_id, target_id, name)
+
+                if current_conn is None:
+                    plan.connections.append(
+                        ConnectionOperation(
+                            action=Action.CREATE,
+                            origin=component.id,
+                            target=reference,
+                            desired=desired_conn,
+                        )
+                    )
+                    continue
+                changes = diff_fields(
+                    current_conn, desired_conn, CONNECTION_IGNORED_FIELDS
+                )
+                plan.connections.append(
+                    ConnectionOperation(
+                        action=Action.UPDATE if changes else Action.NOOP,
+                        origin=component.id,
+                        target=reference,
+                        desired=desired_conn,
+                        current_id=current_conn.id,
+                        changes=changes,
+                    )
+                )
+
+    return plan
+
+
+def skip_already_written(
+    plan: ReconciliationPlan,
+    fingerprints: Mapping[str, Fingerprint],
+    taken_at: float,
+) -> int:
+    """
+    Turns into no-ops the operations whose desired content the adapter already
+    wrote after the landscape snapshot was taken.
+
+    A plan is diffed against a snapshot that may predate the latest writes. When
+    the fingerprint recorded for an operation matches its desired content and is
+    more recent than the snapshot, the snapshot is merely lagging behind: an
+    update would PATCH the same content again, a creation would draw a
+    duplicate. Fingerprints older than the snapshot are ignored, so changes made
+    in IcePanel since the last write are still reconciled.
+
+    Args:
+        plan (ReconciliationPlan): The plan to amend in place.
+        fingerprints (Mapping[str, Fingerprint]): The recorded fingerprints, keyed
+            by operation key.
+        taken_at (float): Epoch time the snapshot was taken or last revalidated.
+
+    Returns:
+        int: The number of operations skipped.
+    """  # noqa: E501
+    skipped = 0
+    for operation in plan.operations():
+        if operation.action not in (Action.CREATE, Action.UPDATE):
+            continue
+        known = fingerprints.get(operation.key)
+        if known is None or known.written_at <= taken_at:
+            continue
+        if operation.action == Action.UPDATE and (
+            known.icepanel_id != operation.current_id
+        ):
+            continue
+        if known.fingerprint != fingerprint(operation.desired):
+            continue
+        operation.action = Action.NOOP
+        operation.current_id = known.icepanel_id
+        operation.changes = {}
+        skipped += 1
+    return skipped
+
+
+def plan_data_product_removal(
+    data_product: DataProduct,
+    landscape: LandscapeView,
+    domain_name: str = DEFAULT_DOMAIN_NAME,
+) -> RemovalPlan:
+    """
+    Finds the IcePanel objects and connections drawn for a data product.
+
+    Args:
+        data_product (DataProduct): The data product to remove.
+        landscape (LandscapeView): The current state of the landscape.
+        domain_name (str, optional): The IcePanel domain the objects belong to.
+
+    Returns:
+        RemovalPlan: What to delete, possibly nothing.
+
+    Raises:
+        ValueError: If the landscape has no root object or no such domain.
+    """  # noqa: E501
+    domain = landscape.get_domain(domain_name)
+    if domain is None:
+        raise ValueError(f"Domain '{domain_name}' not found in the IcePanel landscape")
+    if landscape.root is None:
+        raise ValueError("Root object not found in the IcePanel landscape")
+
+    plan = RemovalPlan(data_product_id=data_product.id)
+    desired_system = data_product.toIcePanel(domain.id, landscape.root.id)
+    system = landscape.get_object(landscape.root.id, desired_system.name)
+    if system is None:
+        return plan
+
+    plan.system_id = system.id
+    plan.component_ids = [child.id for child in landscape.get_children(system.id)]
+    connection_ids: dict[str, None] = {}
+    for object_id in [system.id, *plan.component_ids]:
+        for connection in landscape.get_connections_of(object_id):
+            connection_ids[connection.id] = None
+    plan.connection_ids = list(connection_ids)
+    return plan
+
+
+def plan_data_products(
+    data_products: List[DataProduct],
+    landscape: LandscapeView,
+    domain_name: str = DEFAULT_DOMAIN_NAME,
+) -> BatchPlan:
+    """
+    Plans several data products against the same landscape.
+
+    Two data products drawn as the same system object (i.e. with the same name)
+    would overwrite each other, so only the first one is planned and the others
+    are reported as errors.
+
+    Args:
+        data_products (List[DataProduct]): The data products to provision.
+        landscape (LandscapeView): The current state of the landscape.
+        domain_name (str, optional): The IcePanel domain the objects belong to.
+
+    Returns:
+        BatchPlan: The plans, and the data products that cannot be provisioned.
+    """  # noqa: E501
+    batch = BatchPlan()
+    # data product id owning each system object name
+    systems: dict[str, str] = {}
+    for data_product in data_products:
+        try:
+            plan = plan_data_product(data_product, landscape, domain_name)
+        except ValueError as ex:
+            batch.errors[data_product.id] = str(ex)
+            continue
+        name = plan.system.desired.name
+        owner = systems.setdefault(name, data_product.id)
+        if owner != data_product.id:
+            batch.errors[data_product.id] = (
+                f"Data product {owner} of the same batch is also drawn as "
+                f"system '{name}'"
+            )
+            continue
+        batch.plans.append(plan)
+    return batch
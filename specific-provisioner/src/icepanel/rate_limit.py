@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict
+
+# statuses worth retrying: throttled, or a transient server-side failure
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: at most `burst` calls at once, refilled at `rate`
+    calls per second.
+
+    Callers reserve a token and sleep until it is theirs, so waiting callers are
+    served in order and the limiter never needs a lock: reservations happen
+    between two awaits of the single event loop thread. A throttled response
+    pauses the bucket (see `pause`), holding back every caller that shares it.
+
+    Args:
+        rate (float): Calls per second; 0 disables the limiter.
+        burst (int): Calls allowed at once after an idle period.
+        clock (Callable[[], float], optional): Monotonic clock, overridable in tests.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = float("-inf")
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns how many seconds to wait before using it.
+        """
+        now = self._clock()
+        wait = max(self._paused_until - now, 0.0)
+        if self.rate <= 0:
+            return wait
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            wait = max(wait, -self._tokens / self.rate)
+        return wait
+
+    async def acquire(self) -> float:
+        """
+        Waits for a token.
+
+        Returns:
+            float: The seconds spent waiting.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds every caller back for `seconds`, e.g. as asked by a `Retry-After`.
+        """
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+# limiters shared by every client using the same API key, keyed by its digest
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def shared_bucket(api_key: str, rate: float, burst: int) -> TokenBucket:
+    """
+    Returns the limiter of an API key, creating it on first use: IcePanel
+    enforces its limits per key, so every client using the key must share it.
+    """
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    bucket = _buckets.get(key)
+    if bucket is None:
+        bucket = _buckets[key] = TokenBucket(rate, burst)
+    return bucket
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses a `Retry-After` header, given in seconds or as an HTTP date.
+
+    Returns:
+        float | None: The seconds to wait, None if the header is missing or
+            invalid.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How failed IcePanel calls are retried.
+
+    Attributes:
+        max_attempts (int): Calls made at most, the first included; 1 disables
+            retries.
+        base_delay (float): Backoff before the first retry, doubled at every
+            further attempt.
+        max_delay (float): Longest backoff. A `Retry-After` asking for longer
+            makes the call fail instead of waiting.
+    """  # noqa: E501
+
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """
+        Returns the seconds to wait before retrying after the given failed
+        attempt (1 for the first call), or None if the call must not be retried.
+
+        The backoff is exponential with full jitter, so that callers throttled
+        together do not retry together; a `Retry-After` is a lower bound.
+        """  # noqa: E501
+        if attempt >= self.max_attempts:
+            return None
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, ceiling)
+        return max(delay, retry_after or 0.0)
+
+
+@dataclass
+class RetryStats:
+    """
+    Counters of the calls made by an `IcePanelClient`.
+
+    Attributes:
+        calls (int): HTTP calls sent, retries included.
+        retries (int): Calls sent again after a failure.
+        throttled (int): Calls IcePanel answered with 429 Too Many Requests.
+        gave_up (int): Failed calls not retried (any more).
+        limiter_wait (float): Seconds spent waiting for the rate limiter.
+        backoff_wait (float): Seconds spent backing off before retries.
+    """
+
+    calls: int = 0
+    retries: int = 0
+    throttled: int = 0
+    gave_up: int = 0
+    limiter_wait: float = 0.0
+    backoff_wait: float = 0.0
@@ -0,0 +1,726 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Iterator, List, Type, TypeVar
+
+from pydantic import BaseModel
+
+from src.icepanel.client import IcePanelClient
+from src.icepanel.landscape_index import LandscapeGoneError
+from src.icepanel.snapshot_cache import LandscapeSnapshot, LandscapeSnapshotCache
+from src.models.icepanel import Domain, IcePanelData, ModelConnection, ModelObject
+from src.utility import json_codec
+from src.utility.logger import get_logger
+
+logger = get_logger()
+
+M = TypeVar("M", bound=BaseModel)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    landscape_id TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    taken_at REAL NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot_epochs (
+    landscape_id TEXT PRIMARY KEY,
+    epoch INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refresh_leases (
+    landscape_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS write_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot_domains (
+    landscape_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (landscape_id, generation, id)
+);
+CREATE TABLE IF NOT EXISTS snapshot_objects (
+    landscape_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    parent_id TEXT,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (landscape_id, generation, id)
+);
+CREATE INDEX IF NOT EXISTS snapshot_objects_key
+    ON snapshot_objects (landscape_id, generation, parent_id, name);
+CREATE TABLE IF NOT EXISTS snapshot_connections (
+    landscape_id TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    origin_id TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (landscape_id, generation, id)
+);
+CREATE INDEX IF NOT EXISTS snapshot_connections_key
+    ON snapshot_connections (landscape_id, generation, origin_id, target_id, name);
+CREATE INDEX IF NOT EXISTS snapshot_connections_target
+    ON snapshot_connections (landscape_id, generation, target_id);
+"""
+
+TAKE_LEASE = (
+    "INSERT INTO {table} ({key}, owner, expires_at) VALUES (?, ?, ?) "
+    "ON CONFLICT ({key}) DO UPDATE SET owner = excluded.owner, "
+    "expires_at = excluded.expires_at WHERE {table}.owner = excluded.owner "
+    "OR {table}.expires_at < ?"
+)
+BUMP_EPOCH = (
+    "INSERT INTO snapshot_epochs (landscape_id, epoch) VALUES (?, 1) "
+    "ON CONFLICT (landscape_id) DO UPDATE SET epoch = epoch + 1"
+)
+ROW_TABLES = ("snapshot_domains", "snapshot_objects", "snapshot_connections")
+
+# generations kept besides the current one, for the readers that started
+# planning against the previous one (see `SharedSnapshotStore.reading`)
+KEPT_GENERATIONS = 1
+
+
+@dataclass(frozen=True)
+class SnapshotHead:
+    """
+    The current snapshot of a landscape in a `SharedSnapshotStore`.
+
+    Attributes:
+        landscape_id (str): The landscape.
+        generation (int): Incremented at every publication; rows of the snapshot
+            are tagged with it.
+        content_hash (str): SHA-256 of the raw export body.
+        etag (str | None): ETag returned by IcePanel, if any.
+        last_modified (str | None): Last-Modified returned by IcePanel, if any.
+        taken_at (float): Epoch time IcePanel was last known to hold the snapshot.
+        refreshed_at (float): Epoch time of the last (re)validation, 0 once
+            expired.
+    """  # noqa: E501
+
+    landscape_id: str
+    generation: int
+    content_hash: str
+    etag: str | None
+    last_modified: str | None
+    taken_at: float
+    refreshed_at: float
+
+
+def _body(model: BaseModel) -> bytes:
+    return json_codec.dumps(model.model_dump())
+
+
+class SharedSnapshotStore:
+    """
+    Landscape snapshots kept in a SQLite database shared by the worker processes
+    of the provisioner, so that the export is downloaded and parsed once for all
+    of them.
+
+    Objects, connections and domains are stored one row each, indexed on the
+    natural keys the planner looks up: a worker reads and decodes only the rows
+    it needs instead of holding a parsed copy of the whole landscape. Every
+    publication writes a new generation of rows in a single transaction and
+    drops the older ones but the previous, which readers may still be using.
+
+    A lease per landscape elects the single process allowed to download it, and
+    an epoch per landscape, bumped by `expire`, tells a refresh that a write
+    happened while it was in flight. Write leases, on the keys of
+    `write_scheduler.subtree_keys`, keep two processes from writing to the same
+    part of a landscape at once.
+
+    The methods are blocking: call them from a worker thread (`asyncio.to_thread`)
+    when running inside the event loop, planning included. Writes go through a
+    single connection per process, guarded by a lock; reads use a read-only
+    connection per thread, so that they never wait for a publication (except
+    in a `:memory:` store, which only the writing connection sees).
+
+    Args:
+        path (str): Path of the database file, on storage shared by the workers.
+    """  # noqa: E501
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # reentrant: `reading` holds it around the lookups of a :memory: store
+        self._lock = threading.RLock()
+        self._connection: sqlite3.Connection | None = None
+        # read-only connections, by thread
+        self._readers: Dict[int, sqlite3.Connection] = {}
+        self._readers_lock = threading.Lock()
+
+    def open(self) -> None:
+        if self._connection is not None:
+            return
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        self._connection = connection
+
+    def close(self) -> None:
+        with self._readers_lock:
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> SharedSnapshotStore:
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise RuntimeError("The shared snapshot store is not open")
+        return self._connection
+
+    def _reader(self) -> sqlite3.Connection | None:
+        self._db()  # raises if the store is not open
+        if self.path == ":memory:":
+            return None
+        thread = threading.get_ident()
+        with self._readers_lock:
+            reader = self._readers.get(thread)
+            if reader is None:
+                reader = sqlite3.connect(
+                    f"{Path(self.path).absolute().as_uri()}?mode=ro",
+                    uri=True,
+                    check_same_thread=False,
+                    timeout=10,
+                )
+                self._readers[thread] = reader
+        return reader
+
+    def _query(self, sql: str, parameters: tuple) -> List[tuple]:
+        reader = self._reader()
+        if reader is None:
+            with self._lock:
+                return self._db().execute(sql, parameters).fetchall()
+        return reader.execute(sql, parameters).fetchall()
+
+    @contextmanager
+    def reading(self, head: SnapshotHead) -> Iterator[None]:
+        """
+        Runs the reads of the block, made from the calling thread, in a single
+        read transaction: they all see the rows of `head`, even if publications
+        drop its generation meanwhile. A `:memory:` store holds the writer lock
+        instead.
+
+        Raises:
+            LandscapeGoneError: If the generation of `head` was already dropped.
+        """  # noqa: E501
+        reader = self._reader()
+        if reader is None:
+            with self._lock:
+                self._check_retained(self._db(), head)
+                yield
+            return
+        if reader.in_transaction:
+            # nested: the outer block already reads a consistent snapshot
+            yield
+            return
+        reader.execute("BEGIN")
+        try:
+            self._check_retained(reader, head)
+            yield
+        finally:
+            reader.rollback()
+
+    def _check_retained(self, db: sqlite3.Connection, head: SnapshotHead) -> None:
+        row = db.execute(
+            "SELECT generation FROM snapshots WHERE landscape_id = ?",
+            (head.landscape_id,),
+        ).fetchone()
+        if row is None or head.generation < row[0] - KEPT_GENERATIONS:
+            raise LandscapeGoneError(
+                f"Generation {head.generation} of the snapshot of landscape "
+                f"{head.landscape_id} was dropped"
+            )
+
+    def head(self, landscape_id: str) -> SnapshotHead | None:
+        rows = self._query(
+            "SELECT landscape_id, generation, content_hash, etag, last_modified, "
+            "taken_at, refreshed_at FROM snapshots WHERE landscape_id = ?",
+            (landscape_id,),
+        )
+        return SnapshotHead(*rows[0]) if rows else None
+
+    def heads(self) -> List[SnapshotHead]:
+        rows = self._query(
+            "SELECT landscape_id, generation, content_hash, etag, last_modified, "
+            "taken_at, refreshed_at FROM snapshots",
+            (),
+        )
+        return [SnapshotHead(*row) for row in rows]
+
+    def epoch(self, landscape_id: str) -> int:
+        rows = self._query(
+            "SELECT epoch FROM snapshot_epochs WHERE landscape_id = ?", (landscape_id,)
+        )
+        return rows[0][0] if rows else 0
+
+    def publish(
+        self,
+        landscape_id: str,
+        data: IcePanelData,
+        content_hash: str,
+        etag: str | None,
+        last_modified: str | None,
+        epoch: int,
+    ) -> SnapshotHead:
+        """
+        Stores a new snapshot of a landscape as its current one.
+
+        Args:
+            epoch (int): The `epoch` of the landscape when its download started.
+                If it changed since, a write happened meanwhile: the snapshot is
+                stored already expired, to be revalidated by the next read.
+
+        Returns:
+            SnapshotHead: The head of the new snapshot.
+        """  # noqa: E501
+        # encoded before taking the lock, which only covers the inserts
+        domains = [(d.id, d.name, _body(d)) for d in data.domains.values()]
+        objects = [
+            (o.id, o.parentId, o.name, o.type, _body(o))
+            for o in data.modelObjects.values()
+        ]
+        connections = [
+            (c.id, c.originId, c.targetId, c.name, _body(c))
+            for c in data.modelConnections.values()
+        ]
+        now = time.time()
+        with self._lock, self._db() as db:
+            row = db.execute(
+                "SELECT generation FROM snapshots WHERE landscape_id = ?",
+                (landscape_id,),
+            ).fetchone()
+            generation = (row[0] if row else 0) + 1
+            current = db.execute(
+                "SELECT epoch FROM snapshot_epochs WHERE landscape_id = ?",
+                (landscape_id,),
+            ).fetchone()
+            refreshed_at = now if (current[0] if current else 0) == epoch else 0.0
+            scope = (landscape_id, generation)
+            db.executemany(
+                "INSERT INTO snapshot_domains (landscape_id, generation, id, name, "
+                "body) VALUES (?, ?, ?, ?, ?)",
+                [(*scope, *row) for row in domains],
+            )
+            db.executemany(
+                "INSERT INTO snapshot_objects (landscape_id, generation, id, "
+                "parent_id, name, type, body) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*scope, *row) for row in objects],
+            )
+            db.executemany(
+                "INSERT INTO snapshot_connections (landscape_id, generation, id, "
+                "origin_id, target_id, name, body) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*scope, *row) for row in connections],
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO snapshots (landscape_id, generation, "
+                "content_hash, etag, last_modified, taken_at, refreshed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    landscape_id,
+                    generation,
+                    content_hash,
+                    etag,
+                    last_modified,
+                    now,
+                    refreshed_at,
+                ),
+            )
+            for table in ROW_TABLES:
+                db.execute(
+                    f"DELETE FROM {table} WHERE landscape_id = ? AND generation < ?",
+                    (landscape_id, generation - KEPT_GENERATIONS),
+                )
+        return SnapshotHead(
+            landscape_id,
+            generation,
+            content_hash,
+            etag,
+            last_modified,
+            now,
+            refreshed_at,
+        )
+
+    def touch(
+        self,
+        landscape_id: str,
+        etag: str | None,
+        last_modified: str | None,
+        epoch: int,
+    ) -> SnapshotHead | None:
+        """
+        Records that IcePanel still holds the current snapshot of a landscape.
+        Nothing is refreshed if the `epoch` changed since the revalidation
+        started.
+        """  # noqa: E501
+        now = time.time()
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE snapshots SET etag = ?, last_modified = ?, taken_at = ?, "
+                "refreshed_at = ? WHERE landscape_id = ? AND ? = COALESCE("
+                "(SELECT epoch FROM snapshot_epochs WHERE landscape_id = ?), 0)",
+                (etag, last_modified, now, now, landscape_id, epoch, landscape_id),
+            )
+        return self.head(landscape_id)
+
+    def expire(self, landscape_id: str) -> None:
+        """
+        Marks the snapshot of a landscape as stale for every process, and makes
+        the refreshes in flight store their result already expired.
+        """
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE snapshots SET refreshed_at = 0 WHERE landscape_id = ?",
+                (landscape_id,),
+            )
+            db.execute(BUMP_EPOCH, (landscape_id,))
+
+    def invalidate(self, landscape_id: str | None = None) -> int:
+        """
+        Drops the snapshot of a landscape, or of every landscape.
+
+        Returns:
+            int: The number of snapshots dropped.
+        """
+        where, parameters = "", ()
+        if landscape_id is not None:
+            where, parameters = " WHERE landscape_id = ?", (landscape_id,)
+        with self._lock, self._db() as db:
+            landscapes = [
+                row[0]
+                for row in db.execute(
+                    f"SELECT landscape_id FROM snapshots{where}", parameters
+                ).fetchall()
+            ]
+            for table in ("snapshots", *ROW_TABLES):
+                db.execute(f"DELETE FROM {table}{where}", parameters)
+            db.executemany(BUMP_EPOCH, [(landscape,) for landscape in landscapes])
+        return len(landscapes)
+
+    def try_lease(self, landscape_id: str, owner: str, seconds: float) -> bool:
+        """
+        Tries to become the process refreshing a landscape for the next `seconds`.
+
+        Returns:
+            bool: Whether the lease was granted, i.e. it was free, expired or
+                already held by `owner`.
+        """  # noqa: E501
+        now = time.time()
+        with self._lock, self._db() as db:
+            cursor = db.execute(
+                TAKE_LEASE.format(table="refresh_leases", key="landscape_id"),
+                (landscape_id, owner, now + seconds, now),
+            )
+        return cursor.rowcount == 1
+
+    def release_lease(self, landscape_id: str, owner: str) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "DELETE FROM refresh_leases WHERE landscape_id = ? AND owner = ?",
+                (landscape_id, owner),
+            )
+
+    def try_write_leases(self, keys: List[str], owner: str, seconds: float) -> bool:
+        """
+        Tries to become the process writing to the parts of a landscape named by
+        `keys` for the next `seconds`: either every lease is granted, or none.
+        Called again by their `owner`, extends the leases.
+
+        Returns:
+            bool: Whether the leases were granted.
+        """  # noqa: E501
+        now = time.time()
+        take = TAKE_LEASE.format(table="write_leases", key="key")
+        with self._lock:
+            db = self._db()
+            granted = all(
+                db.execute(take, (key, owner, now + seconds, now)).rowcount == 1
+                for key in keys
+            )
+            if granted:
+                db.commit()
+            else:
+                db.rollback()
+        return granted
+
+    def release_write_leases(self, keys: List[str], owner: str) -> None:
+        with self._lock, self._db() as db:
+            db.executemany(
+                "DELETE FROM write_leases WHERE key = ? AND owner = ?",
+                [(key, owner) for key in keys],
+            )
+
+    def load_data(self, head: SnapshotHead) -> IcePanelData:
+        """
+        Decodes a whole snapshot, for the callers that need the full export. Only
+        the domains, model objects and model connections are stored.
+        """  # noqa: E501
+        parameters = (head.landscape_id, head.generation)
+        where = "WHERE landscape_id = ? AND generation = ?"
+        domains = self._query(f"SELECT body FROM snapshot_domains {where}", parameters)
+        objects = self._query(f"SELECT body FROM snapshot_objects {where}", parameters)
+        connections = self._query(
+            f"SELECT body FROM snapshot_connections {where}", parameters
+        )
+        return IcePanelData.model_construct(
+            domains={d.id: d for d in _decode_all(Domain, domains)},
+            modelObjects={o.id: o for o in _decode_all(ModelObject, objects)},
+            modelConnections={
+                c.id: c for c in _decode_all(ModelConnection, connections)
+            },
+            flows={},
+            tagGroups={},
+            tags={},
+            teams={},
+        )
+
+
+def _decode_all(model: Type[M], rows: List[tuple]) -> List[M]:
+    return [model.model_validate_json(row[0]) for row in rows]
+
+
+class StoredLandscapeIndex:
+    """
+    `LandscapeView` over a snapshot of a `SharedSnapshotStore`: every lookup is
+    an indexed query decoding only the rows it returns, so that a worker never
+    holds the whole landscape.
+
+    Publications drop the rows of older generations: lookups that must not
+    miss them (e.g. a whole plan) run within `reading`.
+
+    Args:
+        store (SharedSnapshotStore): The store holding the snapshot.
+        head (SnapshotHead): The snapshot to read; a later publication does not
+            change what the index returns.
+    """  # noqa: E501
+
+    def __init__(self, store: SharedSnapshotStore, head: SnapshotHead) -> None:
+        self._store = store
+        self._head = head
+        self._scope = (head.landscape_id, head.generation)
+
+    def reading(self) -> AbstractContextManager[None]:
+        return self._store.reading(self._head)
+
+    @cached_property
+    def root(self) -> ModelObject | None:
+        # looked up by the planner, not when the snapshot is handed out
+        return self._first(ModelObject, "snapshot_objects", "type = ?", ("root",))
+
+    def _all(
+        self,
+        model: Type[M],
+        table: str,
+        condition: str,
+        parameters: tuple,
+        limit: int = -1,
+    ) -> List[M]:
+        # rows are read in export order: on duplicated keys the first one wins,
+        # as in `LandscapeIndex`
+        rows = self._store._query(
+            f"SELECT body FROM {table} WHERE landscape_id = ? AND generation = ? "
+            f"AND {condition} ORDER BY rowid LIMIT ?",
+            (*self._scope, *parameters, limit),
+        )
+        return _decode_all(model, rows)
+
+    def _first(
+        self, model: Type[M], table: str, condition: str, parameters: tuple
+    ) -> M | None:
+        found = self._all(model, table, condition, parameters, limit=1)
+        return found[0] if found else None
+
+    def get_object(self, parent_id: str | None, name: str) -> ModelObject | None:
+        return self._first(
+            ModelObject,
+            "snapshot_objects",
+            "parent_id IS ? AND name = ?",
+            (parent_id, name),
+        )
+
+    def get_connection(
+        self, origin_id: str, target_id: str, name: str
+    ) -> ModelConnection | None:
+        return self._first(
+            ModelConnection,
+            "snapshot_connections",
+            "origin_id = ? AND target_id = ? AND name = ?",
+            (origin_id, target_id, name),
+        )
+
+    def get_children(self, parent_id: str) -> List[ModelObject]:
+        return self._all(ModelObject, "snapshot_objects", "parent_id = ?", (parent_id,))
+
+    def get_connections_of(self, object_id: str) -> List[ModelConnection]:
+        return self._all(
+            ModelConnection,
+            "snapshot_connections",
+            "(origin_id = ? OR target_id = ?)",
+            (object_id, object_id),
+        )
+
+    def get_domain(self, name: str) -> Domain | None:
+        return self._first(Domain, "snapshot_domains", "name = ?", (name,))
+
+
+class SharedLandscapeSnapshotCache(LandscapeSnapshotCache):
+    """
+    `LandscapeSnapshotCache` whose snapshots live in a `SharedSnapshotStore`,
+    so that the worker processes of the provisioner share them: a landscape is
+    downloaded and parsed by one process at a time, whatever the number of
+    workers, and each worker only keeps the rows it is planning with.
+
+    A read returns the stored snapshot while it is younger than `ttl` seconds.
+    Past that, the process that takes the refresh lease of the landscape
+    revalidates it with IcePanel and publishes the result; the other processes
+    wait for the publication instead of downloading the export themselves.
+    Within a process, concurrent reads share one refresh as in the base class.
+    `expire` and `invalidate` apply to every process.
+
+    Args:
+        client (IcePanelClient): The client used to download the exports.
+        store (SharedSnapshotStore): Where the snapshots are shared; opened by
+            the caller.
+        ttl (float): Seconds a snapshot is considered fresh.
+        lease (float, optional): Seconds a process may spend refreshing a
+            landscape before another one can take over.
+        poll_interval (float, optional): Seconds between two checks of a refresh
+            made by another process.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        client: IcePanelClient,
+        store: SharedSnapshotStore,
+        ttl: float,
+        lease: float = 30.0,
+        poll_interval: float = 0.1,
+    ) -> None:
+        super().__init__(client, ttl)
+        self._store = store
+        self._lease = lease
+        self._poll_interval = poll_interval
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+
+    def _fresh(self, head: SnapshotHead | None) -> bool:
+        return head is not None and time.time() - head.refreshed_at < self._ttl
+
+    def _snapshot(self, head: SnapshotHead) -> LandscapeSnapshot:
+        return LandscapeSnapshot(
+            landscape_id=head.landscape_id,
+            data=None,
+            content_hash=head.content_hash,
+            etag=head.etag,
+            last_modified=head.last_modified,
+            fetched_at=head.refreshed_at,
+            taken_at=head.taken_at,
+            _index=StoredLandscapeIndex(self._store, head),
+        )
+
+    def peek(self, landscape_id: str | None = None) -> LandscapeSnapshot | None:
+        head = self._store.head(self._landscape(landscape_id))
+        return self._snapshot(head) if head is not None else None
+
+    async def get(self, landscape_id: str | None = None) -> IcePanelData:
+        landscape = self._landscape(landscape_id)
+        await self.get_snapshot(landscape)
+        head = await asyncio.to_thread(self._store.head, landscape)
+        assert head is not None
+        return await asyncio.to_thread(self._store.load_data, head)
+
+    async def get_snapshot(self, landscape_id: str | None = None) -> LandscapeSnapshot:
+        landscape = self._landscape(landscape_id)
+        head = await asyncio.to_thread(self._store.head, landscape)
+        if head is not None and self._fresh(head):
+            self.stats.hits += 1
+            return self._snapshot(head)
+        return await self._join_refresh(
+            landscape, lambda: self._refresh_shared(landscape)
+        )
+
+    async def _refresh_shared(self, landscape: str) -> LandscapeSnapshot:
+        while True:
+            head = await asyncio.to_thread(self._store.head, landscape)
+            if head is not None and self._fresh(head):
+                # refreshed by another process meanwhile
+                return self._snapshot(head)
+            leased = await asyncio.to_thread(
+                self._store.try_lease, landscape, self._owner, self._lease
+            )
+            if leased:
+                break
+            await asyncio.sleep(self._poll_interval)
+
+        try:
+            epoch = await asyncio.to_thread(self._store.epoch, landscape)
+            export = await self._client.stream_export(
+                landscape,
+                etag=head.etag if head is not None else None,
+                last_modified=head.last_modified if head is not None else None,
+                content_hash=head.content_hash if head is not None else None,
+            )
+            if head is not None and export.not_modified:
+                self.stats.revalidations += 1
+                touched = await asyncio.to_thread(
+                    self._store.touch,
+                    landscape,
+                    export.etag or head.etag,
+                    export.last_modified or head.last_modified,
+                    epoch,
+                )
+                return self._snapshot(touched or head)
+
+            assert export.data is not None and export.content_hash is not None
+            self.stats.parses += 1
+            head = await asyncio.to_thread(
+                self._store.publish,
+                landscape,
+                export.data,
+                export.content_hash,
+                export.etag,
+                export.last_modified,
+                epoch,
+            )
+            return self._snapshot(head)
+        finally:
+            await asyncio.to_thread(self._store.release_lease, landscape, self._owner)
+
+    async def expire(self, landscape_id: str | None = None) -> None:
+        await super().expire(landscape_id)
+        await asyncio.to_thread(self._store.expire, self._landscape(landscape_id))
+
+    async def invalidate(self, landscape_id: str | None = None) -> int:
+        await super().invalidate(landscape_id)
+        dropped = await asyncio.to_thread(self._store.invalidate, landscape_id)
+        logger.info(f"Invalidated {dropped} shared landscape snapshot(s)")
+        return dropped
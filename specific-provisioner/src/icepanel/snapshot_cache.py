@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from src.icepanel.client import IcePanelClient
+from src.icepanel.landscape_index import LandscapeIndex, LandscapeView
+from src.models.icepanel import IcePanelData
+from src.utility.logger import get_logger
+
+logger = get_logger()
+
+
+@dataclass
+class LandscapeSnapshot:
+    """
+    A parsed landscape export together with what is needed to revalidate it.
+
+    Attributes:
+        landscape_id (str): The landscape the export belongs to.
+        data (IcePanelData | None): The parsed export; None when the snapshot is
+            read from a store shared between processes, which only serves its
+            `index`.
+        content_hash (str): SHA-256 of the raw export body.
+        etag (str | None): ETag returned by IcePanel, if any.
+        last_modified (str | None): Last-Modified returned by IcePanel, if any.
+        fetched_at (float): Clock time of the last successful (re)validation.
+        taken_at (float): Epoch time of the last successful (re)validation, i.e.
+            when IcePanel was last known to hold `data`.
+        index (LandscapeView): Lookup tables over `data`, built on first use.
+    """
+
+    landscape_id: str
+    data: IcePanelData | None
+    content_hash: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    taken_at: float = field(default_factory=time.time)
+    _index: LandscapeView | None = field(default=None, repr=False)
+
+    @property
+    def index(self) -> LandscapeView:
+        if self._index is None:
+            assert self.data is not None
+            self._index = LandscapeIndex(self.data)
+        return self._index
+
+
+@dataclass
+class SnapshotCacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidations: int = 0
+    parses: int = 0
+    # reads that joined a download already in flight for the same landscape
+    coalesced: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LandscapeSnapshotCache:
+    """
+    Per-landscape cache of the parsed IcePanel export.
+
+    A snapshot younger than `ttl` seconds is served without contacting IcePanel.
+    Once it is older, the export is requested again with the validators of the
+    cached copy (ETag / Last-Modified): a 304 Not Modified, or a body whose hash
+    matches the cached one (hashed before it is parsed), only refreshes the
+    snapshot age, so the export is parsed, and the snapshot and its index
+    replaced, only when its content really changed.
+
+    Exports are parsed while they stream in (see `IcePanelClient.stream_export`),
+    so the raw body of a landscape is never held in memory.
+
+    Concurrent reads of a landscape that is not fresh share a single download:
+    the first read starts it, the others wait for its result (or its error). A
+    read that is cancelled does not cancel the download for the others. Reads
+    made after `expire` or `invalidate` never join a download started before,
+    whose result is then handed to its waiters but not cached.
+
+    Args:
+        client (IcePanelClient): The client used to download the exports.
+        ttl (float): Seconds a snapshot is considered fresh. Zero disables the
+            freshness window, so every read revalidates.
+        clock (Callable[[], float], optional): Monotonic clock, overridable in tests.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        client: IcePanelClient,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._client = client
+        self._ttl = ttl
+        self._clock = clock
+        self._snapshots: dict[str, LandscapeSnapshot] = {}
+        # download in flight, and number of expirations, of each landscape
+        self._refreshes: dict[str, asyncio.Task[LandscapeSnapshot]] = {}
+        self._generations: dict[str, int] = {}
+        self.stats = SnapshotCacheStats()
+
+    def _landscape(self, landscape_id: str | None) -> str:
+        return landscape_id or self._client.landscape_id
+
+    def peek(self, landscape_id: str | None = None) -> LandscapeSnapshot | None:
+        """
+        Returns the cached snapshot of a landscape, fresh or not, without any I/O.
+        """
+        return self._snapshots.get(self._landscape(landscape_id))
+
+    async def get(self, landscape_id: str | None = None) -> IcePanelData:
+        """
+        Returns the export of a landscape, downloading or revalidating it if needed.
+
+        Args:
+            landscape_id (str, optional): The landscape to read. Defaults to the
+                landscape the client is configured with.
+
+        Returns:
+            IcePanelData: The parsed export.
+        """  # noqa: E501
+        data = (await self.get_snapshot(landscape_id)).data
+        assert data is not None
+        return data
+
+    async def get_index(self, landscape_id: str | None = None) -> LandscapeView:
+        """
+        Same as `get`, but returns the hash-indexed view of the export. The index
+        is built once per export content and reused by later reads.
+        """  # noqa: E501
+        return (await self.get_snapshot(landscape_id)).index
+
+    async def get_snapshot(self, landscape_id: str | None = None) -> LandscapeSnapshot:
+        """
+        Returns the cached snapshot of a landscape, downloading or revalidating it
+        if it is not fresh anymore.
+        """  # noqa: E501
+        landscape = self._landscape(landscape_id)
+        cached = self._snapshots.get(landscape)
+
+        if cached is not None and self._clock() - cached.fetched_at < self._ttl:
+            self.stats.hits += 1
+            return cached
+
+        generation = self._generations.get(landscape, 0)
+        return await self._join_refresh(
+            landscape, lambda: self._refresh(landscape, cached, generation)
+        )
+
+    async def _join_refresh(
+        self,
+        landscape: str,
+        start: Callable[[], Awaitable[LandscapeSnapshot]],
+    ) -> LandscapeSnapshot:
+        # joins the refresh of the landscape in flight, or starts one
+        refresh = self._refreshes.get(landscape)
+        if refresh is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            refresh = asyncio.ensure_future(start())
+            self._refreshes[landscape] = refresh
+            refresh.add_done_callback(lambda task: self._refresh_done(landscape, task))
+        return await asyncio.shield(refresh)
+
+    def _refresh_done(
+        self, landscape: str, task: asyncio.Task[LandscapeSnapshot]
+    ) -> None:
+        if self._refreshes.get(landscape) is task:
+            del self._refreshes[landscape]
+        if not task.cancelled():
+            # retrieved, so that an error nobody waits for anymore is not reported
+            task.exception()
+
+    async def _refresh(
+        self, landscape: str, cached: LandscapeSnapshot | None, generation: int
+    ) -> LandscapeSnapshot:
+        now = self._clock()
+        export = await self._client.stream_export(
+            landscape,
+            etag=cached.etag if cached is not None else None,
+            last_modified=cached.last_modified if cached is not None else None,
+            content_hash=cached.content_hash if cached is not None else None,
+        )
+        # expired or invalidated meanwhile: the result may predate a write
+        current = self._generations.get(landscape, 0) == generation
+
+        if cached is not None and export.not_modified:
+            self.stats.revalidations += 1
+            if current:
+                cached.etag = export.etag
+                cached.last_modified = export.last_modified
+                cached.fetched_at = now
+                cached.taken_at = time.time()
+            return cached
+
+        assert export.data is not None and export.content_hash is not None
+
+        self.stats.parses += 1
+        snapshot = LandscapeSnapshot(
+            landscape_id=landscape,
+            data=export.data,
+            content_hash=export.content_hash,
+            etag=export.etag,
+            last_modified=export.last_modified,
+            fetched_at=now,
+        )
+        if current:
+            self._snapshots[landscape] = snapshot
+        return snapshot
+
+    async def expire(self, landscape_id: str | None = None) -> None:
+        """
+        Marks the snapshot of a landscape as stale but keeps its validators, so the
+        next read revalidates it instead of downloading it unconditionally.
+
+        It must be called after writing to a landscape, since the cached copy no
+        longer reflects IcePanel. A coroutine so that subclasses can reach shared
+        storage without blocking the event loop.
+        """  # noqa: E501
+        landscape = self._landscape(landscape_id)
+        self._detach_refresh(landscape)
+        cached = self._snapshots.get(landscape)
+        if cached is not None:
+            cached.fetched_at = float("-inf")
+
+    async def invalidate(self, landscape_id: str | None = None) -> int:
+        """
+        Drops cached snapshots. A coroutine, like `expire`.
+
+        Args:
+            landscape_id (str, optional): The landscape to drop. If omitted every
+                cached landscape is dropped.
+
+        Returns:
+            int: The number of snapshots dropped.
+        """
+        if landscape_id is None:
+            dropped = len(self._snapshots)
+            for landscape in [*self._snapshots, *self._refreshes]:
+                self._detach_refresh(landscape)
+            self._snapshots.clear()
+        else:
+            self._detach_refresh(landscape_id)
+            dropped = 1 if self._snapshots.pop(landscape_id, None) else 0
+        logger.info(f"Invalidated {dropped} landscape snapshot(s)")
+        return dropped
+
+    def _detach_refresh(self, landscape: str) -> None:
+        # later reads start a new download instead of joining the one in flight
+        self._generations[landscape] = self._generations.get(landscape, 0) + 1
+        self._refreshes.pop(landscape, None)
@@ -1,27 +1,24 @@
 from __future__ import annotations
 
-from requests.auth import HTTPBasicAuth
-import requests
-
-import sys
-import os
-
-import yaml
-sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
-
-import asyncio 
-
-
-from src.dependencies import unpack_provisioning_request
-from src.utility.parsing_pydantic_models import parse_yaml_with_model
+from typing import List
 
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 from starlette.responses import Response
 
 from src.app_config import app
 from src.check_return_type import check_response
+from src.dependencies import (
+    IcePanelClientDep,
+    JobManagerDep,
+    SnapshotCacheDep,
+    unpack_provisioning_request,
+)
+from src.models.admin_models import IcePanelCallStats, SnapshotInvalidation
 from src.models.api_models import (
     ProvisioningRequest,
     ProvisioningStatus,
+    Status,
+    Status1,
     SystemErr,
     UpdateAclRequest,
     ValidationError,
@@ -29,10 +26,9 @@ from src.models.api_models import (
     ValidationResult,
     ValidationStatus,
 )
-
-from src.models.icepanel import *
-from src.models.data_product_descriptor import *
-
+from src.models.batch_models import BatchProvisioningStatus
+from src.provisioning.handlers import BatchResults, ProvisioningRequests
+from src.provisioning.jobs import JobQueueFullError
 from src.utility.logger import get_logger
 
 logger = get_logger()
@@ -49,91 +45,171 @@ logger = get_logger()
     },
     tags=["SpecificProvisioner"],
 )
-async def provision(
-    body: ProvisioningRequest,
-) -> Response:
+async def provision(body: ProvisioningRequest, jobs: JobManagerDep) -> Response:
     """
     Deploy a data product or a single component starting from a provisioning descriptor
     """
 
-    # get data from icepanel
-    (domains, modelObjects, modelConnections) = getIcePanelSituation()
-    
     dp = await unpack_provisioning_request(body)
-    print("------------------DESCRIPTOR PARSED-----------------------------")
-    print(dp)
-
-    # default domain in the organization data mesh and landscape [hWFggyCYwu5kun6fpsu7]
-    domainId= list(filter(lambda x: x.name == "Default domain", domains))[0].id
-    rootId=list(filter(lambda x: x.type == "root", modelObjects))[0].id
-   
-    icePanelDP = dp[0].toIcePanel(domainId, rootId)
-    
-    matchedDP = list(filter(lambda x: x.name == icePanelDP.name, modelObjects))
-    dpId: str = ""
-    if len(matchedDP) == 1:
-        dpId = patch_component(matchedDP[0].id, icePanelDP)
-
-    else:
-        dpId = post_component(icePanelDP)    
-
-    
-    witboostCompToIcePanelComp: dict[str,str] = {}
-    for component in dp[0].components:
-        cdict: dict = component.dict()
-        icePanelObj = component.toIcePanel(domainId,dpId)
-        
-        if not icePanelObj == None:
-            matchedComponent = list(filter(lambda x: x.name == icePanelObj.name, modelObjects))
-            compId = ""
-            if len(matchedComponent) == 1:
-                compId = patch_component(matchedComponent[0].id, icePanelObj)                
-            else:
-                compId = post_component(icePanelObj)                
-
-            witboostCompToIcePanelComp[component.id] = compId
-
-    for component in dp[0].components:
-        print("component type: " + str(component.kind))
-        cdict: dict = component.dict()
-
-        dependsOn = []
-        readsFrom = []
-        if component.kind == "outputport":
-            rename_key(cdict['dataContract'], 'schema_', 'schema')
-            outputport = OutputPort(**cdict)
-            dependsOn = outputport.dependsOn
-
-        if component.kind == "workload":
-            workload = Workload(**cdict)
-            dependsOn = workload.dependsOn
-            readsFrom = workload.readsFrom
-        
-        processRelationships(component, dependsOn, dp[0].components, "dependsOn", witboostCompToIcePanelComp, modelConnections )
-        processRelationships(component, readsFrom, dp[0].components, "readsFrom", witboostCompToIcePanelComp, modelConnections )
+    if isinstance(dp, ValidationError):
+        return check_response(out_response=dp)
+    logger.debug(
+        f"Descriptor of data product {dp[0].id} parsed: "
+        f"{len(dp[0].components)} components"
+    )
 
-    resp = SystemErr(error="Response not yet implemented")
+    try:
+        job = await jobs.submit("provision", body.model_dump_json(), dp[0].id)
+    except JobQueueFullError as ex:
+        return check_response(out_response=SystemErr(error=str(ex)))
+
+    return check_response(out_response=job.token)
+
+
+@app.post(
+    "/v1/provision/batch",
+    response_model=None,
+    responses={
+        "202": {"model": str},
+        "400": {"model": ValidationError},
+        "500": {"model": SystemErr},
+    },
+    tags=["SpecificProvisioner"],
+)
+async def provision_batch(
+    body: List[ProvisioningRequest], jobs: JobManagerDep
+) -> Response:
+    """
+    Deploy several data products at once: the IcePanel landscape is read once and
+    the data products are synchronized together
+    """
+
+    errors = []
+    data_product_ids: set[str] = set()
+    for i, request in enumerate(body):
+        dp = await unpack_provisioning_request(request)
+        if isinstance(dp, ValidationError):
+            errors.extend(f"Request {i}: {error}" for error in dp.errors)
+        elif dp[0].id in data_product_ids:
+            errors.append(f"Request {i}: data product {dp[0].id} is duplicated")
+        else:
+            data_product_ids.add(dp[0].id)
+    if not body:
+        errors.append("Expecting at least one provisioning request")
+    if errors:
+        return check_response(out_response=ValidationError(errors=errors))
+
+    try:
+        job = await jobs.submit(
+            "provision_batch", ProvisioningRequests.dump_json(body).decode()
+        )
+    except JobQueueFullError as ex:
+        return check_response(out_response=SystemErr(error=str(ex)))
+
+    return check_response(out_response=job.token)
+
+
+@app.get(
+    "/v1/provision/batch/{token}/status",
+    response_model=None,
+    responses={
+        "200": {"model": BatchProvisioningStatus},
+        "400": {"model": ValidationError},
+        "500": {"model": SystemErr},
+    },
+    tags=["SpecificProvisioner"],
+)
+async def get_batch_status(token: str, jobs: JobManagerDep) -> Response:
+    """
+    Get the status of each data product of a batch provisioning request
+    """
+
+    job = await jobs.get(token)
+    if job is None or job.kind != "provision_batch":
+        error = ValidationError(errors=[f"Unknown batch provisioning token: {token}"])
+        return check_response(out_response=error)
+
+    if job.status != Status.COMPLETED:
+        resp = BatchProvisioningStatus(
+            status=Status1(job.status.value), result=job.result
+        )
+        return check_response(out_response=resp)
+
+    results = BatchResults.validate_json(job.result)
+    failed = sum(1 for result in results if result.status == Status1.FAILED)
+    resp = BatchProvisioningStatus(
+        status=Status1.FAILED if failed else Status1.COMPLETED,
+        result=(
+            f"{len(results) - failed} of {len(results)} data products synchronized "
+            "with IcePanel"
+        ),
+        results=results,
+    )
+
+    return check_response(out_response=resp)
+
+
+@app.delete(
+    "/v1/admin/snapshots",
+    response_model=None,
+    responses={
+        "200": {"model": SnapshotInvalidation},
+        "500": {"model": SystemErr},
+    },
+    tags=["Admin"],
+)
+async def invalidate_snapshots(
+    snapshot_cache: SnapshotCacheDep,
+    landscapeId: str | None = None,
+) -> Response:
+    """
+    Drop the cached IcePanel landscape snapshots, so that the next provisioning
+    request downloads the export again
+    """
+
+    invalidated = await snapshot_cache.invalidate(landscapeId)
+    resp = SnapshotInvalidation(landscapeId=landscapeId, invalidated=invalidated)
 
     return check_response(out_response=resp)
 
-def processRelationships(currComponent, relationships, components, relationshipType, witboostCompToIcePanelComp, existingConnections):
-    if len(relationships) > 0:
-        for relID in relationships:
-            for relaedComp in components:
-                if relaedComp.id == relID:
-                    connection = buildConnection(relationshipType, witboostCompToIcePanelComp[currComponent.id], witboostCompToIcePanelComp[relaedComp.id])
-
-                    matchedConnection = list(filter(lambda x: x.originId == connection.originId and x.targetId == connection.targetId and x.name == relationshipType, existingConnections))
-                    if len(matchedConnection) == 1:
-                        compId = patch_connection(matchedConnection[0].id, connection)     
-                    else:
-                        compId = post_connection(connection)
-
-def rename_key(dictionary, old_key, new_key):
-    if old_key in dictionary:
-        dictionary[new_key] = dictionary.pop(old_key)
-    else:
-        raise KeyError(f"Key '{old_key}' not found in dictionary")
+
+@app.get(
+    "/v1/admin/icepanel/stats",
+    response_model=None,
+    responses={
+        "200": {"model": IcePanelCallStats},
+        "500": {"model": SystemErr},
+    },
+    tags=["Admin"],
+)
+def get_icepanel_stats(icepanel: IcePanelClientDep) -> Response:
+    """
+    Count the calls made to IcePanel since startup, how often they were throttled
+    or retried and how long they waited for the rate limiter and the backoff
+    """
+
+    stats = icepanel.stats
+    resp = IcePanelCallStats(
+        calls=stats.calls,
+        retries=stats.retries,
+        throttled=stats.throttled,
+        gaveUp=stats.gave_up,
+        limiterWaitSeconds=stats.limiter_wait,
+        backoffWaitSeconds=stats.backoff_wait,
+    )
+
+    return check_response(out_response=resp)
+
+
+@app.get("/metrics", response_model=None, tags=["Admin"])
+def get_metrics() -> Response:
+    """
+    Expose the metrics of the provisioner and of its IcePanel client in the
+    Prometheus text format
+    """
+
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
 
 @app.get(
     "/v1/provision/{token}/status",
@@ -145,15 +221,18 @@ def rename_key(dictionary, old_key, new_key):
     },
     tags=["SpecificProvisioner"],
 )
-def get_status(token: str) -> Response:
+async def get_status(token: str, jobs: JobManagerDep) -> Response:
     """
     Get the status for a provisioning request
     """
 
+    job = await jobs.get(token)
+    # batch and validation jobs have their own status endpoints
+    if job is None or job.kind not in ("provision", "unprovision"):
+        error = ValidationError(errors=[f"Unknown provisioning token: {token}"])
+        return check_response(out_response=error)
 
-
-    # todo: define correct response
-    resp = SystemErr(error="Response not yet implemented")
+    resp = ProvisioningStatus(status=Status1(job.status.value), result=job.result)
 
     return check_response(out_response=resp)
 
@@ -169,18 +248,22 @@ def get_status(token: str) -> Response:
     },
     tags=["SpecificProvisioner"],
 )
-def unprovision(
-    body: ProvisioningRequest,
-) -> Response:
+async def unprovision(body: ProvisioningRequest, jobs: JobManagerDep) -> Response:
     """
     Undeploy a data product or a single component
     given the provisioning descriptor relative to the latest complete provisioning request
     """  # noqa: E501
 
-    # todo: define correct response
-    resp = SystemErr(error="Response not yet implemented")
+    dp = await unpack_provisioning_request(body)
+    if isinstance(dp, ValidationError):
+        return check_response(out_response=dp)
 
-    return check_response(out_response=resp)
+    try:
+        job = await jobs.submit("unprovision", body.model_dump_json(), dp[0].id)
+    except JobQueueFullError as ex:
+        return check_response(out_response=SystemErr(error=str(ex)))
+
+    return check_response(out_response=job.token)
 
 
 @app.post(
@@ -234,17 +317,17 @@ def validate(body: ProvisioningRequest) -> Response:
     },
     tags=["SpecificProvisioner"],
 )
-def async_validate(
-    body: ValidationRequest,
-) -> Response:
+async def async_validate(body: ValidationRequest, jobs: JobManagerDep) -> Response:
     """
     Validate a deployment request
     """
 
-    # todo: define correct response
-    resp = SystemErr(error="Response not yet implemented")
+    try:
+        job = await jobs.submit("validate", body.model_dump_json())
+    except JobQueueFullError as ex:
+        return check_response(out_response=SystemErr(error=str(ex)))
 
-    return check_response(out_response=resp)
+    return check_response(out_response=job.token)
 
 
 @app.get(
@@ -257,14 +340,23 @@ def async_validate(
     },
     tags=["SpecificProvisioner"],
 )
-def get_validation_status(
-    token: str,
-) -> Response:
+async def get_validation_status(token: str, jobs: JobManagerDep) -> Response:
     """
     Get the status for a provisioning request
     """
 
-    # todo: define correct response
-    resp = SystemErr(error="Response not yet implemented")
+    job = await jobs.get(token)
+    if job is None or job.kind != "validate":
+        error = ValidationError(errors=[f"Unknown validation token: {token}"])
+        return check_response(out_response=error)
+
+    result = None
+    if job.status == Status.COMPLETED:
+        result = ValidationResult.model_validate_json(job.result)
+    elif job.status == Status.FAILED:
+        result = ValidationResult(
+            valid=False, error=ValidationError(errors=[job.result])
+        )
+    resp = ValidationStatus(status=job.status, result=result)
 
     return check_response(out_response=resp)
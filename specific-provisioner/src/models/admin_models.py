@@ -0,0 +1,26 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class SnapshotInvalidation(BaseModel):
+    landscapeId: Optional[str] = Field(
+        None,
+        description="Landscape whose snapshot was dropped, or null if every cached landscape was dropped",  # noqa: E501
+    )
+    invalidated: int = Field(..., description="Number of snapshots dropped")
+
+
+class IcePanelCallStats(BaseModel):
+    calls: int = Field(..., description="HTTP calls sent to IcePanel, retries included")
+    retries: int = Field(..., description="Calls sent again after a failure")
+    throttled: int = Field(
+        ..., description="Calls IcePanel answered with 429 Too Many Requests"
+    )
+    gaveUp: int = Field(..., description="Failed calls that were not retried any more")
+    limiterWaitSeconds: float = Field(
+        ..., description="Seconds spent waiting for the client-side rate limiter"
+    )
+    backoffWaitSeconds: float = Field(
+        ..., description="Seconds spent backing off before retries"
+    )
@@ -0,0 +1,26 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from src.models.api_models import Status1
+
+
+class DataProductProvisioningResult(BaseModel):
+    dataProductId: str
+    status: Status1
+    result: str = Field(
+        ...,
+        description="Summary of the IcePanel synchronization, or the error if it failed",  # noqa: E501
+    )
+
+
+class BatchProvisioningStatus(BaseModel):
+    status: Status1 = Field(
+        ...,
+        description="FAILED as soon as one data product could not be synchronized",
+    )
+    result: str
+    results: List[DataProductProvisioningResult] = Field(
+        default_factory=list,
+        description="Outcome of each data product, in the order of the request; empty until the batch completes",  # noqa: E501
+    )
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from pydantic import TypeAdapter
+
+from src.dependencies import unpack_provisioning_request
+from src.icepanel.client import IcePanelClient
+from src.icepanel.fingerprint_store import FingerprintStore
+from src.icepanel.snapshot_cache import LandscapeSnapshotCache
+from src.models.api_models import (
+    DescriptorKind,
+    ProvisioningRequest,
+    Status1,
+    ValidationError,
+    ValidationRequest,
+    ValidationResult,
+)
+from src.models.batch_models import DataProductProvisioningResult
+from src.models.data_product_descriptor import DataProduct
+from src.provisioning.job_store import Job
+from src.provisioning.jobs import JobHandler, JobProgress
+from src.provisioning.service import (
+    ProvisioningError,
+    describe_removal,
+    describe_result,
+    provision_data_product,
+    provision_data_products,
+    unprovision_data_product,
+)
+from src.provisioning.write_scheduler import WriteScheduler
+
+ProvisioningRequests = TypeAdapter(List[ProvisioningRequest])
+BatchResults = TypeAdapter(List[DataProductProvisioningResult])
+
+
+async def _unpack(request: ProvisioningRequest) -> DataProduct:
+    unpacked = await unpack_provisioning_request(request)
+    if isinstance(unpacked, ValidationError):
+        raise ProvisioningError("; ".join(unpacked.errors))
+    return unpacked[0]
+
+
+async def _load_data_product(payload: str) -> DataProduct:
+    return await _unpack(ProvisioningRequest.model_validate_json(payload))
+
+
+def build_handlers(
+    client: IcePanelClient,
+    snapshot_cache: LandscapeSnapshotCache,
+    concurrency: int,
+    fingerprints: FingerprintStore | None = None,
+    scheduler: WriteScheduler | None = None,
+) -> Dict[str, JobHandler]:
+    """
+    Builds the handlers of the background jobs, keyed by job kind.
+
+    The payload of `provision` and `unprovision` jobs is a `ProvisioningRequest`,
+    the one of `provision_batch` jobs a list of them and the one of `validate`
+    jobs a `ValidationRequest`, all serialized as JSON. A `provision_batch` job
+    returns the JSON list of the `DataProductProvisioningResult`s. The
+    descriptor is parsed again when the job runs, so that a job resumed after a
+    restart needs nothing but its payload.
+
+    Args:
+        client (IcePanelClient): The client used to write to IcePanel.
+        snapshot_cache (LandscapeSnapshotCache): Cache of the landscape export.
+        concurrency (int): Maximum number of IcePanel writes in flight per job.
+        fingerprints (FingerprintStore, optional): What was last written to IcePanel.
+        scheduler (WriteScheduler, optional): Serializes the conflicting writes of
+            concurrent jobs.
+
+    Returns:
+        Dict[str, JobHandler]: The handler of each job kind.
+    """  # noqa: E501
+
+    async def provision(job: Job, progress: JobProgress) -> str:
+        data_product = await _load_data_product(job.payload)
+        result = await provision_data_product(
+            data_product,
+            client,
+            snapshot_cache,
+            concurrency,
+            on_progress=progress,
+            fingerprints=fingerprints,
+            scheduler=scheduler,
+        )
+        return describe_result(data_product.id, result)
+
+    async def provision_batch(job: Job, progress: JobProgress) -> str:
+        requests = ProvisioningRequests.validate_json(job.payload)
+        data_products = [await _unpack(request) for request in requests]
+        outcomes = await provision_data_products(
+            data_products,
+            client,
+            snapshot_cache,
+            concurrency,
+            on_progress=progress,
+            fingerprints=fingerprints,
+            scheduler=scheduler,
+        )
+        results = [
+            DataProductProvisioningResult(
+                dataProductId=dp_id,
+                status=Status1.FAILED,
+                result=str(outcome),
+            )
+            if isinstance(outcome, ProvisioningError)
+            else DataProductProvisioningResult(
+                dataProductId=dp_id,
+                status=Status1.COMPLETED,
+                result=describe_result(dp_id, outcome),
+            )
+            for dp_id, outcome in outcomes.items()
+        ]
+        return BatchResults.dump_json(results).decode()
+
+    async def unprovision(job: Job, progress: JobProgress) -> str:
+        data_product = await _load_data_product(job.payload)
+        result = await unprovision_data_product(
+            data_product,
+            client,
+            snapshot_cache,
+            concurrency,
+            on_progress=progress,
+            fingerprints=fingerprints,
+            scheduler=scheduler,
+        )
+        return describe_removal(data_product.id, result)
+
+    async def validate(job: Job, progress: JobProgress) -> str:
+        request = ValidationRequest.model_validate_json(job.payload)
+        unpacked = await unpack_provisioning_request(
+            ProvisioningRequest(
+                descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+                descriptor=request.descriptor,
+            )
+        )
+        if isinstance(unpacked, ValidationError):
+            result = ValidationResult(valid=False, error=unpacked)
+        else:
+            result = ValidationResult(valid=True)
+        return result.model_dump_json()
+
+    return {
+        "provision": provision,
+        "provision_batch": provision_batch,
+        "unprovision": unprovision,
+        "validate": validate,
+    }
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from src.models.api_models import Status
+from src.utility.logger import get_logger
+
+logger = get_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    token TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    data_product_id TEXT,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_data_product_id ON jobs (data_product_id);
+CREATE INDEX IF NOT EXISTS jobs_status_updated_at ON jobs (status, updated_at);
+CREATE TABLE IF NOT EXISTS job_operations (
+    token TEXT NOT NULL REFERENCES jobs (token) ON DELETE CASCADE,
+    target TEXT NOT NULL,
+    action TEXT NOT NULL,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (token, target, action)
+);
+CREATE TABLE IF NOT EXISTS job_owners (
+    owner TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+JOB_COLUMNS = (
+    "token, kind, data_product_id, status, payload, result, attempts, "
+    "created_at, updated_at, owner"
+)
+
+
+@dataclass
+class Job:
+    """
+    A unit of work run in the background and polled through its token.
+
+    Attributes:
+        token (str): Opaque identifier returned to the caller.
+        kind (str): What the job does (e.g. `provision`); selects its handler.
+        payload (str): The serialized request the job works on.
+        data_product_id (str | None): The data product the job is about, if known.
+        status (Status): RUNNING until the job ends, then COMPLETED or FAILED.
+        result (str): The message produced by the job, or the error if it failed.
+        attempts (int): How many times a worker started the job.
+        created_at (float): Epoch time of the submission.
+        updated_at (float): Epoch time of the last status change.
+        owner (str | None): The job manager running the job, if any.
+    """  # noqa: E501
+
+    token: str
+    kind: str
+    payload: str = ""
+    data_product_id: str | None = None
+    status: Status = Status.RUNNING
+    result: str = ""
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    owner: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != Status.RUNNING
+
+
+def _migrate(connection: sqlite3.Connection) -> None:
+    # stores created before jobs had an owner
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(jobs)")}
+    if "owner" not in columns:
+        connection.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+
+def _to_job(row: tuple) -> Job:
+    token, kind, dp_id, status, payload, result = row[:6]
+    attempts, created, updated, owner = row[6:]
+    return Job(
+        token=token,
+        kind=kind,
+        payload=payload,
+        data_product_id=dp_id,
+        status=Status(status),
+        result=result,
+        attempts=attempts,
+        created_at=created,
+        updated_at=updated,
+        owner=owner,
+    )
+
+
+class JobStore:
+    """
+    Durable record of the background jobs, kept in a local SQLite database so that
+    tokens survive a restart of the provisioner.
+
+    The database runs in WAL mode, so that status polling never waits for a
+    running job to persist its progress. Besides the job itself, the store keeps
+    the outcome of every IcePanel operation the job applied, which is how the
+    status of a running job reports its progress.
+
+    Several processes may share the store: every job records the job manager
+    (`owner`) running it, and each manager renews a heartbeat while it lives. A
+    RUNNING job is only handed to another manager (see `claim_orphans`) once its
+    owner has stopped or has missed its heartbeats.
+
+    The methods are blocking: call them from a worker thread (`asyncio.to_thread`)
+    when running inside the event loop. A single connection is shared, guarded by
+    a lock.
+
+    Args:
+        path (str): Path of the database file, or `:memory:` for a throwaway store.
+    """  # noqa: E501
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def open(self) -> None:
+        if self._connection is not None:
+            return
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        connection.executescript(SCHEMA)
+        _migrate(connection)
+        self._connection = connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> JobStore:
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise RuntimeError("The job store is not open")
+        return self._connection
+
+    def insert(self, job: Job) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                f"INSERT INTO jobs ({JOB_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.token,
+                    job.kind,
+                    job.data_product_id,
+                    job.status.value,
+                    job.payload,
+                    job.result,
+                    job.attempts,
+                    job.created_at,
+                    job.updated_at,
+                    job.owner,
+                ),
+            )
+
+    def delete(self, token: str) -> None:
+        with self._lock, self._db() as db:
+            db.execute("DELETE FROM jobs WHERE token = ?", (token,))
+
+    def update(self, job: Job) -> None:
+        """
+        Persists the status, the result and the attempts of a job.
+        """
+        job.updated_at = time.time()
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, attempts = ?, updated_at = ? "
+                "WHERE token = ?",
+                (job.status.value, job.result, job.attempts, job.updated_at, job.token),
+            )
+
+    def get(self, token: str) -> Job | None:
+        with self._lock:
+            row = (
+                self._db()
+                .execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE token = ?", (token,))
+                .fetchone()
+            )
+        return _to_job(row) if row is not None else None
+
+    def find_by_data_product(self, data_product_id: str) -> List[Job]:
+        """
+        Returns the jobs about a data product, the most recent first.
+        """
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    f"SELECT {JOB_COLUMNS} FROM jobs WHERE data_product_id = ? "
+                    "ORDER BY created_at DESC",
+                    (data_product_id,),
+                )
+                .fetchall()
+            )
+        return [_to_job(row) for row in rows]
+
+    def unfinished(self) -> List[Job]:
+        """
+        Returns the jobs still RUNNING, the oldest first.
+        """
+        with self._lock:
+            rows = (
+                self._db()
+                .execute(
+                    f"SELECT {JOB_COLUMNS} FROM jobs WHERE status = ? "
+                    "ORDER BY created_at",
+                    (Status.RUNNING.value,),
+                )
+                .fetchall()
+            )
+        return [_to_job(row) for row in rows]
+
+    def heartbeat(self, owner: str) -> None:
+        """
+        Records that the job manager `owner` is alive.
+        """
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO job_owners (owner, heartbeat_at) VALUES (?, ?)",
+                (owner, time.time()),
+            )
+
+    def release(self, owner: str) -> None:
+        """
+        Records that the job manager `owner` stopped: the jobs it left RUNNING
+        can be claimed right away.
+        """
+        with self._lock, self._db() as db:
+            db.execute("DELETE FROM job_owners WHERE owner = ?", (owner,))
+
+    def claim_orphans(self, owner: str, stale_before: float) -> List[Job]:
+        """
+        Hands to `owner` the RUNNING jobs whose owner stopped or has not renewed
+        its heartbeat since `stale_before` (an epoch time), the oldest first.
+
+        The jobs are claimed in a single write transaction, so that two managers
+        never claim the same job.
+
+        Returns:
+            List[Job]: The jobs claimed.
+        """  # noqa: E501
+        with self._lock, self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE status = ? AND ("
+                "owner IS NULL OR owner NOT IN "
+                "(SELECT owner FROM job_owners WHERE heartbeat_at >= ?)"
+                ") ORDER BY created_at",
+                (Status.RUNNING.value, stale_before),
+            ).fetchall()
+            jobs = [_to_job(row) for row in rows]
+            for job in jobs:
+                job.owner = owner
+            db.executemany(
+                "UPDATE jobs SET owner = ? WHERE token = ?",
+                [(owner, job.token) for job in jobs],
+            )
+        return jobs
+
+    def record_operation(
+        self, token: str, target: str, action: str, error: str | None
+    ) -> None:
+        """
+        Saves the outcome of an operation applied by a job. A retried operation
+        overwrites its previous outcome.
+        """
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO job_operations "
+                "(token, target, action, error, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (token, target, action, error, time.time()),
+            )
+
+    def operations_summary(self, token: str) -> Tuple[int, int]:
+        """
+        Returns how many operations of a job were applied and how many failed.
+        """
+        with self._lock:
+            applied, failed = (
+                self._db()
+                .execute(
+                    "SELECT COUNT(*) - COUNT(error), COUNT(error) "
+                    "FROM job_operations WHERE token = ?",
+                    (token,),
+                )
+                .fetchone()
+            )
+        return applied, failed
+
+    def compact(self, before: float) -> int:
+        """
+        Deletes the finished jobs (and their operations) last updated before the
+        given epoch time.
+
+        Returns:
+            int: The number of jobs deleted.
+        """
+        with self._lock, self._db() as db:
+            cursor = db.execute(
+                "DELETE FROM jobs WHERE status != ? AND updated_at < ?",
+                (Status.RUNNING.value, before),
+            )
+        if cursor.rowcount:
+            logger.info(f"Compacted {cursor.rowcount} finished jobs")
+        return cursor.rowcount
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Mapping
+
+from opentelemetry import context, trace
+
+from src.models.api_models import Status
+from src.provisioning.job_store import Job, JobStore
+from src.utility.logger import get_logger
+
+logger = get_logger()
+tracer = trace.get_tracer(__name__)
+
+# notified by a running job after every operation it applied: target, action and
+# the error message if the operation failed
+JobProgress = Callable[[str, str, str | None], Awaitable[None]]
+# runs a job and returns its result message; an exception fails the job
+JobHandler = Callable[[Job, JobProgress], Awaitable[str]]
+
+# seconds between two compactions of the finished jobs
+COMPACTION_INTERVAL = 600.0
+# seconds between two heartbeats of a job manager; one missing three in a row is
+# deemed gone, and its running jobs are resumed by another
+HEARTBEAT_INTERVAL = 10.0
+MISSED_HEARTBEATS = 3
+
+
+class JobQueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is full.
+    """
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded pool of asyncio workers and persists them in a
+    `JobStore`, so that their status can still be polled after a restart.
+
+    Submitted jobs wait in a bounded queue: when it is full `submit` fails fast
+    instead of piling up work, so the HTTP layer stays responsive under bursts.
+    Jobs are reported as RUNNING while queued, since Witboost has no pending state;
+    while a job runs, its result reports how many operations it applied so far.
+
+    The jobs left RUNNING by a manager that is gone are resumed: the handlers
+    reconcile the desired state against IcePanel, so running a job again only
+    applies the operations that did not complete. Since the store may be shared
+    by the workers of a deployment, every job is owned by the manager running it,
+    and each manager renews a heartbeat in the store every `heartbeat_interval`
+    seconds. A job is only taken over once its owner stopped or missed three
+    heartbeats, which managers check at startup and then at every heartbeat. A
+    job that was already started `max_attempts` times, or whose kind has no
+    handler, is marked FAILED instead. Finished jobs are kept for `retention`
+    seconds, then compacted.
+
+    A job runs in a span that continues the trace of the request submitting it,
+    so that a trace shows the whole provisioning and not only the HTTP call.
+
+    Args:
+        store (JobStore): Where the jobs are persisted; opened by the manager.
+        handlers (Mapping[str, JobHandler]): The handler of each job kind.
+        workers (int): Number of jobs run concurrently.
+        queue_size (int): Maximum number of jobs waiting for a worker.
+        retention (float): Seconds a finished job is kept.
+        max_attempts (int, optional): How many times a job is started at most.
+        heartbeat_interval (float, optional): Seconds between two heartbeats.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Mapping[str, JobHandler],
+        workers: int,
+        queue_size: int,
+        retention: float,
+        max_attempts: int = 3,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+    ) -> None:
+        self._store = store
+        self._handlers = dict(handlers)
+        self._workers = workers
+        self._retention = retention
+        self._max_attempts = max_attempts
+        self._heartbeat_interval = heartbeat_interval
+        # identifies the jobs run by this manager in a store shared by processes
+        self._owner = uuid.uuid4().hex
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=queue_size)
+        # jobs queued or running in this process, by token
+        self._pending: Dict[str, Job] = {}
+        # trace context of the requests that submitted the queued jobs, by token
+        self._trace_contexts: Dict[str, context.Context] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._store.open)
+        await asyncio.to_thread(self._store.heartbeat, self._owner)
+        await self.compact()
+        resumable = await self._recover()
+        for i in range(self._workers):
+            self._tasks.append(
+                asyncio.create_task(self._work(), name=f"job-worker-{i}")
+            )
+        self._tasks.append(
+            asyncio.create_task(self._compact_periodically(), name="job-compaction")
+        )
+        self._tasks.append(asyncio.create_task(self._heartbeat(), name="job-heartbeat"))
+        self._schedule_resume(resumable)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._pending.clear()
+        self._trace_contexts.clear()
+        # the jobs interrupted here can be resumed right away
+        await asyncio.to_thread(self._store.release, self._owner)
+        await asyncio.to_thread(self._store.close)
+
+    async def submit(
+        self, kind: str, payload: str, data_product_id: str | None = None
+    ) -> Job:
+        """
+        Persists and queues a job.
+
+        Args:
+            kind (str): What the job does; must have a handler.
+            payload (str): The serialized request handed to the handler.
+            data_product_id (str, optional): The data product the job is about.
+
+        Returns:
+            Job: The queued job.
+
+        Raises:
+            JobQueueFullError: If too many jobs are already waiting.
+            KeyError: If no handler is registered for `kind`.
+        """  # noqa: E501
+        if kind not in self._handlers:
+            raise KeyError(f"No handler registered for {kind} jobs")
+        if self._queue.full():
+            raise JobQueueFullError(
+                "Too many requests are being processed, please retry later"
+            )
+        job = Job(
+            token=uuid.uuid4().hex,
+            kind=kind,
+            payload=payload,
+            data_product_id=data_product_id,
+            owner=self._owner,
+        )
+        await asyncio.to_thread(self._store.insert, job)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull as ex:
+            await asyncio.to_thread(self._store.delete, job.token)
+            raise JobQueueFullError(
+                "Too many requests are being processed, please retry later"
+            ) from ex
+        self._pending[job.token] = job
+        self._trace_contexts[job.token] = context.get_current()
+        return job
+
+    async def get(self, token: str) -> Job | None:
+        """
+        Returns a job by token, or None if it is unknown or was compacted. The
+        result of a running job that already applied some operations reports its
+        progress.
+        """  # noqa: E501
+        job = await asyncio.to_thread(self._store.get, token)
+        if job is not None and not job.finished:
+            applied, failed = await asyncio.to_thread(
+                self._store.operations_summary, token
+            )
+            if applied or failed:
+                job.result = (
+                    f"In progress: {applied} operations applied, {failed} failed"
+                )
+        return job
+
+    async def compact(self) -> int:
+        threshold = time.time() - self._retention
+        return await asyncio.to_thread(self._store.compact, threshold)
+
+    async def _recover(self) -> list[Job]:
+        stale_before = time.time() - MISSED_HEARTBEATS * self._heartbeat_interval
+        orphans = await asyncio.to_thread(
+            self._store.claim_orphans, self._owner, stale_before
+        )
+        resumable = []
+        for job in orphans:
+            if job.kind in self._handlers and job.attempts < self._max_attempts:
+                logger.info(f"Resuming job {job.token} ({job.kind})")
+                resumable.append(job)
+                self._pending[job.token] = job
+                continue
+            logger.warning(f"Job {job.token} ({job.kind}) cannot be resumed")
+            job.status = Status.FAILED
+            job.result = "The job was interrupted by a restart of the provisioner"
+            await asyncio.to_thread(self._store.update, job)
+        return resumable
+
+    def _schedule_resume(self, jobs: list[Job]) -> None:
+        if not jobs:
+            return
+        self._tasks = [task for task in self._tasks if not task.done()]
+        # waits for room in the queue without holding the startup or the heartbeat
+        self._tasks.append(asyncio.create_task(self._resume(jobs), name="job-resume"))
+
+    async def _resume(self, jobs: list[Job]) -> None:
+        for job in jobs:
+            await self._queue.put(job)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            try:
+                await asyncio.to_thread(self._store.heartbeat, self._owner)
+                self._schedule_resume(await self._recover())
+            except Exception as ex:
+                logger.error(f"Job heartbeat failed: {ex}")
+
+    async def _compact_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(COMPACTION_INTERVAL)
+            try:
+                await self.compact()
+            except Exception as ex:
+                logger.error(f"Job compaction failed: {ex}")
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as ex:
+                # the store failed: keep the worker alive for the next jobs
+                logger.error(f"Job {job.token} ({job.kind}) could not be saved: {ex}")
+            finally:
+                self._pending.pop(job.token, None)
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        async def progress(target: str, action: str, error: str | None) -> None:
+            await asyncio.to_thread(
+                self._store.record_operation, job.token, target, str(action), error
+            )
+
+        job.attempts += 1
+        attributes = {
+            "job.token": job.token,
+            "job.kind": job.kind,
+            "job.attempt": job.attempts,
+        }
+        if job.data_product_id is not None:
+            attributes["dataproduct.id"] = job.data_product_id
+        with tracer.start_as_current_span(
+            f"job {job.kind}",
+            # resumed jobs start a trace of their own
+            context=self._trace_contexts.pop(job.token, None),
+            attributes=attributes,
+        ) as span:
+            await asyncio.to_thread(self._store.update, job)
+            try:
+                job.result = await self._handlers[job.kind](job, progress)
+                job.status = Status.COMPLETED
+            except Exception as ex:
+                logger.error(f"Job {job.token} ({job.kind}) failed: {ex}")
+                span.record_exception(ex)
+                span.set_status(trace.StatusCode.ERROR, str(ex))
+                job.result = str(ex)
+                job.status = Status.FAILED
+            await asyncio.to_thread(self._store.update, job)
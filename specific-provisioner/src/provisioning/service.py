@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Callable, Dict, List, Tuple, TypeVar
+
+from opentelemetry import trace
+
+from src.icepanel.client import IcePanelClient
+from src.icepanel.executor import ExecutionResult, PlanExecutor, ProgressCallback
+from src.icepanel.fingerprint_store import FingerprintStore
+from src.icepanel.landscape_index import LandscapeGoneError, LandscapeView
+from src.icepanel.planner import (
+    Action,
+    ReconciliationPlan,
+    plan_data_product,
+    plan_data_product_removal,
+    plan_data_products,
+    skip_already_written,
+)
+from src.icepanel.snapshot_cache import LandscapeSnapshot, LandscapeSnapshotCache
+from src.models.data_product_descriptor import DataProduct
+from src.provisioning.write_scheduler import WriteScheduler, subtree_keys
+from src.utility.logger import get_logger
+
+logger = get_logger()
+tracer = trace.get_tracer(__name__)
+
+P = TypeVar("P")
+
+
+class ProvisioningError(Exception):
+    """
+    Raised when a data product could not be synchronized with IcePanel.
+    """
+
+
+def describe_result(data_product_id: str, result: ExecutionResult) -> str:
+    return (
+        f"Data product {data_product_id} synchronized with IcePanel: "
+        f"{result.created} created, {result.updated} updated, "
+        f"{result.skipped} unchanged"
+    )
+
+
+def describe_removal(data_product_id: str, result: ExecutionResult) -> str:
+    return (
+        f"Data product {data_product_id} removed from IcePanel: "
+        f"{result.deleted} deleted"
+    )
+
+
+def _failure(result: ExecutionResult) -> ProvisioningError | None:
+    if result.succeeded:
+        return None
+    errors = "; ".join(str(error) for error in result.errors)
+    return ProvisioningError(f"IcePanel synchronization failed: {errors}")
+
+
+def _raise_on_errors(result: ExecutionResult) -> None:
+    failure = _failure(result)
+    if failure is not None:
+        raise failure
+
+
+def _holding(
+    scheduler: WriteScheduler | None,
+    client: IcePanelClient,
+    data_products: List[DataProduct],
+) -> AbstractAsyncContextManager:
+    if scheduler is None:
+        return nullcontext()
+    return scheduler.hold(
+        key for dp in data_products for key in subtree_keys(client.landscape_id, dp)
+    )
+
+
+def _span(name: str, client: IcePanelClient, data_products: List[DataProduct]):
+    attributes = {
+        "icepanel.landscape_id": client.landscape_id,
+        "dataproduct.ids": [dp.id for dp in data_products],
+        "dataproduct.components": sum(len(dp.components) for dp in data_products),
+    }
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def _record_plans(plans: List[ReconciliationPlan]) -> None:
+    # planning converts the data products with toIcePanel() and diffs them
+    # against the landscape: its span counts the writes found
+    span = trace.get_current_span()
+    operations = [op for plan in plans for op in plan.operations()]
+    span.set_attribute("icepanel.plan.operations", len(operations))
+    span.set_attribute(
+        "icepanel.plan.writes",
+        sum(1 for op in operations if op.action != Action.NOOP),
+    )
+
+
+def _plan_reading(landscape: LandscapeView, plan: Callable[[LandscapeView], P]) -> P:
+    with landscape.reading():
+        return plan(landscape)
+
+
+async def _plan(
+    snapshot_cache: LandscapeSnapshotCache, plan: Callable[[LandscapeView], P]
+) -> Tuple[LandscapeSnapshot, P]:
+    """
+    Reads the landscape snapshot and plans against it in a worker thread, since the
+    lookups of a shared snapshot are SQLite queries. The whole plan reads the same
+    snapshot; if that snapshot was dropped before planning started, plans again
+    against a newer one.
+    """  # noqa: E501
+    while True:
+        snapshot = await snapshot_cache.get_snapshot()
+        try:
+            return snapshot, await asyncio.to_thread(
+                _plan_reading, snapshot.index, plan
+            )
+        except LandscapeGoneError:
+            logger.info("Landscape snapshot dropped while planning, reading it again")
+
+
+async def _skip_already_written(
+    plans: List[ReconciliationPlan],
+    snapshot: LandscapeSnapshot,
+    fingerprints: FingerprintStore | None,
+) -> None:
+    if fingerprints is None or not plans:
+        return
+    keys = [operation.key for plan in plans for operation in plan.operations()]
+    try:
+        known = await asyncio.to_thread(fingerprints.get_many, keys)
+    except Exception as ex:
+        logger.warning(f"Unable to read the IcePanel fingerprints: {ex}")
+        return
+    for plan in plans:
+        skipped = skip_already_written(plan, known, snapshot.taken_at)
+        if skipped:
+            logger.info(
+                f"Data product {plan.data_product_id}: {skipped} operations already "
+                "written since the landscape snapshot was taken"
+            )
+
+
+async def provision_data_product(
+    data_product: DataProduct,
+    client: IcePanelClient,
+    snapshot_cache: LandscapeSnapshotCache,
+    concurrency: int,
+    on_progress: ProgressCallback | None = None,
+    fingerprints: FingerprintStore | None = None,
+    scheduler: WriteScheduler | None = None,
+) -> ExecutionResult:
+    """
+    Draws a data product in the IcePanel landscape.
+
+    The current landscape is read from the snapshot cache, the writes needed to
+    match the data product are planned and only the real changes are sent. With
+    a fingerprint store, the writes the snapshot does not reflect yet but that
+    were already applied are skipped too. With a scheduler, the whole sequence
+    runs while no other provisioning writes to the same data product.
+
+    Args:
+        data_product (DataProduct): The data product to provision.
+        client (IcePanelClient): The client used to write to IcePanel.
+        snapshot_cache (LandscapeSnapshotCache): Cache of the landscape export.
+        concurrency (int): Maximum number of IcePanel writes in flight.
+        on_progress (ProgressCallback, optional): Notified after every write.
+        fingerprints (FingerprintStore, optional): What was last written to IcePanel.
+        scheduler (WriteScheduler, optional): Serializes conflicting writes.
+
+    Returns:
+        ExecutionResult: The outcome of the synchronization.
+
+    Raises:
+        ProvisioningError: If the landscape is not usable or some writes failed.
+    """  # noqa: E501
+    with _span("provision_data_product", client, [data_product]):
+        async with _holding(scheduler, client, [data_product]):
+            # default domain in the organization data mesh and landscape
+            # [hWFggyCYwu5kun6fpsu7]
+            try:
+                with tracer.start_as_current_span("icepanel.plan"):
+                    snapshot, plan = await _plan(
+                        snapshot_cache,
+                        lambda landscape: plan_data_product(data_product, landscape),
+                    )
+                    _record_plans([plan])
+            except ValueError as ex:
+                raise ProvisioningError(str(ex)) from ex
+            await _skip_already_written([plan], snapshot, fingerprints)
+
+            if plan.has_changes:
+                # the landscape is about to change: next reads must revalidate
+                # the snapshot
+                await snapshot_cache.expire()
+            executor = PlanExecutor(
+                client,
+                concurrency=concurrency,
+                on_progress=on_progress,
+                fingerprints=fingerprints,
+            )
+            result = await executor.execute(plan)
+            if plan.has_changes:
+                # a read made while the writes were in flight may have cached a
+                # snapshot without them: the next holder must not plan against it
+                await snapshot_cache.expire()
+        _raise_on_errors(result)
+        return result
+
+
+async def unprovision_data_product(
+    data_product: DataProduct,
+    client: IcePanelClient,
+    snapshot_cache: LandscapeSnapshotCache,
+    concurrency: int,
+    on_progress: ProgressCallback | None = None,
+    fingerprints: FingerprintStore | None = None,
+    scheduler: WriteScheduler | None = None,
+) -> ExecutionResult:
+    """
+    Removes a data product from the IcePanel landscape: its system object, its
+    components and every connection touching them. Removing a data product that
+    is not drawn is a no-op, so the call can safely be repeated.
+
+    Args:
+        data_product (DataProduct): The data product to remove.
+        client (IcePanelClient): The client used to write to IcePanel.
+        snapshot_cache (LandscapeSnapshotCache): Cache of the landscape export.
+        concurrency (int): Maximum number of IcePanel writes in flight.
+        on_progress (ProgressCallback, optional): Notified after every deletion.
+        fingerprints (FingerprintStore, optional): Forgets the deleted content.
+        scheduler (WriteScheduler, optional): Serializes conflicting writes.
+
+    Returns:
+        ExecutionResult: The outcome of the removal.
+
+    Raises:
+        ProvisioningError: If the landscape is not usable or some deletions failed.
+    """  # noqa: E501
+    with _span("unprovision_data_product", client, [data_product]):
+        async with _holding(scheduler, client, [data_product]):
+            try:
+                with tracer.start_as_current_span("icepanel.plan_removal"):
+                    _, plan = await _plan(
+                        snapshot_cache,
+                        lambda landscape: plan_data_product_removal(
+                            data_product, landscape
+                        ),
+                    )
+            except ValueError as ex:
+                raise ProvisioningError(str(ex)) from ex
+
+            if plan.has_changes:
+                await snapshot_cache.expire()
+            executor = PlanExecutor(
+                client,
+                concurrency=concurrency,
+                on_progress=on_progress,
+                fingerprints=fingerprints,
+            )
+            result = await executor.execute_removal(plan)
+            if plan.has_changes:
+                await snapshot_cache.expire()
+        _raise_on_errors(result)
+        return result
+
+
+async def provision_data_products(
+    data_products: List[DataProduct],
+    client: IcePanelClient,
+    snapshot_cache: LandscapeSnapshotCache,
+    concurrency: int,
+    on_progress: ProgressCallback | None = None,
+    fingerprints: FingerprintStore | None = None,
+    scheduler: WriteScheduler | None = None,
+) -> Dict[str, ExecutionResult | ProvisioningError]:
+    """
+    Draws several data products in the IcePanel landscape at once.
+
+    The landscape is read once and every data product is planned against it;
+    the plans then run side by side, sharing a single limit of `concurrency`
+    IcePanel writes in flight. A data product that fails does not stop the
+    others.
+
+    Args:
+        data_products (List[DataProduct]): The data products to provision.
+        client (IcePanelClient): The client used to write to IcePanel.
+        snapshot_cache (LandscapeSnapshotCache): Cache of the landscape export.
+        concurrency (int): Maximum number of IcePanel writes in flight overall.
+        on_progress (ProgressCallback, optional): Notified after every write.
+        fingerprints (FingerprintStore, optional): What was last written to IcePanel.
+        scheduler (WriteScheduler, optional): Serializes conflicting writes; the
+            batch holds the keys of all of its data products.
+
+    Returns:
+        Dict[str, ExecutionResult | ProvisioningError]: The outcome of each data
+            product, keyed by data product id, in the order of `data_products`.
+    """  # noqa: E501
+    with _span("provision_data_products", client, data_products):
+        async with _holding(scheduler, client, data_products):
+            with tracer.start_as_current_span("icepanel.plan"):
+                snapshot, batch = await _plan(
+                    snapshot_cache,
+                    lambda landscape: plan_data_products(data_products, landscape),
+                )
+                _record_plans(batch.plans)
+            await _skip_already_written(batch.plans, snapshot, fingerprints)
+
+            if batch.has_changes:
+                await snapshot_cache.expire()
+            semaphore = asyncio.Semaphore(concurrency)
+            results = await asyncio.gather(
+                *(
+                    PlanExecutor(
+                        client,
+                        semaphore=semaphore,
+                        on_progress=on_progress,
+                        fingerprints=fingerprints,
+                    ).execute(plan)
+                    for plan in batch.plans
+                )
+            )
+            if batch.has_changes:
+                await snapshot_cache.expire()
+
+        outcomes: Dict[str, ExecutionResult | ProvisioningError] = {}
+        for plan, result in zip(batch.plans, results):
+            outcomes[plan.data_product_id] = _failure(result) or result
+        for dp_id, error in batch.errors.items():
+            outcomes[dp_id] = ProvisioningError(error)
+        return {dp.id: outcomes[dp.id] for dp in data_products}
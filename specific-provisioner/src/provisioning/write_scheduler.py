@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List
+
+from src.icepanel.shared_snapshot import SharedSnapshotStore
+from src.models.data_product_descriptor import DataProduct
+from src.utility.logger import get_logger
+
+logger = get_logger()
+
+
+def subtree_keys(landscape_id: str, data_product: DataProduct) -> List[str]:
+    """
+    Returns the keys of the part of a landscape a data product writes to.
+
+    A data product is drawn as a system object, matched by name under the
+    landscape root, and its components below it: two data products with the same
+    id, or drawn with the same name, write to the same objects.
+    """  # noqa: E501
+    return [
+        f"{landscape_id}/dp/{data_product.id}",
+        f"{landscape_id}/system/{data_product.name}",
+    ]
+
+
+@dataclass
+class _KeyLock:
+    lock: asyncio.Lock
+    # holders and waiters: the lock is dropped once nobody uses it
+    users: int = 0
+
+
+class WriteScheduler:
+    """
+    Serializes the writes to the same part of an IcePanel landscape while
+    letting unrelated writes run in parallel.
+
+    A provisioning reads the landscape, plans the writes and applies them. Two
+    provisionings of the same data product running side by side would both plan
+    against a landscape without the other's writes, and both create the same
+    objects. Holding the keys of the data product (see `subtree_keys`) for the
+    whole read-plan-write sequence makes the second one wait and then plan
+    against the landscape as left by the first one. Data products of other
+    subtrees, or of other landscapes, hold other keys and are not delayed.
+
+    Keys are always acquired in sorted order, so that callers holding several
+    keys (e.g. a batch of data products) cannot deadlock. One lock is kept per
+    key in use, and dropped when released by its last user.
+
+    The locks only serialize the writes of one process. When the worker
+    processes of the provisioner share a `SharedSnapshotStore`, the keys are
+    also leased in it once the local locks are held, so that the writes of
+    different processes are serialized too. A lease is renewed while held, and
+    taken over by another process once its holder died for `lease` seconds.
+
+    Args:
+        leases (SharedSnapshotStore, optional): The store shared by the worker
+            processes, opened by the caller.
+        lease (float, optional): Seconds a write lease lasts without renewal.
+        poll_interval (float, optional): Seconds between two attempts to lease
+            keys held by another process.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        leases: SharedSnapshotStore | None = None,
+        lease: float = 30.0,
+        poll_interval: float = 0.1,
+    ) -> None:
+        self._locks: Dict[str, _KeyLock] = {}
+        self._leases = leases
+        self._lease = lease
+        self._poll_interval = poll_interval
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        # acquisitions that had to wait for another holder
+        self.contended = 0
+
+    @property
+    def held(self) -> int:
+        return sum(1 for entry in self._locks.values() if entry.lock.locked())
+
+    @asynccontextmanager
+    async def hold(self, keys: Iterable[str]) -> AsyncIterator[None]:
+        """
+        Waits until every key is free, then holds them until the block exits.
+        """
+        ordered = sorted(set(keys))
+        entries = []
+        for key in ordered:
+            entry = self._locks.setdefault(key, _KeyLock(asyncio.Lock()))
+            entry.users += 1
+            entries.append((key, entry))
+        acquired: List[_KeyLock] = []
+        try:
+            for _, entry in entries:
+                if entry.lock.locked():
+                    self.contended += 1
+                await entry.lock.acquire()
+                acquired.append(entry)
+            if self._leases is None:
+                yield
+            else:
+                async with self._leased(self._leases, ordered):
+                    yield
+        finally:
+            for entry in acquired:
+                entry.lock.release()
+            for key, entry in entries:
+                entry.users -= 1
+                if entry.users == 0:
+                    del self._locks[key]
+
+    @asynccontextmanager
+    async def _leased(
+        self, leases: SharedSnapshotStore, keys: List[str]
+    ) -> AsyncIterator[None]:
+        waited = False
+        while not await asyncio.to_thread(
+            leases.try_write_leases, keys, self._owner, self._lease
+        ):
+            # held by another process
+            if not waited:
+                self.contended += 1
+                waited = True
+            await asyncio.sleep(self._poll_interval)
+        renewal = asyncio.create_task(self._renew(leases, keys))
+        try:
+            yield
+        finally:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+            await asyncio.to_thread(leases.release_write_leases, keys, self._owner)
+
+    async def _renew(self, leases: SharedSnapshotStore, keys: List[str]) -> None:
+        while True:
+            await asyncio.sleep(self._lease / 3)
+            renewed = await asyncio.to_thread(
+                leases.try_write_leases, keys, self._owner, self._lease
+            )
+            if not renewed:
+                logger.warning(
+                    f"Write leases {keys} were taken over by another process"
+                )
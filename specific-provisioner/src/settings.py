@@ -0,0 +1,90 @@
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    """
+    Runtime configuration of the provisioner, read from environment variables.
+
+    The IcePanel landscape id and API key keep the variable names used by the
+    deployment (`IcePanelLandscapeId` and `API_KEY`); every other setting is read
+    from the upper-cased field name (e.g. `ICEPANEL_MAX_CONNECTIONS`).
+    """  # noqa: E501
+
+    icepanel_landscape_id: str = Field("", validation_alias="IcePanelLandscapeId")
+    icepanel_api_key: str = Field("", validation_alias="API_KEY")
+    # root of the IcePanel API, e.g. a local stand-in for tests and benchmarks
+    icepanel_base_url: str = "https://api.icepanel.io/v1"
+
+    # connection pool shared by every request towards IcePanel
+    icepanel_max_connections: int = 20
+    icepanel_max_keepalive_connections: int = 10
+    icepanel_keepalive_expiry: float = 30.0
+
+    # timeouts (in seconds) applied to every IcePanel call
+    icepanel_connect_timeout: float = 5.0
+    icepanel_read_timeout: float = 60.0
+    icepanel_write_timeout: float = 30.0
+    icepanel_pool_timeout: float = 10.0
+
+    # client-side rate limit shared by every call made with the same API key:
+    # sustained calls per second (0 disables it) and calls allowed at once
+    icepanel_rate_limit: float = 10.0
+    icepanel_rate_burst: int = 20
+
+    # retries of the IcePanel calls throttled (429) or failing transiently (5xx):
+    # calls made at most, and bounds of the jittered exponential backoff
+    icepanel_max_attempts: int = 4
+    icepanel_retry_base_delay: float = 0.5
+    icepanel_retry_max_delay: float = 30.0
+
+    # maximum number of IcePanel writes in flight for a provisioning request
+    icepanel_write_concurrency: int = 8
+
+    # seconds a downloaded landscape export is reused before being revalidated
+    icepanel_snapshot_ttl: float = 60.0
+    # SQLite database sharing the landscape snapshots between the worker
+    # processes, so that a landscape is downloaded by one of them at a time,
+    # and serializing their writes to the same data product; empty keeps a
+    # private snapshot cache in each process, and requires a single process
+    icepanel_snapshot_store_path: str = ""
+    # seconds a worker may spend refreshing a shared snapshot before another
+    # one takes over
+    icepanel_snapshot_lease: float = 30.0
+
+    # limits applied to the YAML descriptors received from Witboost
+    descriptor_max_bytes: int = 4 * 1024 * 1024
+    descriptor_max_depth: int = 64
+    descriptor_max_alias_expansion: int = 10_000
+    # parsed descriptors kept in memory, keyed by their content; sized by the
+    # total length of the cached descriptors
+    descriptor_cache_max_bytes: int = 64 * 1024 * 1024
+    descriptor_cache_max_entries: int = 1024
+
+    # directory of the SQLite databases that must outlive the process (jobs,
+    # fingerprints), e.g. a persistent volume; created at startup
+    data_dir: str = "data"
+
+    # background jobs serving the asynchronous endpoints
+    job_workers: int = 4
+    job_queue_size: int = 100
+    # seconds a finished job stays available to status polling
+    job_retention: float = 24 * 3600.0
+    # SQLite database persisting the jobs across restarts; empty keeps it in
+    # data_dir
+    job_store_path: str = ""
+    # how many times an interrupted job is started before being marked as failed
+    job_max_attempts: int = 3
+
+    # SQLite database recording the content last written to IcePanel; empty
+    # keeps it in data_dir
+    fingerprint_store_path: str = ""
+
+    # logs: level, JSON lines (or plain text) and longest field kept, in
+    # characters (0 keeps them whole)
+    log_level: str = "INFO"
+    log_json: bool = True
+    log_max_field_length: int = 2000
+
+
+settings = Settings()
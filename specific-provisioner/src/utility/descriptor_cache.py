@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Tuple, TypeVar
+
+from src.settings import settings
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """
+    Counters of a `DescriptorCache`.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that parsed the descriptor.
+        evictions (int): Entries dropped to make room for newer ones.
+        entries (int): Entries currently cached.
+        size (int): Total weight of the cached entries, in bytes.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def descriptor_key(descriptor: str) -> str:
+    """
+    The content address of a descriptor: a digest of its raw text.
+    """
+    return hashlib.blake2b(descriptor.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class DescriptorCache(Generic[T]):
+    """
+    LRU cache of parsed descriptors, keyed by a digest of the raw descriptor.
+
+    Witboost sends the same descriptor several times (validation then
+    provisioning, retries, re-deploys): the cache returns the outcome of the
+    first parsing, be it the validated data product or the validation error,
+    without parsing and validating it again. Cached values are shared between
+    requests and must not be mutated.
+
+    Eviction is size-aware: every entry weighs the size of its descriptor, a
+    fair proxy of the memory held by the parsed models, and the least recently
+    used entries are dropped until the total fits in `max_bytes`. A descriptor
+    heavier than the whole budget is parsed but not cached.
+
+    The cache is thread-safe, since descriptors are parsed in worker threads.
+    Two threads missing on the same descriptor at once both parse it.
+
+    Args:
+        max_bytes (int): Total weight of the cached entries; 0 disables the cache.
+        max_entries (int): Maximum number of cached entries.
+    """  # noqa: E501
+
+    def __init__(self, max_bytes: int, max_entries: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[T, int]] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size=self._size,
+            )
+
+    def get_or_parse(self, descriptor: str, parse: Callable[[str], T]) -> T:
+        """
+        Returns the cached outcome of parsing `descriptor`, or parses and caches it.
+
+        Args:
+            descriptor (str): The raw descriptor.
+            parse (Callable[[str], T]): Parses the descriptor; it should return
+                validation errors rather than raise them, so they are cached too.
+
+        Returns:
+            T: The outcome of `parse`.
+        """  # noqa: E501
+        key = descriptor_key(descriptor)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        value = parse(descriptor)
+        self._put(key, value, len(descriptor))
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _put(self, key: str, value: T, weight: int) -> None:
+        if weight > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (value, weight)
+            self._size += weight
+            while self._size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self._evictions += 1
+
+    @classmethod
+    def from_settings(cls) -> DescriptorCache[T]:
+        return cls(
+            max_bytes=settings.descriptor_cache_max_bytes,
+            max_entries=settings.descriptor_cache_max_entries,
+        )
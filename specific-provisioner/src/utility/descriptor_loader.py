@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Tuple
+
+import yaml
+
+from src.settings import settings
+
+try:
+    # libyaml bindings: an order of magnitude faster than the pure-Python scanner
+    from yaml import CSafeLoader as SafeLoader
+
+    LIBYAML_AVAILABLE = True
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader  # type: ignore[assignment]
+
+    LIBYAML_AVAILABLE = False
+
+
+class DescriptorLimitError(ValueError):
+    """
+    Raised when a descriptor exceeds one of the `DescriptorLimits`.
+    """
+
+
+@dataclass(frozen=True)
+class DescriptorLimits:
+    """
+    Bounds applied to a descriptor before it is turned into Python objects.
+
+    Attributes:
+        max_bytes (int): Maximum size of the descriptor, UTF-8 encoded.
+        max_depth (int): Maximum nesting of mappings and sequences.
+        max_alias_expansion (int): Maximum number of nodes that aliases add to
+            the document once expanded; guards against "billion laughs" style
+            descriptors, tiny as YAML but huge once validated or serialized.
+    """  # noqa: E501
+
+    max_bytes: int
+    max_depth: int
+    max_alias_expansion: int
+
+    @classmethod
+    def from_settings(cls) -> DescriptorLimits:
+        return cls(
+            max_bytes=settings.descriptor_max_bytes,
+            max_depth=settings.descriptor_max_depth,
+            max_alias_expansion=settings.descriptor_max_alias_expansion,
+        )
+
+
+def _children(node: yaml.Node) -> List[yaml.Node]:
+    if isinstance(node, yaml.MappingNode):
+        return [item for pair in node.value for item in pair]
+    if isinstance(node, yaml.SequenceNode):
+        return list(node.value)
+    return []
+
+
+def check_node_graph(root: yaml.Node, limits: DescriptorLimits) -> None:
+    """
+    Walks a composed YAML node graph and enforces the depth and alias expansion
+    limits. Aliases make the graph a DAG (or a cycle, for recursive aliases):
+    the expanded size of every node is computed once and memoized, so the walk
+    is linear in the size of the YAML text whatever the expansion.
+
+    Raises:
+        DescriptorLimitError: If a limit is exceeded or an alias is recursive.
+    """  # noqa: E501
+    expanded: dict[int, int] = {}
+    on_path = {id(root)}
+    stack: List[Tuple[yaml.Node, Iterator[yaml.Node]]] = [(root, iter(_children(root)))]
+    while stack:
+        node, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            on_path.discard(id(node))
+            expanded[id(node)] = 1 + sum(expanded[id(c)] for c in _children(node))
+            if expanded[id(node)] - len(expanded) > limits.max_alias_expansion:
+                raise DescriptorLimitError(
+                    "The descriptor expands to too many nodes through aliases "
+                    f"(limit {limits.max_alias_expansion})"
+                )
+            continue
+        if id(child) in expanded:
+            continue
+        if id(child) in on_path:
+            raise DescriptorLimitError("The descriptor contains a recursive alias")
+        on_path.add(id(child))
+        stack.append((child, iter(_children(child))))
+        if len(stack) > limits.max_depth:
+            raise DescriptorLimitError(
+                f"The descriptor is nested too deeply (limit {limits.max_depth})"
+            )
+
+
+def load_descriptor(text: str, limits: DescriptorLimits | None = None) -> Any:
+    """
+    Parses a YAML (or JSON) descriptor into Python objects, safely and quickly.
+
+    The libyaml-backed `CSafeLoader` is used when PyYAML was built with it, the
+    pure-Python `SafeLoader` otherwise. The document is first composed into a
+    node graph, checked against the limits, and only then constructed.
+
+    This function is CPU-bound: call `load_descriptor_async` from the event loop.
+
+    Args:
+        text (str): The descriptor.
+        limits (DescriptorLimits, optional): Defaults to the application settings.
+
+    Returns:
+        Any: The parsed document, None if it is empty.
+
+    Raises:
+        DescriptorLimitError: If the descriptor exceeds the limits.
+        yaml.YAMLError: If the descriptor is not valid YAML.
+    """  # noqa: E501
+    limits = limits or DescriptorLimits.from_settings()
+    size = len(text.encode("utf-8"))
+    if size > limits.max_bytes:
+        raise DescriptorLimitError(
+            f"The descriptor is too large: {size} bytes (limit {limits.max_bytes})"
+        )
+
+    loader = SafeLoader(text)
+    try:
+        node = loader.get_single_node()
+        if node is None:
+            return None
+        check_node_graph(node, limits)
+        return loader.construct_document(node)
+    finally:
+        loader.dispose()
+
+
+async def load_descriptor_async(
+    text: str, limits: DescriptorLimits | None = None
+) -> Any:
+    """
+    Same as `load_descriptor`, run in a worker thread to keep the event loop free.
+    """  # noqa: E501
+    return await asyncio.to_thread(load_descriptor, text, limits)
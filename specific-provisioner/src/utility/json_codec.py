@@ -0,0 +1,24 @@
+from typing import Any
+
+import orjson
+
+JSON_CONTENT_TYPE = "application/json"
+
+
+def loads(data: bytes | str) -> Any:
+    """
+    Decodes a JSON document with orjson, several times faster than the standard
+    library and far faster than a YAML loader on large documents.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+    """
+    return orjson.loads(data)
+
+
+def dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """
+    Encodes a value as compact UTF-8 JSON with orjson. With `sort_keys` the
+    output is canonical, i.e. suitable for hashing.
+    """
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else None)
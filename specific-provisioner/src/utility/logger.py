@@ -1,13 +1,198 @@
+import copy
 import logging
+import queue
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Any, Dict, Iterable
+
+from opentelemetry import trace
+
+from src.utility import json_codec
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+TEXT_DATE_FORMAT = "%d-%b-%y %H:%M"
+
+REDACTED = "[REDACTED]"
+# credentials as they appear in headers and in dumped dicts, JSON or query strings
+_CREDENTIALS = [
+    (re.compile(r"\b(ApiKey|Bearer|Basic)\s+[^\s'\",;}]+"), rf"\1 {REDACTED}"),
+    (
+        re.compile(
+            r"(?i)([\"']?\b(?:api[_-]?key|authorization|password|secret|"
+            r"access[_-]?token)[\"']?\s*[:=]\s*[\"']?)"
+            # a header value with a scheme is redacted by the pattern above
+            r"(?!(?:ApiKey|Bearer|Basic)\s)[^\s'\",;&}]+"
+        ),
+        rf"\1{REDACTED}",
+    ),
+]
+_SECRET_KEYS = re.compile(
+    r"(?i)api[_-]?key|authorization|password|secret|access[_-]?token"
+)
+# the attributes of every log record: anything else was passed as `extra`
+_RECORD_ATTRIBUTES = {
+    *logging.LogRecord("", 0, "", 0, "", (), None).__dict__,
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_listener: QueueListener | None = None
+_handler: logging.Handler | None = None
 
 
 def get_logger(name=""):
-    default_log_args = {
-        "level": logging.INFO,
-        "format": "%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-        "datefmt": "%d-%b-%y %H:%M",
-        "force": True,
-    }
-    logging.basicConfig(**default_log_args)
-    logger = logging.getLogger(name)
-    return logger
+    """
+    Returns a logger. Logging is configured once at startup by
+    `configure_logging`; until then only warnings and errors reach stderr.
+    """
+    return logging.getLogger(name)
+
+
+class LogFormatter(logging.Formatter):
+    """
+    Renders log records as JSON objects, one per line, or as plain text.
+
+    Every message, traceback and `extra` field is redacted, i.e. stripped of
+    the credentials found in headers (`ApiKey ...`, `Bearer ...`), of the
+    values of keys such as `api_key` or `password` and of the `secrets` given,
+    then truncated to `max_length` characters, so that a payload logged for
+    debugging can neither leak a secret nor flood the output. Structured
+    values (dicts, lists) in `extra` are rendered as JSON before truncation.
+
+    Args:
+        json_output (bool, optional): JSON lines rather than plain text.
+        max_length (int, optional): Longest field kept; 0 keeps them whole.
+        secrets (Iterable[str], optional): Values to redact wherever they appear.
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        json_output: bool = True,
+        max_length: int = 2000,
+        secrets: Iterable[str] = (),
+    ) -> None:
+        super().__init__(TEXT_FORMAT, TEXT_DATE_FORMAT)
+        self.json_output = json_output
+        self.max_length = max_length
+        # too short to be told apart from ordinary text
+        self.secrets = [secret for secret in secrets if len(secret) >= 4]
+
+    def clean(self, text: str) -> str:
+        for secret in self.secrets:
+            text = text.replace(secret, REDACTED)
+        for pattern, replacement in _CREDENTIALS:
+            text = pattern.sub(replacement, text)
+        if self.max_length and len(text) > self.max_length:
+            dropped = len(text) - self.max_length
+            text = f"{text[:self.max_length]}... [{dropped} more characters]"
+        return text
+
+    def _value(self, key: str, value: Any) -> Any:
+        if _SECRET_KEYS.search(key):
+            return REDACTED
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", errors="replace")
+        elif not isinstance(value, str):
+            try:
+                value = json_codec.dumps(value).decode()
+            except TypeError:
+                value = str(value)
+        return self.clean(value)
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = self.clean(record.getMessage())
+        exception = record.exc_text
+        if record.exc_info and not exception:
+            exception = self.formatException(record.exc_info)
+        if not self.json_output:
+            text = f"{self.formatTime(record, self.datefmt)} [{record.levelname}] "
+            text += f"{record.name} - {message}"
+            return f"{text}\n{self.clean(exception)}" if exception else text
+
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+        }
+        if exception:
+            entry["exception"] = self.clean(exception)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = self._value(key, value)
+        return json_codec.dumps(entry).decode()
+
+
+class _NonBlockingHandler(QueueHandler):
+    """
+    Hands the records to the listener thread, which formats and writes them:
+    logging never waits for the output. Only the message is rendered here, as
+    its arguments may change afterwards, together with the trace context of
+    the current span.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        span = trace.get_current_span().get_span_context()
+        if span.is_valid:
+            record.trace_id = format(span.trace_id, "032x")
+            record.span_id = format(span.span_id, "016x")
+        return record
+
+
+def configure_logging(
+    level: str | int = logging.INFO,
+    json_output: bool = True,
+    max_length: int = 2000,
+    secrets: Iterable[str] = (),
+    stream: IO[str] | None = None,
+) -> None:
+    """
+    Routes the records of every logger to `stream` (stderr by default) through
+    a queue drained by a background thread, formatted by a `LogFormatter`.
+
+    Configuring again replaces the previous configuration; handlers installed
+    by others (e.g. a test runner) are left alone.
+
+    Args:
+        level (str | int, optional): Level of the root logger.
+        json_output (bool, optional): JSON lines rather than plain text.
+        max_length (int, optional): Longest field kept; 0 keeps them whole.
+        secrets (Iterable[str], optional): Values to redact wherever they appear.
+        stream (IO[str], optional): Where to write the logs.
+    """  # noqa: E501
+    global _listener, _handler
+    shutdown_logging()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(LogFormatter(json_output, max_length, secrets))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _handler = _NonBlockingHandler(records)
+    _listener = QueueListener(records, output)
+    _listener.start()
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """
+    Writes the records still queued and removes the handler installed by
+    `configure_logging`, if any.
+    """
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
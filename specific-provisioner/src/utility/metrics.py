@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List
+
+from prometheus_client import Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# seconds: from a cached lookup to a slow IcePanel export
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+@dataclass(frozen=True)
+class Reading:
+    """
+    An unlabelled metric whose value is read from a counter the adapter already
+    keeps, e.g. the hits of the snapshot cache.
+
+    Attributes:
+        name (str): Name of the metric; counters end with `_total`.
+        documentation (str): Help text of the metric.
+        read (Callable[[], float]): Returns the current value.
+        counter (bool): Whether the value only goes up; a gauge otherwise.
+    """  # noqa: E501
+
+    name: str
+    documentation: str
+    read: Callable[[], float]
+    counter: bool = False
+
+
+class ReadingsCollector(Collector):
+    """
+    Collects `readings` at every scrape, so that they cost nothing on the
+    request path. Register it while the objects it reads are alive, and
+    unregister it once they are closed.
+    """  # noqa: E501
+
+    def __init__(self, readings: List[Reading]) -> None:
+        self._readings = readings
+
+    def collect(self) -> Iterator[Metric]:
+        for reading in self._readings:
+            family = CounterMetricFamily if reading.counter else GaugeMetricFamily
+            yield family(reading.name, reading.documentation, value=reading.read())
+
+
+class RouteMetricsMiddleware:
+    """
+    ASGI middleware observing the latency of every HTTP request in `histogram`,
+    labelled by method, route template and status code. Requests that match no
+    route are labelled with the `unmatched` route, so that unknown paths cannot
+    grow the label set.
+    """  # noqa: E501
+
+    def __init__(self, app: ASGIApp, histogram: Histogram) -> None:
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # set by the router on the scope it was handed
+            route = scope.get("route")
+            self.histogram.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            ).observe(time.perf_counter() - start)
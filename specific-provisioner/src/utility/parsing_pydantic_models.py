@@ -1,9 +1,9 @@
 from typing import Type, TypeVar
 
-import yaml
 from pydantic import BaseModel
 
 from src.models.api_models import ValidationError
+from src.utility.descriptor_loader import load_descriptor
 from src.utility.logger import get_logger
 
 logger = get_logger()
@@ -16,6 +16,9 @@ def parse_yaml_with_model(yaml_data: dict | str, model: Type[T]) -> T | Validati
     """
     Parse YAML data using a Pydantic model.
 
+    YAML strings are loaded with `load_descriptor`, so they are subject to its
+    size, depth and alias expansion limits.
+
     This function takes either a dictionary containing YAML data or a YAML string,
     along with a Pydantic model class as input. It attempts to create an instance
     of the provided Pydantic model using the data from the input.
@@ -57,7 +60,7 @@ def parse_yaml_with_model(yaml_data: dict | str, model: Type[T]) -> T | Validati
     """  # noqa: E501
     try:
         if isinstance(yaml_data, str):
-            yaml_dict = yaml.safe_load(yaml_data)
+            yaml_dict = load_descriptor(yaml_data)
         else:
             yaml_dict = yaml_data
 
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Any, Callable, Coroutine, Dict
+
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.models.api_models import SystemErr
+from src.utility import json_codec
+from src.utility.logger import get_logger
+
+logger = get_logger()
+
+_UNEXPECTED_ERROR = SystemErr(
+    error="An unexpected error occurred while processing the request. "
+    "If the issue still persists, contact the platform team for assistance!"
+).model_dump_json()
+
+
+def unexpected_error() -> Response:
+    """
+    The 500 answered when a route cannot render its response.
+    """
+    return Response(
+        status_code=500,
+        content=_UNEXPECTED_ERROR,
+        media_type=json_codec.JSON_CONTENT_TYPE,
+    )
+
+
+class ResponseTable:
+    """
+    The status code of each response model of a route, as declared by its
+    `responses`, precomputed so that rendering a response is a dict lookup.
+
+    When a model is declared for several status codes, the first one wins.
+
+    Args:
+        responses (dict): The `responses` of the route, e.g.
+            `{"200": {"model": ProvisioningStatus}, "500": {"model": SystemErr}}`.
+    """  # noqa: E501
+
+    def __init__(self, responses: Dict[Any, Any]) -> None:
+        self.status_codes: Dict[Any, int] = {}
+        for code, response in responses.items():
+            # "default" and other non-numeric keys have no status code to answer
+            if not str(code).isdigit() or not isinstance(response, dict):
+                continue
+            if "model" in response:
+                self.status_codes.setdefault(response["model"], int(code))
+
+    def render(self, out_response: Any) -> Response:
+        """
+        Renders `out_response` with the status code declared for its type:
+        models as JSON (encoded by orjson), anything else as text. A type the
+        route does not declare is answered with a 500 `SystemErr`.
+        """  # noqa: E501
+        status_code = self.status_codes.get(type(out_response))
+        if status_code is None:
+            logger.error("Check response type: response type indicated not allowed")
+            return unexpected_error()
+
+        if isinstance(out_response, BaseModel):
+            content = json_codec.dumps(out_response.model_dump(mode="json"))
+            media_type = json_codec.JSON_CONTENT_TYPE
+        elif isinstance(out_response, list) and all(
+            isinstance(item, BaseModel) for item in out_response
+        ):
+            content = json_codec.dumps(
+                [item.model_dump(mode="json") for item in out_response]
+            )
+            media_type = json_codec.JSON_CONTENT_TYPE
+        else:
+            content = str(out_response).encode()
+            media_type = "text/plain"
+        return Response(status_code=status_code, content=content, media_type=media_type)
+
+
+# the response table of the route whose endpoint is running, if any
+current_responses: ContextVar[ResponseTable | None] = ContextVar(
+    "current_responses", default=None
+)
+
+
+class ResponseCheckedRoute(APIRoute):
+    """
+    An `APIRoute` that builds its `ResponseTable` once, when it is declared,
+    and makes it the `current_responses` while its endpoint runs, so that
+    `check_response` finds the responses of the calling route without looking
+    it up.
+    """  # noqa: E501
+
+    response_table: ResponseTable
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        # called by APIRoute.__init__, once the responses are set
+        self.response_table = table = ResponseTable(self.responses)
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            # copied into the worker thread of synchronous endpoints too
+            token = current_responses.set(table)
+            try:
+                return await handler(request)
+            finally:
+                current_responses.reset(token)
+
+        return route_handler
@@ -0,0 +1,5 @@
+import os
+
+# keep the jobs of the application under test out of the working directory
+os.environ.setdefault("JOB_STORE_PATH", ":memory:")
+os.environ.setdefault("FINGERPRINT_STORE_PATH", ":memory:")
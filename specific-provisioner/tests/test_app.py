@@ -8,7 +8,10 @@ from starlette.testclient import TestClient
 
 from src.check_return_type import check_response
 from src.models.api_models import SystemErr, ValidationError
+from src.utility.route_responses import ResponseCheckedRoute, ResponseTable
 
+# a plain FastAPI application: check_response finds its routes by the name of
+# the calling function
 app2 = FastAPI()
 
 
@@ -44,8 +47,41 @@ def fun1(request: RequestModel) -> Response:
         return check_response(out_response=resp2, application=app2)
 
 
+def _render2() -> Response:
+    return check_response(out_response="ris=202", application=app2)
+
+
+@app2.get(
+    "/v1/test/helper",
+    response_model=None,
+    responses={"202": {"model": str}, "500": {"model": SystemErr}},
+)
+def fun2() -> Response:
+    return _render2()
+
+
 client = TestClient(app2)
 
+app3 = FastAPI()
+app3.router.route_class = ResponseCheckedRoute
+
+
+def _render(val: int) -> Response:
+    # not named after the route: only the current table can tell its responses
+    return check_response(out_response=val if val else "zero", application=app3)
+
+
+@app3.get(
+    "/v1/test/{val}",
+    response_model=None,
+    responses={"200": {"model": int}, "500": {"model": SystemErr}},
+)
+def fun3(val: int) -> Response:
+    return _render(val)
+
+
+client3 = TestClient(app3)
+
 
 class testApp(unittest.TestCase):
     def test_fun1_valid_input_200(self):
@@ -84,6 +120,12 @@ class testApp(unittest.TestCase):
         self.assertEqual(response.status_code, 422)
         self.assertIn("detail", response.json())
 
+    def test_caller_name_fallback_only_finds_route_functions(self):
+        # _render2 is not a route of app2: its responses cannot be found by name
+        response = client.get("/v1/test/helper")
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("error", response.json())
+
 
 class TestCheckResponses(unittest.TestCase):
     def test_check_responses_valid_response(self):
@@ -113,3 +155,51 @@ class TestCheckResponses(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 500)
         self.assertIn("error", json.loads(response.body))
+
+    def test_models_are_rendered_as_compact_utf8_json(self):
+        response = check_response(
+            out_response=ValidationError(errors=["wrong input", "città"]),
+            responses={"400": {"model": ValidationError}},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.body, '{"errors":["wrong input","città"]}'.encode())
+
+    def test_lists_of_models_are_rendered_as_json_arrays(self):
+        response = check_response(
+            out_response=[SystemErr(error="a"), SystemErr(error="b")],
+            responses={"500": {"model": list}},
+        )
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.body, b'[{"error":"a"},{"error":"b"}]')
+
+    def test_other_values_are_rendered_as_text(self):
+        response = check_response(
+            out_response="ris=202", responses={"202": {"model": str}}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers["content-type"], "text/plain; charset=utf-8")
+        self.assertEqual(response.body, b"ris=202")
+
+
+class TestResponseCheckedRoute(unittest.TestCase):
+    def test_renders_from_the_table_of_the_current_route(self):
+        response = client3.get("/v1/test/3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), 3)
+
+    def test_undeclared_type_is_a_500(self):
+        response = client3.get("/v1/test/0")
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("error", response.json())
+
+    def test_table_keeps_the_first_status_code_of_a_model(self):
+        table = ResponseTable(
+            {
+                "default": {"model": str},
+                "202": {"model": str},
+                "400": {"model": SystemErr},
+                "500": {"model": SystemErr},
+            }
+        )
+        self.assertEqual(table.status_codes, {str: 202, SystemErr: 400})
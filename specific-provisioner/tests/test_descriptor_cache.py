@@ -0,0 +1,144 @@
+import threading
+import unittest
+from unittest import mock
+
+import yaml
+
+from src.dependencies import descriptor_cache, unpack_provisioning_request
+from src.models.api_models import DescriptorKind, ProvisioningRequest, ValidationError
+from src.utility.descriptor_cache import DescriptorCache, descriptor_key
+from tests.test_planner import DATA_PRODUCT
+
+
+class TestDescriptorCache(unittest.TestCase):
+    def test_parses_once_per_descriptor(self):
+        cache = DescriptorCache(max_bytes=1000, max_entries=10)
+        parse = mock.Mock(side_effect=lambda text: text.upper())
+
+        self.assertEqual(cache.get_or_parse("abc", parse), "ABC")
+        self.assertEqual(cache.get_or_parse("abc", parse), "ABC")
+        self.assertEqual(cache.get_or_parse("xyz", parse), "XYZ")
+
+        self.assertEqual(parse.call_count, 2)
+        stats = cache.stats
+        self.assertEqual((stats.hits, stats.misses, stats.entries), (1, 2, 2))
+        self.assertEqual(stats.size, 6)
+        self.assertAlmostEqual(stats.hit_ratio, 1 / 3)
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = DescriptorCache(max_bytes=10, max_entries=10)
+        parse = mock.Mock(side_effect=len)
+
+        cache.get_or_parse("aaaa", parse)
+        cache.get_or_parse("bbbb", parse)
+        cache.get_or_parse("aaaa", parse)  # bbbb is now the least recently used
+        cache.get_or_parse("cccc", parse)  # 12 bytes: bbbb is evicted
+
+        self.assertEqual(cache.stats.evictions, 1)
+        self.assertEqual(cache.stats.size, 8)
+        cache.get_or_parse("aaaa", parse)
+        self.assertEqual(parse.call_count, 3)
+        cache.get_or_parse("bbbb", parse)
+        self.assertEqual(parse.call_count, 4)
+
+    def test_evicts_by_entry_count(self):
+        cache = DescriptorCache(max_bytes=1000, max_entries=2)
+        for text in ("a", "b", "c"):
+            cache.get_or_parse(text, str.upper)
+        self.assertEqual(cache.stats.entries, 2)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_does_not_cache_oversized_descriptor(self):
+        cache = DescriptorCache(max_bytes=3, max_entries=10)
+        cache.get_or_parse("abcd", str.upper)
+        self.assertEqual(cache.stats.entries, 0)
+
+    def test_disabled(self):
+        cache = DescriptorCache(max_bytes=0, max_entries=10)
+        parse = mock.Mock(return_value=1)
+        cache.get_or_parse("a", parse)
+        cache.get_or_parse("a", parse)
+        self.assertEqual(parse.call_count, 2)
+
+    def test_thread_safe(self):
+        cache = DescriptorCache(max_bytes=50, max_entries=100)
+
+        def work():
+            for i in range(500):
+                cache.get_or_parse(str(i % 40), str.upper)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats
+        self.assertEqual(stats.hits + stats.misses, 2000)
+        self.assertLessEqual(stats.size, 50)
+
+    def test_key_is_content_address(self):
+        self.assertEqual(descriptor_key("a: 1"), descriptor_key("a: 1"))
+        self.assertNotEqual(descriptor_key("a: 1"), descriptor_key("a: 2"))
+
+
+class TestUnpackProvisioningRequestCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        descriptor_cache.clear()
+
+    async def test_caches_validation_errors(self):
+        request = ProvisioningRequest(
+            descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+            descriptor="dataproduct:\n  id: dp\n",
+        )
+        before = descriptor_cache.stats
+
+        first = await unpack_provisioning_request(request)
+        second = await unpack_provisioning_request(request)
+
+        self.assertIsInstance(first, ValidationError)
+        self.assertIs(first, second)
+        after = descriptor_cache.stats
+        self.assertEqual(after.misses - before.misses, 1)
+        self.assertEqual(after.hits - before.hits, 1)
+
+    async def test_unexpected_errors_are_invalid_but_not_cached(self):
+        request = ProvisioningRequest(
+            descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+            descriptor="dataproduct:\n  id: dp\n",
+        )
+        before = descriptor_cache.stats
+
+        with mock.patch(
+            "src.dependencies.parse_yaml_with_model", side_effect=RuntimeError("bug")
+        ):
+            first = await unpack_provisioning_request(request)
+        second = await unpack_provisioning_request(request)
+
+        self.assertEqual(first.errors, ["Unable to parse the descriptor.", "bug"])
+        self.assertIsInstance(second, ValidationError)
+        self.assertNotEqual(second.errors, first.errors)
+        self.assertEqual(descriptor_cache.stats.hits, before.hits)
+
+    async def test_null_reads_from_is_invalid(self):
+        workload = {**DATA_PRODUCT["components"][1], "readsFrom": None}
+        data_product = {**DATA_PRODUCT, "components": [workload]}
+        request = ProvisioningRequest(
+            descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+            descriptor=yaml.safe_dump({"dataproduct": data_product}),
+        )
+
+        for _ in range(2):
+            outcome = await unpack_provisioning_request(request)
+            self.assertIsInstance(outcome, ValidationError)
+            self.assertEqual(outcome.errors[0], "Unable to parse the descriptor.")
+        self.assertEqual(descriptor_cache.stats.entries, 0)
+
+    async def test_descriptors_that_are_not_mappings_are_invalid(self):
+        for descriptor in ("just text", "dataproduct: text", "- a\n- b", "a: [b"):
+            request = ProvisioningRequest(
+                descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+                descriptor=descriptor,
+            )
+            outcome = await unpack_provisioning_request(request)
+            self.assertIsInstance(outcome, ValidationError)
+            self.assertEqual(outcome.errors[0], "Unable to parse the descriptor.")
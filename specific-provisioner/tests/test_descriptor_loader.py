@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+
+import yaml
+
+from src.utility import descriptor_loader
+from src.utility.descriptor_loader import (
+    DescriptorLimitError,
+    DescriptorLimits,
+    load_descriptor,
+    load_descriptor_async,
+)
+
+LIMITS = DescriptorLimits(max_bytes=10_000, max_depth=10, max_alias_expansion=100)
+
+BILLION_LAUGHS = """
+a: &a ["lol", "lol", "lol", "lol", "lol", "lol", "lol", "lol", "lol"]
+b: &b [*a, *a, *a, *a, *a, *a, *a, *a, *a]
+c: &c [*b, *b, *b, *b, *b, *b, *b, *b, *b]
+d: &d [*c, *c, *c, *c, *c, *c, *c, *c, *c]
+"""
+
+
+class TestDescriptorLoader(unittest.IsolatedAsyncioTestCase):
+    def test_loads_yaml(self):
+        text = (
+            "dataproduct:\n"
+            "  id: dp1\n"
+            "  tags: [a, b]\n"
+            "  base: &base {x: 1}\n"
+            "  copy: *base\n"
+        )
+
+        self.assertEqual(
+            load_descriptor(text, LIMITS),
+            {
+                "dataproduct": {
+                    "id": "dp1",
+                    "tags": ["a", "b"],
+                    "base": {"x": 1},
+                    "copy": {"x": 1},
+                }
+            },
+        )
+
+    def test_empty_descriptor(self):
+        self.assertIsNone(load_descriptor("", LIMITS))
+
+    def test_size_limit(self):
+        with self.assertRaisesRegex(DescriptorLimitError, "too large"):
+            load_descriptor("a: " + "x" * 10_000, LIMITS)
+
+    def test_depth_limit(self):
+        nested = "[" * 11 + "]" * 11
+        load_descriptor("[" * 9 + "]" * 9, LIMITS)
+        with self.assertRaisesRegex(DescriptorLimitError, "nested too deeply"):
+            load_descriptor(nested, LIMITS)
+
+    def test_alias_expansion_limit(self):
+        with self.assertRaisesRegex(DescriptorLimitError, "through aliases"):
+            load_descriptor(BILLION_LAUGHS, LIMITS)
+
+    def test_recursive_alias(self):
+        with self.assertRaisesRegex(DescriptorLimitError, "recursive alias"):
+            load_descriptor("a: &a [*a]", LIMITS)
+
+    def test_invalid_yaml(self):
+        with self.assertRaises(yaml.YAMLError):
+            load_descriptor("a: [", LIMITS)
+
+    def test_pure_python_fallback(self):
+        with mock.patch.object(descriptor_loader, "SafeLoader", yaml.SafeLoader):
+            self.assertEqual(load_descriptor("a: [1, 2]", LIMITS), {"a": [1, 2]})
+            with self.assertRaises(DescriptorLimitError):
+                load_descriptor(BILLION_LAUGHS, LIMITS)
+
+    async def test_async_variant(self):
+        self.assertEqual(await load_descriptor_async("a: 1", LIMITS), {"a": 1})
@@ -0,0 +1,95 @@
+import asyncio
+import copy
+import unittest
+
+from src.icepanel.executor import PlanExecutor
+from src.icepanel.planner import Action, plan_data_product
+from src.models.data_product_descriptor import DataProduct
+from tests.test_planner import DATA_PRODUCT, _landscape
+
+
+def _wide_data_product(components: int) -> DataProduct:
+    descriptor = copy.deepcopy(DATA_PRODUCT)
+    template = descriptor["components"][1]
+    descriptor["components"] = [
+        {**template, "id": f"wl{i}", "name": f"Workload {i}"} for i in range(components)
+    ]
+    # every workload depends on the first one
+    for component in descriptor["components"][1:]:
+        component["dependsOn"] = ["wl0"]
+    return DataProduct(**descriptor)
+
+
+class SlowClient:
+    def __init__(self, fail_on: str | None = None):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.order: list[str] = []
+        self.fail_on = fail_on
+
+    async def _call(self, label: str) -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.order.append(label)
+        if label == self.fail_on:
+            raise RuntimeError("boom")
+        return f"id-{label}"
+
+    async def post_component(self, component):
+        return await self._call(component.name)
+
+    async def post_connection(self, connection):
+        return await self._call(f"{connection.originId}->{connection.targetId}")
+
+    async def patch(self, objectDict, objectType, objId):
+        return await self._call(objId)
+
+
+class TestPlanExecutor(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrency_is_bounded(self):
+        client = SlowClient()
+        plan = plan_data_product(_wide_data_product(20), _landscape([], []))
+
+        result = await PlanExecutor(client, concurrency=4).execute(  # type: ignore[arg-type]
+            plan
+        )
+
+        self.assertTrue(result.succeeded)
+        self.assertEqual(result.created, 1 + 20 + 19)
+        self.assertEqual(client.max_in_flight, 4)
+
+    async def test_dependency_order(self):
+        client = SlowClient()
+        plan = plan_data_product(_wide_data_product(5), _landscape([], []))
+
+        await PlanExecutor(client, concurrency=10).execute(plan)  # type: ignore[arg-type]
+
+        self.assertEqual(client.order[0], "Sales")
+        components = {f"Workload {i}" for i in range(5)}
+        self.assertEqual(set(client.order[1:6]), components)
+        self.assertTrue(all("->" in label for label in client.order[6:]))
+
+    async def test_errors_are_aggregated(self):
+        client = SlowClient(fail_on="Workload 0")
+        plan = plan_data_product(_wide_data_product(5), _landscape([], []))
+
+        result = await PlanExecutor(client).execute(plan)  # type: ignore[arg-type]
+
+        self.assertFalse(result.succeeded)
+        # the failed component plus the 4 connections pointing to it
+        self.assertEqual(len(result.errors), 5)
+        self.assertEqual(result.errors[0].target, "wl0")
+        self.assertEqual(result.errors[0].action, Action.CREATE)
+        self.assertIn("not run", result.errors[1].error)
+        self.assertEqual(result.created, 1 + 4)
+
+    async def test_failed_system_stops_the_plan(self):
+        client = SlowClient(fail_on="Sales")
+        plan = plan_data_product(_wide_data_product(3), _landscape([], []))
+
+        result = await PlanExecutor(client).execute(plan)  # type: ignore[arg-type]
+
+        self.assertEqual(client.order, ["Sales"])
+        self.assertEqual(len(result.errors), 4)
@@ -0,0 +1,95 @@
+import copy
+import hashlib
+import json
+import tracemalloc
+import unittest
+
+from src.icepanel.export_reader import ExportReader
+from src.models.icepanel import IcePanelData
+from tests.test_icepanel_client import EXPORT
+
+
+def _read(body: bytes, chunk_size: int):
+    reader = ExportReader()
+    for i in range(0, len(body), chunk_size):
+        reader.feed(body[i : i + chunk_size])
+    return reader, reader.close()
+
+
+class TestExportReader(unittest.TestCase):
+    def test_any_chunking_gives_the_same_export(self):
+        body = json.dumps(EXPORT, indent=2).encode()
+        expected = IcePanelData(**EXPORT).model_dump()
+
+        for chunk_size in (1, 2, 3, 5, 64, len(body)):
+            reader, data = _read(body, chunk_size)
+            self.assertEqual(data.model_dump(), expected)
+            self.assertEqual(reader.content_hash, hashlib.sha256(body).hexdigest())
+
+    def test_only_used_sections_and_fields_are_kept(self):
+        export = copy.deepcopy(EXPORT)
+        export["flows"] = {"f1": {"id": "f1", "steps": {"s1": {"id": "s1"}}}}
+        export["tags"] = {"t1": {"color": "red", "groupId": "g", "id": "t1"}}
+        export["version"] = 3
+        export["modelObjects"]["root"]["diagrams"] = {"d": {"id": "d"}}
+        export["modelObjects"]["root"]["name"] = "Root è"
+
+        _, data = _read(json.dumps(export).encode(), 7)
+
+        self.assertEqual(data.flows, {})
+        self.assertEqual(data.tags, {})
+        self.assertEqual(data.modelObjects["root"].name, "Root è")
+        self.assertNotIn("diagrams", data.modelObjects["root"].model_dump())
+
+    def test_invalid_exports_are_rejected(self):
+        body = json.dumps(EXPORT).encode()
+        missing = json.dumps({"domains": {}, "modelObjects": {}}).encode()
+        invalid_entry = json.dumps({**EXPORT, "domains": {"d1": {"id": "d1"}}}).encode()
+
+        for content in (body[:-10], b"[]", body + b"{}", missing, invalid_entry):
+            with self.assertRaises(ValueError):
+                _read(content, len(content))
+
+    def test_entries_need_exactly_one_separator(self):
+        entry = json.dumps(EXPORT["modelObjects"]["root"])
+        body = json.dumps(EXPORT)
+        sections = body.index('"modelObjects": {') + len('"modelObjects": {')
+        malformed = [
+            # a separator before the first entry
+            body[:sections] + ", " + body[sections:],
+            # no separator between two entries
+            body[:sections] + f'"extra": {entry} ' + body[sections:],
+            # two separators
+            body[:sections] + f'"extra": {entry},, ' + body[sections:],
+            # the same, between sections
+            "{, " + body[1:],
+            body.replace(', "modelObjects"', ' "modelObjects"'),
+        ]
+
+        for content in malformed:
+            content = content.encode()
+            # through the fast path, and through the state machine
+            for chunk_size in (len(content), 1):
+                with self.subTest(content=content[:60], chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        _read(content, chunk_size)
+
+    def test_memory_does_not_grow_with_dropped_sections(self):
+        export = copy.deepcopy(EXPORT)
+        export["flows"] = {
+            f"f{i}": {"id": f"f{i}", "name": "x" * 200, "steps": {}}
+            for i in range(20000)
+        }
+        body = json.dumps(export).encode()
+        del export
+
+        tracemalloc.start()
+        try:
+            _read(body, 64 * 1024)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # the ~5 MB body is never held as a whole, nor decoded as a whole
+        self.assertGreater(len(body), 4_000_000)
+        self.assertLess(peak, 1_000_000)
@@ -0,0 +1,106 @@
+import unittest
+
+import httpx
+
+from benchmarks.fake_icepanel import FakeIcePanel, Faults, empty_landscape
+from src.icepanel.client import IcePanelClient
+from src.icepanel.executor import PlanExecutor
+from src.icepanel.landscape_index import LandscapeIndex
+from src.icepanel.planner import plan_data_product, plan_data_product_removal
+from src.icepanel.rate_limit import RetryPolicy
+from src.models.data_product_descriptor import DataProduct
+from src.settings import Settings
+from tests.test_planner import DATA_PRODUCT
+
+
+class TestFakeIcePanel(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fake = FakeIcePanel({"land1": empty_landscape()}, seed=1)
+        self.client = IcePanelClient(
+            landscape_id="land1",
+            api_key="secret",
+            base_url="http://icepanel.test/v1",
+            transport=httpx.ASGITransport(app=self.fake.app),  # type: ignore
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=1),
+        )
+        await self.client.open()
+        self.addAsyncCleanup(self.client.close)
+        self.data_product = DataProduct(**DATA_PRODUCT)
+
+    async def _index(self) -> LandscapeIndex:
+        return LandscapeIndex(await self.client.get_export())
+
+    async def test_provisioning_round_trip(self):
+        executor = PlanExecutor(self.client)
+        plan = plan_data_product(self.data_product, await self._index())
+        result = await executor.execute(plan)
+        self.assertEqual(result.created, 4)
+        self.assertEqual(self.fake.calls["POST objects"], 3)
+        self.assertEqual(self.fake.calls["POST connections"], 1)
+
+        # the export reflects the writes: nothing is left to do
+        replanned = plan_data_product(self.data_product, await self._index())
+        self.assertFalse(replanned.has_changes)
+
+        removal = plan_data_product_removal(self.data_product, await self._index())
+        await executor.execute_removal(removal)
+        data = await self.client.get_export()
+        self.assertEqual([o.type for o in data.modelObjects.values()], ["root"])
+        self.assertEqual(data.modelConnections, {})
+
+    async def test_export_is_revalidated_until_a_write(self):
+        first = await self.client.stream_export()
+        again = await self.client.stream_export(etag=first.etag)
+        self.assertTrue(again.not_modified)
+
+        await self.client.post({"name": "Extra", "parentId": "root"}, "objects")
+        changed = await self.client.stream_export(etag=first.etag)
+        self.assertFalse(changed.not_modified)
+        self.assertIn("Extra", [o.name for o in changed.data.modelObjects.values()])
+
+    async def test_injected_failures_are_retried(self):
+        self.fake.faults.retry_after = 0
+        self.fake.fail_next(429, 503)
+
+        await self.client.get_export()
+
+        self.assertEqual(self.client.stats.throttled, 1)
+        self.assertEqual(self.client.stats.retries, 2)
+        self.assertEqual(self.fake.calls["GET export"], 1)
+
+    async def test_drawn_failures_and_unknown_items(self):
+        self.fake.faults = Faults(error_rate=1.0, error_status=500)
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.client.patch({"name": "x"}, "objects", "root")
+
+        self.fake.faults = Faults()
+        with self.assertRaises(httpx.HTTPStatusError) as raised:
+            await self.client.patch({"name": "x"}, "objects", "missing")
+        self.assertEqual(raised.exception.response.status_code, 404)
+        # already gone: not an error for the adapter
+        await self.client.delete("objects", "missing")
+
+    async def test_control_routes_report_and_reset_the_calls(self):
+        self.fake.faults.retry_after = 0
+        self.fake.fail_next(429)
+        await self.client.get_export()
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.fake.app),  # type: ignore
+            base_url="http://icepanel.test",
+        ) as control:
+            calls = (await control.get("/_fake/calls")).json()
+            self.assertEqual(calls["calls"], {"GET export": 1})
+            self.assertEqual(calls["failures"], {"429": 1})
+            await control.post("/_fake/reset")
+            calls = (await control.get("/_fake/calls")).json()
+        self.assertEqual(calls, {"calls": {}, "failures": {}})
+
+
+class TestBaseUrlSetting(unittest.TestCase):
+    def test_client_uses_the_configured_base_url(self):
+        settings = Settings(icepanel_base_url="http://localhost:5003/v1/")
+        client = IcePanelClient.from_settings(settings)
+        self.assertTrue(
+            client.version_url.startswith("http://localhost:5003/v1/landscapes/")
+        )
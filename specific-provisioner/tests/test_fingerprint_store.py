@@ -0,0 +1,120 @@
+import time
+import unittest
+
+from src.icepanel.executor import PlanExecutor
+from src.icepanel.fingerprint_store import Fingerprint, FingerprintStore, fingerprint
+from src.icepanel.planner import (
+    Action,
+    plan_data_product,
+    plan_data_product_removal,
+    skip_already_written,
+)
+from src.models.data_product_descriptor import DataProduct
+from tests.test_planner import (
+    DATA_PRODUCT,
+    RecordingClient,
+    _landscape,
+    _provisioned_landscape,
+)
+
+
+class TestFingerprintStore(unittest.TestCase):
+    def test_record_and_get(self):
+        with FingerprintStore(":memory:") as store:
+            store.record_many(
+                [Fingerprint("a", "id-a", "fa", 1.0), Fingerprint("b", "id-b", "fb")]
+            )
+            store.record_many([Fingerprint("a", "id-a", "fa2", 2.0)])
+
+            found = store.get_many(["a", "b", "c"])
+
+            self.assertEqual(set(found), {"a", "b"})
+            self.assertEqual(found["a"], Fingerprint("a", "id-a", "fa2", 2.0))
+
+            store.forget(["id-b"])
+            self.assertEqual(set(store.get_many(["a", "b"])), {"a"})
+
+    def test_fingerprint_ignores_ids_and_position(self):
+        plan = plan_data_product(DataProduct(**DATA_PRODUCT), _landscape([], []))
+        desired = plan.system.desired
+        moved = desired.model_copy(update={"id": "x", "parentId": "y"})
+        renamed = desired.model_copy(update={"description": "other"})
+
+        self.assertEqual(fingerprint(desired), fingerprint(moved))
+        self.assertNotEqual(fingerprint(desired), fingerprint(renamed))
+
+
+class TestSkipAlreadyWritten(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.data_product = DataProduct(**DATA_PRODUCT)
+        self.store = FingerprintStore(":memory:")
+        self.store.open()
+
+    def tearDown(self):
+        self.store.close()
+
+    async def _provision(self, landscape) -> RecordingClient:
+        client = RecordingClient()
+        plan = plan_data_product(self.data_product, landscape)
+        await PlanExecutor(client, fingerprints=self.store).execute(  # type: ignore[arg-type]  # noqa: E501
+            plan
+        )
+        return client
+
+    async def test_stale_snapshot_does_not_create_again(self):
+        taken_at = time.time() - 1
+        stale = _landscape([], [])
+        await self._provision(stale)
+
+        plan = plan_data_product(self.data_product, stale)
+        known = self.store.get_many(op.key for op in plan.operations())
+        skipped = skip_already_written(plan, known, taken_at)
+
+        self.assertEqual(skipped, 4)
+        self.assertFalse(plan.has_changes)
+        self.assertEqual(plan.system.current_id, "id-Sales")
+
+    async def test_stale_snapshot_does_not_update_again(self):
+        landscape = _provisioned_landscape(self.data_product)
+        taken_at = time.time() - 1
+        self.data_product = DataProduct(**{**DATA_PRODUCT, "description": "New"})
+        client = await self._provision(landscape)
+        self.assertEqual(len(client.calls), 1)
+
+        plan = plan_data_product(self.data_product, landscape)
+        known = self.store.get_many(op.key for op in plan.operations())
+        self.assertEqual(skip_already_written(plan, known, taken_at), 1)
+        self.assertFalse(plan.has_changes)
+
+    async def test_fresher_snapshot_wins(self):
+        await self._provision(_landscape([], []))
+        # the objects were deleted in IcePanel after they were written
+        plan = plan_data_product(self.data_product, _landscape([], []))
+        known = self.store.get_many(op.key for op in plan.operations())
+
+        self.assertEqual(skip_already_written(plan, known, time.time() + 1), 0)
+        self.assertEqual(plan.count(Action.CREATE), 4)
+
+    async def test_changed_content_is_written(self):
+        taken_at = time.time() - 1
+        stale = _landscape([], [])
+        await self._provision(stale)
+
+        changed = DataProduct(**{**DATA_PRODUCT, "description": "New"})
+        plan = plan_data_product(changed, stale)
+        known = self.store.get_many(op.key for op in plan.operations())
+
+        self.assertEqual(skip_already_written(plan, known, taken_at), 3)
+        self.assertEqual(plan.system.action, Action.CREATE)
+
+    async def test_removal_forgets_fingerprints(self):
+        landscape = _provisioned_landscape(self.data_product)
+        self.data_product = DataProduct(**{**DATA_PRODUCT, "description": "New"})
+        await self._provision(landscape)
+        self.assertIn(self.data_product.id, self.store.get_many([self.data_product.id]))
+
+        await PlanExecutor(  # type: ignore[arg-type]
+            RecordingClient(), fingerprints=self.store
+        ).execute_removal(plan_data_product_removal(self.data_product, landscape))
+
+        self.assertEqual(self.store.get_many([self.data_product.id]), {})
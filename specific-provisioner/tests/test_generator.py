@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from benchmarks.generator import (
+    DescriptorShape,
+    LandscapeShape,
+    descriptor_yaml,
+    generate_descriptors,
+    generate_export,
+)
+from src.icepanel.export_reader import ExportReader
+from src.icepanel.landscape_index import LandscapeIndex
+from src.icepanel.planner import Action, plan_data_product
+from src.models.data_product_descriptor import DataProduct, OutputPort, Workload
+from src.utility.descriptor_loader import load_descriptor
+from src.utility.parsing_pydantic_models import parse_yaml_with_model
+
+SHAPE = DescriptorShape(
+    output_ports=3,
+    workloads=4,
+    storage_areas=2,
+    columns=10,
+    depends_on_density=0.5,
+    reads_from_density=0.3,
+)
+
+
+class TestGenerator(unittest.TestCase):
+    def test_same_seed_gives_the_same_inputs(self):
+        first = generate_export(7, generate_descriptors(7, 5, SHAPE))
+        second = generate_export(7, generate_descriptors(7, 5, SHAPE))
+        other = generate_export(8, generate_descriptors(8, 5, SHAPE))
+
+        self.assertEqual(json.dumps(first.export), json.dumps(second.export))
+        self.assertEqual(first.descriptors, second.descriptors)
+        self.assertNotEqual(first.descriptors, other.descriptors)
+
+    def test_descriptors_are_valid_and_shaped(self):
+        documents = generate_descriptors(1, 4, SHAPE)
+
+        for document in documents:
+            text = descriptor_yaml(document)
+            data_product = parse_yaml_with_model(
+                load_descriptor(text)["dataproduct"], DataProduct
+            )
+            self.assertIsInstance(data_product, DataProduct)
+            kinds = [type(c) for c in data_product.components]
+            self.assertEqual(kinds.count(OutputPort), 3)
+            self.assertEqual(kinds.count(Workload), 4)
+        ids = {c["id"] for d in documents for c in d["components"]}
+        edges = [r for d in documents for c in d["components"] for r in c["dependsOn"]]
+        self.assertTrue(edges)
+        self.assertTrue(set(edges) <= ids)
+
+    def test_export_matches_the_provisioned_data_products(self):
+        documents = generate_descriptors(3, 6, SHAPE)
+        generated = generate_export(
+            3,
+            documents,
+            LandscapeShape(objects=500, connections=800, domains=3, provisioned=0.5),
+        )
+        reader = ExportReader()
+        reader.feed(json.dumps(generated.export).encode())
+        data = reader.close()
+        self.assertEqual(len(data.modelObjects), 500)
+        self.assertEqual(len(data.modelConnections), 800)
+        self.assertEqual(len(data.domains), 3)
+        self.assertTrue(0 < len(generated.provisioned) < len(documents))
+
+        landscape = LandscapeIndex(data)
+        for document in documents:
+            plan = plan_data_product(DataProduct(**document), landscape)
+            if document["id"] in generated.provisioned:
+                self.assertFalse(plan.has_changes)
+            else:
+                self.assertEqual(plan.system.action, Action.CREATE)
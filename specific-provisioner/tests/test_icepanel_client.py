@@ -0,0 +1,219 @@
+import json
+import time
+import unittest
+
+import httpx
+
+from src.icepanel.client import IcePanelClient
+from src.icepanel.rate_limit import RetryPolicy, TokenBucket
+from src.models.icepanel import buildConnection
+
+EXPORT = {
+    "domains": {"d1": {"id": "d1", "name": "Default domain"}},
+    "flows": {},
+    "modelConnections": {},
+    "modelObjects": {
+        "root": {
+            "caption": "",
+            "description": "",
+            "domainId": "d1",
+            "external": False,
+            "icon": None,
+            "id": "root",
+            "links": {},
+            "name": "Root",
+            "parentId": None,
+            "parentIds": [],
+            "status": "live",
+            "tagIds": [],
+            "teamIds": [],
+            "technologies": {},
+            "type": "root",
+        }
+    },
+    "tagGroups": {},
+    "tags": {},
+    "teams": {},
+}
+
+
+class TestIcePanelClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if "unknown" in request.url.path:
+                return httpx.Response(500)
+            if request.url.path.endswith("/export/json"):
+                if request.headers.get("If-None-Match") == '"v1"':
+                    return httpx.Response(304, headers={"ETag": '"v1"'})
+                return httpx.Response(200, json=EXPORT, headers={"ETag": '"v1"'})
+            if request.method == "POST":
+                return httpx.Response(201, json={"modelConnection": {"id": "c1"}})
+            if request.method == "PATCH":
+                return httpx.Response(200, json={})
+            return httpx.Response(404)
+
+        self.client = IcePanelClient(
+            landscape_id="land1",
+            api_key="secret",
+            base_url="https://icepanel.test/v1/",
+            transport=httpx.MockTransport(handler),
+        )
+
+    async def test_get_situation(self):
+        async with self.client:
+            domains, objects, connections = await self.client.get_situation()
+
+        self.assertEqual([d.name for d in domains], ["Default domain"])
+        self.assertEqual([o.type for o in objects], ["root"])
+        self.assertEqual(connections, [])
+        self.assertEqual(
+            str(self.requests[0].url),
+            "https://icepanel.test/v1/landscapes/land1/versions/latest/export/json",
+        )
+        self.assertEqual(self.requests[0].headers["Authorization"], "ApiKey secret")
+
+    async def test_stream_export_is_conditional(self):
+        async with self.client:
+            export = await self.client.stream_export()
+            revalidated = await self.client.stream_export(etag=export.etag)
+
+        self.assertEqual(export.data.domains["d1"].name, "Default domain")
+        self.assertEqual(len(export.content_hash), 64)
+        self.assertTrue(revalidated.not_modified)
+        self.assertIsNone(revalidated.data)
+        self.assertEqual(self.requests[1].headers["If-None-Match"], '"v1"')
+
+    async def test_unchanged_export_body_is_hashed_but_not_parsed(self):
+        async with self.client:
+            export = await self.client.stream_export()
+            unchanged = await self.client.stream_export(
+                content_hash=export.content_hash
+            )
+            changed = await self.client.stream_export(content_hash="0" * 64)
+
+        self.assertTrue(unchanged.not_modified)
+        self.assertIsNone(unchanged.data)
+        self.assertEqual(unchanged.content_hash, export.content_hash)
+        self.assertEqual(unchanged.etag, '"v1"')
+        self.assertFalse(changed.not_modified)
+        self.assertEqual(changed.data.modelObjects["root"].name, "Root")
+        self.assertEqual(changed.content_hash, export.content_hash)
+
+    async def test_post_and_patch_connection(self):
+        connection = buildConnection("dependsOn", "a", "b")
+        async with self.client:
+            created = await self.client.post_connection(connection)
+            patched = await self.client.patch_connection("c9", connection)
+
+        self.assertEqual(created, "c1")
+        self.assertEqual(patched, "c9")
+        self.assertEqual(self.requests[1].method, "PATCH")
+        self.assertTrue(self.requests[1].url.path.endswith("/model/connections/c9"))
+        self.assertEqual(json.loads(self.requests[1].content)["originId"], "a")
+
+    async def test_error_status_is_raised(self):
+        async with self.client:
+            with self.assertRaises(httpx.HTTPStatusError):
+                await self.client.post({"id": ""}, "unknown")
+
+    async def test_closed_client_cannot_be_used(self):
+        await self.client.open()
+        await self.client.close()
+        self.assertFalse(self.client.is_open)
+        with self.assertRaises(RuntimeError):
+            await self.client.get_export()
+
+
+class TestIcePanelClientRetries(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.requests: list[httpx.Request] = []
+        # statuses (or exceptions) answered to the next calls, then 200
+        self.failures: list = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if self.failures:
+                failure = self.failures.pop(0)
+                if isinstance(failure, Exception):
+                    raise failure
+                status, *headers = failure
+                return httpx.Response(status, headers=headers[0] if headers else None)
+            if request.url.path.endswith("/export/json"):
+                return httpx.Response(200, json=EXPORT)
+            if request.method == "POST":
+                return httpx.Response(201, json={"modelObject": {"id": "o1"}})
+            return httpx.Response(200, json={})
+
+        self.limiter = TokenBucket(rate=0, burst=1)
+        self.client = IcePanelClient(
+            landscape_id="land1",
+            api_key="secret",
+            transport=httpx.MockTransport(handler),
+            rate_limiter=self.limiter,
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=1),
+        )
+
+    async def test_throttled_call_honours_retry_after(self):
+        self.failures = [(429, {"Retry-After": "0.05"})]
+        async with self.client:
+            start = time.monotonic()
+            await self.client.patch({"name": "x"}, "objects", "o1")
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertEqual(self.client.stats.throttled, 1)
+        self.assertEqual(self.client.stats.retries, 1)
+        self.assertGreaterEqual(self.client.stats.backoff_wait, 0.05)
+
+    async def test_idempotent_call_is_retried_on_server_error(self):
+        self.failures = [(503,), (502,)]
+        async with self.client:
+            export = await self.client.get_export()
+
+        self.assertEqual(export.domains["d1"].name, "Default domain")
+        self.assertEqual(len(self.requests), 3)
+
+    async def test_gives_up_after_max_attempts(self):
+        self.failures = [(503,)] * 3
+        async with self.client:
+            with self.assertRaises(httpx.HTTPStatusError):
+                await self.client.delete("objects", "o1")
+
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(self.client.stats.gave_up, 1)
+
+    async def test_post_is_not_replayed_on_server_error(self):
+        self.failures = [(503,)]
+        async with self.client:
+            with self.assertRaises(httpx.HTTPStatusError):
+                await self.client.post({"name": "x"}, "objects")
+
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_post_is_replayed_when_not_processed(self):
+        self.failures = [(429,), httpx.ConnectError("refused")]
+        async with self.client:
+            created = await self.client.post({"name": "x"}, "objects")
+
+        self.assertEqual(created, "o1")
+        self.assertEqual(len(self.requests), 3)
+
+    async def test_post_is_not_replayed_after_read_timeout(self):
+        self.failures = [httpx.ReadTimeout("slow")]
+        async with self.client:
+            with self.assertRaises(httpx.ReadTimeout):
+                await self.client.post({"name": "x"}, "objects")
+
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_too_long_retry_after_is_not_waited(self):
+        self.failures = [(429, {"Retry-After": "120"})]
+        async with self.client:
+            with self.assertRaises(httpx.HTTPStatusError):
+                await self.client.patch({"name": "x"}, "objects", "o1")
+
+        self.assertEqual(len(self.requests), 1)
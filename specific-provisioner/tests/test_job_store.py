@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from src.models.api_models import Status
+from src.provisioning.job_store import Job, JobStore
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "jobs.sqlite3")
+        self.store = JobStore(self.path)
+        self.store.open()
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_uses_wal(self):
+        mode = self.store._db().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_jobs_survive_a_reopen(self):
+        self.store.insert(Job(token="t1", kind="provision", payload="{}"))
+        job = self.store.get("t1")
+        job.status = Status.COMPLETED
+        job.result = "done"
+        self.store.update(job)
+        self.store.close()
+
+        with JobStore(self.path) as reopened:
+            job = reopened.get("t1")
+
+        self.assertEqual(job.status, Status.COMPLETED)
+        self.assertEqual(job.result, "done")
+        self.assertEqual(job.payload, "{}")
+
+    def test_unknown_token(self):
+        self.assertIsNone(self.store.get("missing"))
+
+    def test_unfinished_and_by_data_product(self):
+        self.store.insert(Job(token="t1", kind="provision", data_product_id="dp1"))
+        self.store.insert(
+            Job(
+                token="t2",
+                kind="provision",
+                data_product_id="dp1",
+                status=Status.COMPLETED,
+            )
+        )
+
+        self.assertEqual([job.token for job in self.store.unfinished()], ["t1"])
+        self.assertEqual(
+            {job.token for job in self.store.find_by_data_product("dp1")},
+            {"t1", "t2"},
+        )
+
+    def test_operations_summary(self):
+        self.store.insert(Job(token="t1", kind="provision"))
+        self.store.record_operation("t1", "dp1", "create", None)
+        self.store.record_operation("t1", "c1", "create", "boom")
+        # a retried operation overwrites its previous outcome
+        self.store.record_operation("t1", "c1", "create", None)
+        self.store.record_operation("t1", "c2", "update", "boom")
+
+        self.assertEqual(self.store.operations_summary("t1"), (2, 1))
+
+    def test_compact_drops_only_old_finished_jobs(self):
+        old = time.time() - 100
+        self.store.insert(
+            Job(token="old", kind="provision", status=Status.FAILED, updated_at=old)
+        )
+        self.store.insert(Job(token="running", kind="provision", updated_at=old))
+        self.store.insert(Job(token="recent", kind="provision", status=Status.FAILED))
+        self.store.record_operation("old", "dp1", "create", None)
+
+        self.assertEqual(self.store.compact(before=time.time() - 10), 1)
+        self.assertIsNone(self.store.get("old"))
+        self.assertIsNotNone(self.store.get("running"))
+        self.assertIsNotNone(self.store.get("recent"))
+        self.assertEqual(self.store.operations_summary("old"), (0, 0))
+
+    def test_claims_only_the_jobs_of_managers_gone(self):
+        self.store.heartbeat("me")
+        self.store.heartbeat("alive")
+        self.store.heartbeat("stopped")
+        self.store.release("stopped")
+        self.store.insert(Job(token="t1", kind="provision", owner="alive"))
+        self.store.insert(Job(token="t2", kind="provision", owner="stopped"))
+        self.store.insert(Job(token="t3", kind="provision", owner="crashed"))
+        self.store.insert(Job(token="t4", kind="provision"))
+
+        claimed = self.store.claim_orphans("me", stale_before=time.time() - 30)
+
+        self.assertEqual([job.token for job in claimed], ["t2", "t3", "t4"])
+        self.assertEqual(self.store.get("t2").owner, "me")
+        self.assertEqual(self.store.get("t1").owner, "alive")
+        # claimed once: the other managers find nothing left
+        self.assertEqual(self.store.claim_orphans("other", time.time() - 30), [])
+
+    def test_stores_without_owners_are_migrated(self):
+        self.store.close()
+        path = os.path.join(self.directory.name, "old.sqlite3")
+        with sqlite3.connect(path) as db:
+            db.execute(
+                "CREATE TABLE jobs (token TEXT PRIMARY KEY, kind TEXT NOT NULL, "
+                "data_product_id TEXT, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "result TEXT NOT NULL DEFAULT '', attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            db.execute(
+                "INSERT INTO jobs VALUES ('t1', 'provision', NULL, 'RUNNING', '{}', "
+                "'', 1, 0, 0)"
+            )
+        db.close()
+
+        with JobStore(path) as store:
+            claimed = store.claim_orphans("me", stale_before=time.time())
+
+        self.assertEqual([(job.token, job.owner) for job in claimed], [("t1", "me")])
@@ -0,0 +1,187 @@
+import asyncio
+import time
+import unittest
+
+from src.models.api_models import Status
+from src.provisioning.job_store import Job, JobStore
+from src.provisioning.jobs import JobManager, JobQueueFullError
+
+
+async def done(job, progress):
+    return "done"
+
+
+async def fail(job, progress):
+    raise RuntimeError("IcePanel is down")
+
+
+class TestJobManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = JobStore(":memory:")
+        self.manager = JobManager(
+            self.store,
+            {"done": done, "fail": fail},
+            workers=2,
+            queue_size=2,
+            retention=3600,
+        )
+        await self.manager.start()
+
+    async def asyncTearDown(self):
+        await self.manager.stop()
+
+    async def _wait(self, manager: JobManager, token: str):
+        for _ in range(100):
+            job = await manager.get(token)
+            if job is not None and job.finished:
+                return job
+            await asyncio.sleep(0.01)
+        self.fail(f"job {token} did not finish")
+
+    async def test_completed_job(self):
+        job = await self.manager.submit("done", "{}", data_product_id="dp1")
+        self.assertEqual(job.status, Status.RUNNING)
+
+        finished = await self._wait(self.manager, job.token)
+        self.assertEqual(finished.status, Status.COMPLETED)
+        self.assertEqual(finished.result, "done")
+        self.assertEqual(finished.attempts, 1)
+        self.assertEqual(finished.data_product_id, "dp1")
+
+    async def test_failed_job(self):
+        job = await self.manager.submit("fail", "{}")
+
+        finished = await self._wait(self.manager, job.token)
+        self.assertEqual(finished.status, Status.FAILED)
+        self.assertEqual(finished.result, "IcePanel is down")
+
+    async def test_unknown_kind(self):
+        with self.assertRaises(KeyError):
+            await self.manager.submit("missing", "{}")
+
+    async def test_running_job_reports_progress(self):
+        release = asyncio.Event()
+
+        async def work(job, progress):
+            await progress("dp1", "create", None)
+            await progress("c1", "update", "boom")
+            await release.wait()
+            return "done"
+
+        manager = JobManager(
+            JobStore(":memory:"), {"work": work}, workers=1, queue_size=1, retention=0
+        )
+        await manager.start()
+        job = await manager.submit("work", "{}")
+        for _ in range(100):
+            running = await manager.get(job.token)
+            if running.result:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(running.status, Status.RUNNING)
+        self.assertEqual(running.result, "In progress: 1 operations applied, 1 failed")
+        release.set()
+        self.assertEqual((await self._wait(manager, job.token)).result, "done")
+        await manager.stop()
+
+    async def test_queue_is_bounded(self):
+        release = asyncio.Event()
+
+        async def work(job, progress):
+            await release.wait()
+            return "done"
+
+        manager = JobManager(
+            JobStore(":memory:"), {"work": work}, workers=2, queue_size=2, retention=0
+        )
+        await manager.start()
+        # two jobs taken by the workers, two waiting in the queue
+        for _ in range(4):
+            await manager.submit("work", "{}")
+            await asyncio.sleep(0)
+        self.assertEqual(manager.queue_depth, 2)
+        self.assertEqual(manager.in_flight, 4)
+        with self.assertRaises(JobQueueFullError):
+            await manager.submit("work", "{}")
+        release.set()
+        await manager.stop()
+
+    async def test_unknown_token(self):
+        self.assertIsNone(await self.manager.get("missing"))
+
+
+class TestJobRecovery(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.store = JobStore(":memory:")
+        self.store.open()
+
+    async def _start(self, **kwargs) -> JobManager:
+        manager = JobManager(
+            self.store,
+            {"done": done},
+            workers=1,
+            queue_size=10,
+            retention=kwargs.pop("retention", 3600),
+            **kwargs,
+        )
+        await manager.start()
+        self.addAsyncCleanup(manager.stop)
+        return manager
+
+    async def test_interrupted_jobs_are_resumed(self):
+        self.store.insert(Job(token="t1", kind="done", attempts=1))
+
+        manager = await self._start()
+        for _ in range(100):
+            job = await manager.get("t1")
+            if job.finished:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(job.status, Status.COMPLETED)
+        self.assertEqual(job.attempts, 2)
+
+    async def test_jobs_of_a_live_manager_are_left_alone(self):
+        self.store.heartbeat("other")
+        self.store.insert(Job(token="t1", kind="done", owner="other"))
+
+        manager = await self._start(heartbeat_interval=0.01)
+        for _ in range(5):
+            self.store.heartbeat("other")
+            await asyncio.sleep(0.01)
+        self.assertFalse((await manager.get("t1")).finished)
+
+        # the other manager stops: its job is resumed at the next heartbeat
+        self.store.release("other")
+        for _ in range(100):
+            job = await manager.get("t1")
+            if job.finished:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(job.status, Status.COMPLETED)
+
+    async def test_exhausted_or_unknown_jobs_are_failed(self):
+        self.store.insert(Job(token="t1", kind="done", attempts=3))
+        self.store.insert(Job(token="t2", kind="gone"))
+
+        manager = await self._start(max_attempts=3)
+
+        for token in ("t1", "t2"):
+            job = await manager.get(token)
+            self.assertEqual(job.status, Status.FAILED)
+            self.assertIn("interrupted by a restart", job.result)
+
+    async def test_finished_jobs_are_compacted_at_startup(self):
+        self.store.insert(
+            Job(
+                token="t1",
+                kind="done",
+                status=Status.COMPLETED,
+                updated_at=time.time() - 100,
+            )
+        )
+
+        manager = await self._start(retention=10)
+
+        self.assertIsNone(await manager.get("t1"))
@@ -0,0 +1,65 @@
+import unittest
+
+from src.icepanel.landscape_index import LandscapeIndex
+from src.models.icepanel import IcePanelData, ModelObject, buildConnection
+
+
+def _object(obj_id: str, name: str, parent_id: str | None, type: str = "app"):
+    return ModelObject(
+        caption="",
+        description="",
+        domainId="d1",
+        external=False,
+        icon=None,
+        id=obj_id,
+        links={},
+        name=name,
+        parentId=parent_id,
+        parentIds=[],
+        status="live",
+        tagIds=[],
+        teamIds=[],
+        technologies={},
+        type=type,
+    )
+
+
+class TestLandscapeIndex(unittest.TestCase):
+    def setUp(self):
+        connection = buildConnection("dependsOn", "c1", "c2")
+        connection.id = "conn1"
+        objects = [
+            _object("root", "Root", None, type="root"),
+            _object("dp1", "Data Product", "root", type="system"),
+            _object("c1", "Component", "dp1"),
+            _object("c2", "Other", "dp1"),
+            _object("c3", "Component", "dp2"),
+            _object("c4", "Component", "dp1"),
+        ]
+        self.index = LandscapeIndex(
+            IcePanelData(
+                domains={"d1": {"id": "d1", "name": "Default domain"}},
+                flows={},
+                modelConnections={"conn1": connection},
+                modelObjects={obj.id: obj for obj in objects},
+                tagGroups={},
+                tags={},
+                teams={},
+            )
+        )
+
+    def test_objects_are_scoped_by_parent(self):
+        self.assertEqual(self.index.get_object("dp1", "Component").id, "c1")
+        self.assertEqual(self.index.get_object("dp2", "Component").id, "c3")
+        self.assertIsNone(self.index.get_object("root", "Component"))
+        self.assertEqual(self.index.objects_by_id["c4"].parentId, "dp1")
+
+    def test_root_and_domains(self):
+        self.assertEqual(self.index.root.id, "root")
+        self.assertEqual(self.index.get_domain("Default domain").id, "d1")
+        self.assertIsNone(self.index.get_domain("Missing"))
+
+    def test_connections(self):
+        self.assertEqual(self.index.get_connection("c1", "c2", "dependsOn").id, "conn1")
+        self.assertIsNone(self.index.get_connection("c2", "c1", "dependsOn"))
+        self.assertIsNone(self.index.get_connection("c1", "c2", "readsFrom"))
@@ -0,0 +1,74 @@
+import io
+import json
+import logging
+import unittest
+
+from src.utility.logger import (
+    REDACTED,
+    LogFormatter,
+    configure_logging,
+    get_logger,
+    shutdown_logging,
+)
+
+
+def _record(message: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLogFormatter(unittest.TestCase):
+    def test_json_lines_with_extra_fields(self):
+        formatter = LogFormatter()
+        entry = json.loads(
+            formatter.format(_record("%s objects", 3, landscape_id="land1", ok=True))
+        )
+        self.assertEqual(entry["message"], "3 objects")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["logger"], "test")
+        self.assertEqual(entry["landscape_id"], "land1")
+        self.assertIs(entry["ok"], True)
+
+    def test_secrets_are_redacted(self):
+        formatter = LogFormatter(secrets=["s3cr3t-key"])
+        entry = json.loads(
+            formatter.format(
+                _record(
+                    "headers {'Authorization': 'ApiKey abc123'} key s3cr3t-key",
+                    payload={"name": "x", "api_key": "abc"},
+                    password="hunter2",
+                )
+            )
+        )
+        self.assertNotIn("abc123", entry["message"])
+        self.assertNotIn("s3cr3t-key", entry["message"])
+        self.assertEqual(entry["payload"], f'{{"name":"x","api_key":"{REDACTED}"}}')
+        self.assertEqual(entry["password"], REDACTED)
+
+    def test_payloads_are_truncated(self):
+        formatter = LogFormatter(json_output=False, max_length=10)
+        text = formatter.format(_record("x" * 25))
+        self.assertTrue(text.endswith(" - xxxxxxxxxx... [15 more characters]"))
+
+
+class TestConfigureLogging(unittest.TestCase):
+    def tearDown(self):
+        shutdown_logging()
+
+    def test_records_are_written_by_the_listener(self):
+        stream = io.StringIO()
+        configure_logging(logging.INFO, stream=stream)
+        get_logger("test").debug("hidden")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            get_logger("test").exception("failed for %s", "dp1")
+        # configuring again replaces the handler instead of adding one
+        configure_logging(logging.INFO, stream=stream)
+        get_logger("test").info("again")
+        shutdown_logging()
+
+        entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([e["message"] for e in entries], ["failed for dp1", "again"])
+        self.assertIn("ValueError: boom", entries[0]["exception"])
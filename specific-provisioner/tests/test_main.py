@@ -1,19 +1,256 @@
+import time
+from unittest import mock
+
+import httpx
+import yaml
 from starlette.testclient import TestClient
 
+from src.icepanel.client import IcePanelClient
 from src.main import app
-from src.models.api_models import DescriptorKind, ProvisioningRequest
+from src.models.api_models import (
+    DescriptorKind,
+    ProvisioningRequest,
+    ValidationRequest,
+)
+from tests.test_icepanel_client import EXPORT
+from tests.test_planner import DATA_PRODUCT
 
 client = TestClient(app)
 
 
+def _icepanel_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/export/json"):
+        return httpx.Response(200, json=EXPORT)
+    if request.method == "DELETE":
+        return httpx.Response(204)
+    if request.url.path.endswith("/model/objects"):
+        return httpx.Response(201, json={"modelObject": {"id": "obj"}})
+    return httpx.Response(201, json={"modelConnection": {"id": "conn"}})
+
+
+def _mock_icepanel(calls: list | None = None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if calls is not None:
+            calls.append(f"{request.method} {request.url.path}")
+        return _icepanel_handler(request)
+
+    icepanel = IcePanelClient(
+        landscape_id="land1",
+        api_key="key",
+        transport=httpx.MockTransport(handler),
+    )
+    return mock.patch.object(IcePanelClient, "from_settings", return_value=icepanel)
+
+
+def _poll_status(
+    lifespan_client: TestClient, token: str, path: str = "/v1/provision"
+) -> dict:
+    for _ in range(100):
+        status = lifespan_client.get(f"{path}/{token}/status").json()
+        if status["status"] != "RUNNING":
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"provisioning {token} did not finish")
+
+
 def test_provisioning():
     provisioning_request = ProvisioningRequest(
         descriptorKind=DescriptorKind.COMPONENT_DESCRIPTOR, descriptor="descriptor"
     )
 
-    resp = client.post("/v1/provision", json=dict(provisioning_request))
+    with TestClient(app) as lifespan_client:
+        resp = lifespan_client.post("/v1/provision", json=dict(provisioning_request))
+
+    assert resp.status_code == 400
+    assert "Expecting a DATAPRODUCT_DESCRIPTOR" in resp.json().get("errors")[0]
+
+
+def test_provisioning_runs_in_background():
+    provisioning_request = ProvisioningRequest(
+        descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+        descriptor=yaml.safe_dump({"dataproduct": DATA_PRODUCT}),
+    )
+
+    with _mock_icepanel(), TestClient(app) as lifespan_client:
+        resp = lifespan_client.post(
+            "/v1/provision", json=provisioning_request.model_dump()
+        )
+        assert resp.status_code == 202
+        status = _poll_status(lifespan_client, resp.text)
+
+    assert status["status"] == "COMPLETED"
+    assert "4 created" in status["result"]
+
+
+def test_batch_provisioning():
+    second = {
+        **DATA_PRODUCT,
+        "id": "urn:dmb:dp:finance:orders:0",
+        "name": "Orders",
+        "components": [],
+    }
+    requests = [
+        ProvisioningRequest(
+            descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+            descriptor=yaml.safe_dump({"dataproduct": descriptor}),
+        ).model_dump()
+        for descriptor in (DATA_PRODUCT, second)
+    ]
+
+    calls: list[str] = []
+    with _mock_icepanel(calls), TestClient(app) as lifespan_client:
+        resp = lifespan_client.post("/v1/provision/batch", json=requests)
+        assert resp.status_code == 202
+        status = _poll_status(lifespan_client, resp.text, "/v1/provision/batch")
+
+    assert status["status"] == "COMPLETED"
+    assert status["result"] == "2 of 2 data products synchronized with IcePanel"
+    assert [result["dataProductId"] for result in status["results"]] == [
+        DATA_PRODUCT["id"],
+        second["id"],
+    ]
+    assert "4 created" in status["results"][0]["result"]
+    assert "1 created" in status["results"][1]["result"]
+    # a single export download for the whole batch
+    assert sum(call.endswith("/export/json") for call in calls) == 1
+
+
+def test_batch_provisioning_validates_every_request():
+    valid = ProvisioningRequest(
+        descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+        descriptor=yaml.safe_dump({"dataproduct": DATA_PRODUCT}),
+    ).model_dump()
+    invalid = ProvisioningRequest(
+        descriptorKind=DescriptorKind.COMPONENT_DESCRIPTOR, descriptor="descriptor"
+    ).model_dump()
+
+    with TestClient(app) as lifespan_client:
+        resp = lifespan_client.post("/v1/provision/batch", json=[valid, invalid, valid])
+
+    assert resp.status_code == 400
+    errors = resp.json()["errors"]
+    assert errors[0].startswith("Request 1: Expecting a DATAPRODUCT_DESCRIPTOR")
+    assert "is duplicated" in errors[1]
+
+
+def test_unprovisioning_runs_in_background():
+    provisioning_request = ProvisioningRequest(
+        descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+        descriptor=yaml.safe_dump({"dataproduct": DATA_PRODUCT}),
+    )
+
+    with _mock_icepanel(), TestClient(app) as lifespan_client:
+        resp = lifespan_client.post(
+            "/v1/unprovision", json=provisioning_request.model_dump()
+        )
+        assert resp.status_code == 202
+        status = _poll_status(lifespan_client, resp.text)
+
+    # the data product is not drawn in the landscape: nothing to delete
+    assert status["status"] == "COMPLETED"
+    assert "0 deleted" in status["result"]
+
+
+def test_async_validation():
+    valid = ValidationRequest(descriptor=yaml.safe_dump({"dataproduct": DATA_PRODUCT}))
+    invalid = ValidationRequest(descriptor=yaml.safe_dump({"dataproduct": {}}))
+
+    with TestClient(app) as lifespan_client:
+        valid_token = lifespan_client.post("/v2/validate", json=valid.model_dump())
+        invalid_token = lifespan_client.post("/v2/validate", json=invalid.model_dump())
+        assert valid_token.status_code == 202
+        valid_status = _poll_status(lifespan_client, valid_token.text, "/v2/validate")
+        invalid_status = _poll_status(
+            lifespan_client, invalid_token.text, "/v2/validate"
+        )
+
+    assert valid_status == {
+        "status": "COMPLETED",
+        "result": {"valid": True, "error": None},
+    }
+    assert invalid_status["status"] == "COMPLETED"
+    assert invalid_status["result"]["valid"] is False
+    assert invalid_status["result"]["error"]["errors"]
+
+
+def test_unknown_validation_token():
+    with TestClient(app) as lifespan_client:
+        resp = lifespan_client.get("/v2/validate/missing/status")
+
+    assert resp.status_code == 400
+    assert "Unknown validation token" in resp.json()["errors"][0]
+
+
+def test_unknown_provisioning_token():
+    with TestClient(app) as lifespan_client:
+        resp = lifespan_client.get("/v1/provision/missing/status")
+
+    assert resp.status_code == 400
+    assert "Unknown provisioning token" in resp.json()["errors"][0]
+
+
+def test_provisioning_status_of_another_kind_of_job():
+    request = ValidationRequest(descriptor=yaml.safe_dump({"dataproduct": {}}))
+
+    with TestClient(app) as lifespan_client:
+        token = lifespan_client.post("/v2/validate", json=request.model_dump()).text
+        resp = lifespan_client.get(f"/v1/provision/{token}/status")
+
+    assert resp.status_code == 400
+    assert "Unknown provisioning token" in resp.json()["errors"][0]
+
+
+def test_invalidate_snapshots():
+    with TestClient(app) as lifespan_client:
+        resp = lifespan_client.delete("/v1/admin/snapshots")
+
+    assert resp.status_code == 200
+    assert resp.json() == {"landscapeId": None, "invalidated": 0}
+
+
+def test_icepanel_stats():
+    with TestClient(app) as lifespan_client:
+        resp = lifespan_client.get("/v1/admin/icepanel/stats")
+
+    assert resp.status_code == 200
+    assert resp.json()["calls"] == 0
+    assert resp.json()["throttled"] == 0
+
+
+def test_metrics():
+    provisioning_request = ProvisioningRequest(
+        descriptorKind=DescriptorKind.DATAPRODUCT_DESCRIPTOR,
+        descriptor=yaml.safe_dump({"dataproduct": DATA_PRODUCT}),
+    )
+
+    with _mock_icepanel(), TestClient(app) as lifespan_client:
+        resp = lifespan_client.post(
+            "/v1/provision", json=provisioning_request.model_dump()
+        )
+        _poll_status(lifespan_client, resp.text)
+        metrics = lifespan_client.get("/metrics")
 
-    assert "Response not yet implemented" in resp.json().get("error")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = metrics.text
+    assert (
+        'http_request_duration_seconds_count{method="POST",route="/v1/provision",'
+        'status="202"}'
+    ) in text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/v1/provision/{token}/status",status="200"}'
+    ) in text
+    assert (
+        'icepanel_request_duration_seconds_count{method="POST",'
+        'operation="objects",status="201"}'
+    ) in text
+    assert 'icepanel_operations_total{kind="object",result="created"}' in text
+    assert "provisioner_jobs_in_flight 0.0" in text
+    assert "icepanel_snapshot_cache_hit_ratio " in text
+    assert "icepanel_calls_total " in text
+    assert "icepanel_throttled_total 0.0" in text
+    assert "icepanel_limiter_wait_seconds_total " in text
 
 
 def test_unprovisioning():
@@ -21,6 +258,8 @@ def test_unprovisioning():
         descriptorKind=DescriptorKind.COMPONENT_DESCRIPTOR, descriptor="descriptor"
     )
 
-    resp = client.post("/v1/unprovision", json=dict(provisioning_request))
+    with TestClient(app) as lifespan_client:
+        resp = lifespan_client.post("/v1/unprovision", json=dict(provisioning_request))
 
-    assert "Response not yet implemented" in resp.json().get("error")
+    assert resp.status_code == 400
+    assert "Expecting a DATAPRODUCT_DESCRIPTOR" in resp.json().get("errors")[0]
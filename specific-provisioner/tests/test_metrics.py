@@ -0,0 +1,41 @@
+import unittest
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from src.utility.metrics import Reading, ReadingsCollector
+
+
+class TestReadingsCollector(unittest.TestCase):
+    def setUp(self):
+        self.registry = CollectorRegistry()
+
+    def test_readings_are_read_at_every_scrape(self):
+        calls = {"count": 0}
+        self.registry.register(
+            ReadingsCollector(
+                [
+                    Reading("calls_total", "Calls", lambda: calls["count"], True),
+                    Reading("depth", "Queue depth", lambda: 4),
+                ]
+            )
+        )
+        calls["count"] = 3
+
+        self.assertEqual(
+            generate_latest(self.registry).decode(),
+            "# HELP calls_total Calls\n"
+            "# TYPE calls_total counter\n"
+            "calls_total 3.0\n"
+            "# HELP depth Queue depth\n"
+            "# TYPE depth gauge\n"
+            "depth 4.0\n",
+        )
+        calls["count"] = 5
+        self.assertIn("calls_total 5.0\n", generate_latest(self.registry).decode())
+
+    def test_unregistered_readings_are_not_exposed(self):
+        collector = ReadingsCollector([Reading("depth", "Queue depth", lambda: 4)])
+        self.registry.register(collector)
+        self.registry.unregister(collector)
+
+        self.assertEqual(generate_latest(self.registry), b"")
@@ -0,0 +1,250 @@
+import unittest
+
+from src.icepanel.executor import PlanExecutor
+from src.icepanel.landscape_index import LandscapeIndex
+from src.icepanel.planner import (
+    Action,
+    plan_data_product,
+    plan_data_product_removal,
+    plan_data_products,
+)
+from src.models.data_product_descriptor import DataProduct
+from src.models.icepanel import IcePanelData, ModelObject
+
+DATA_PRODUCT = {
+    "id": "urn:dmb:dp:finance:sales:0",
+    "name": "Sales",
+    "description": "Sales data product",
+    "kind": "dataproduct",
+    "domain": "finance",
+    "domainId": "urn:dmb:dmn:finance",
+    "version": "0.1.0",
+    "environment": "development",
+    "dataProductOwner": "user:john",
+    "ownerGroup": "owners",
+    "devGroup": "devs",
+    "tags": [],
+    "specific": {},
+    "components": [
+        {
+            "id": "urn:dmb:cmp:finance:sales:0:op",
+            "name": "Sales Output Port",
+            "description": "Output port",
+            "kind": "outputport",
+            "version": "0.1.0",
+            "infrastructureTemplateId": "tpl",
+            "dependsOn": ["urn:dmb:cmp:finance:sales:0:wl"],
+            "outputPortType": "SQL",
+            "dataContract": {"schema": []},
+            "dataSharingAgreement": {},
+            "semanticLinking": [],
+            "specific": {},
+        },
+        {
+            "id": "urn:dmb:cmp:finance:sales:0:wl",
+            "name": "Sales Workload",
+            "description": "Workload",
+            "kind": "workload",
+            "version": "0.1.0",
+            "infrastructureTemplateId": "tpl",
+            "dependsOn": [],
+            "connectionType": "HouseKeeping",
+            "tags": [],
+            "specific": {},
+        },
+    ],
+}
+
+
+def _root() -> ModelObject:
+    return ModelObject(
+        caption="",
+        description="",
+        domainId="d1",
+        external=False,
+        icon=None,
+        id="root",
+        links={},
+        name="Root",
+        parentId=None,
+        parentIds=[],
+        status="live",
+        tagIds=[],
+        teamIds=[],
+        technologies={},
+        type="root",
+    )
+
+
+def _landscape(objects: list[ModelObject], connections: list) -> LandscapeIndex:
+    return LandscapeIndex(
+        IcePanelData(
+            domains={"d1": {"id": "d1", "name": "Default domain"}},
+            flows={},
+            modelConnections={c.id: c for c in connections},
+            modelObjects={o.id: o for o in [_root(), *objects]},
+            tagGroups={},
+            tags={},
+            teams={},
+        )
+    )
+
+
+class RecordingClient:
+    def __init__(self):
+        self.calls: list[tuple] = []
+
+    async def post_component(self, component):
+        self.calls.append(("post", "objects", component.name))
+        return f"id-{component.name}"
+
+    async def post_connection(self, connection):
+        self.calls.append(("post", "connections", connection.originId))
+        return f"conn-{connection.originId}"
+
+    async def patch(self, objectDict, objectType, objId):
+        self.calls.append(("patch", objectType, objId, objectDict))
+        return objId
+
+    async def delete(self, objectType, objId):
+        self.calls.append(("delete", objectType, objId))
+        return objId
+
+
+def _provisioned_landscape(data_product: DataProduct) -> LandscapeIndex:
+    """
+    A landscape holding exactly what the adapter would write for the data product.
+    """
+    plan = plan_data_product(data_product, _landscape([], []))
+    system = plan.system.desired.model_copy(update={"id": "sys"})
+    objects = [system]
+    ids = {plan.system.key: "sys"}
+    for i, op in enumerate(plan.components):
+        ids[op.key] = f"obj{i}"
+        objects.append(
+            op.desired.model_copy(update={"id": f"obj{i}", "parentId": "sys"})
+        )
+    connections = []
+    for i, op in enumerate(plan.connections):
+        connections.append(
+            op.desired.model_copy(
+                update={
+                    "id": f"conn{i}",
+                    "originId": ids[op.origin],
+                    "targetId": ids[op.target],
+                }
+            )
+        )
+    return _landscape(objects, connections)
+
+
+class TestPlanner(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.data_product = DataProduct(**DATA_PRODUCT)
+
+    def test_empty_landscape_creates_everything(self):
+        plan = plan_data_product(self.data_product, _landscape([], []))
+
+        self.assertEqual(plan.system.action, Action.CREATE)
+        self.assertEqual([op.action for op in plan.components], [Action.CREATE] * 2)
+        self.assertEqual(len(plan.connections), 1)
+        self.assertEqual(plan.connections[0].action, Action.CREATE)
+        self.assertEqual(plan.connections[0].origin, "urn:dmb:cmp:finance:sales:0:op")
+
+    def test_unchanged_data_product_is_a_noop(self):
+        landscape = _provisioned_landscape(self.data_product)
+        plan = plan_data_product(self.data_product, landscape)
+
+        self.assertFalse(plan.has_changes)
+        self.assertEqual(plan.count(Action.NOOP), 4)
+
+    def test_only_changed_fields_are_updated(self):
+        landscape = _provisioned_landscape(self.data_product)
+        changed = DataProduct(**{**DATA_PRODUCT, "description": "New description"})
+        plan = plan_data_product(changed, landscape)
+
+        self.assertEqual(plan.system.action, Action.UPDATE)
+        self.assertEqual(plan.system.changes, {"description": "New description"})
+        self.assertEqual(plan.count(Action.UPDATE), 1)
+
+    def test_missing_domain_is_reported(self):
+        landscape = _landscape([], [])
+        with self.assertRaises(ValueError):
+            plan_data_product(self.data_product, landscape, domain_name="Other")
+
+    async def test_executor_skips_noops(self):
+        client = RecordingClient()
+        landscape = _provisioned_landscape(self.data_product)
+        changed = DataProduct(**{**DATA_PRODUCT, "description": "New description"})
+
+        result = await PlanExecutor(client).execute(  # type: ignore[arg-type]
+            plan_data_product(changed, landscape)
+        )
+
+        self.assertEqual(
+            client.calls,
+            [("patch", "objects", "sys", {"description": "New description"})],
+        )
+        self.assertEqual((result.created, result.updated, result.skipped), (0, 1, 3))
+
+    async def test_executor_resolves_created_ids(self):
+        client = RecordingClient()
+
+        result = await PlanExecutor(client).execute(  # type: ignore[arg-type]
+            plan_data_product(self.data_product, _landscape([], []))
+        )
+
+        self.assertEqual(result.object_ids[self.data_product.id], "id-Sales")
+        self.assertEqual(
+            client.calls[-1], ("post", "connections", "id-Sales Output Port")
+        )
+        self.assertEqual(result.created, 4)
+
+    def test_removal_plan(self):
+        landscape = _provisioned_landscape(self.data_product)
+        plan = plan_data_product_removal(self.data_product, landscape)
+
+        self.assertEqual(plan.system_id, "sys")
+        self.assertEqual(sorted(plan.component_ids), ["obj0", "obj1"])
+        self.assertEqual(plan.connection_ids, ["conn0"])
+
+    def test_removal_of_missing_data_product_is_empty(self):
+        plan = plan_data_product_removal(self.data_product, _landscape([], []))
+
+        self.assertFalse(plan.has_changes)
+        self.assertEqual(plan.component_ids, [])
+
+    async def test_executor_deletes_in_dependency_order(self):
+        client = RecordingClient()
+        progress = []
+
+        async def on_progress(target, action, error):
+            progress.append((target, action, error))
+
+        landscape = _provisioned_landscape(self.data_product)
+        result = await PlanExecutor(  # type: ignore[arg-type]
+            client, on_progress=on_progress
+        ).execute_removal(plan_data_product_removal(self.data_product, landscape))
+
+        self.assertEqual(client.calls[0], ("delete", "connections", "conn0"))
+        self.assertEqual(client.calls[-1], ("delete", "objects", "sys"))
+        self.assertEqual(result.deleted, 4)
+        self.assertEqual(len(progress), 4)
+        self.assertEqual(progress[-1], ("objects/sys", Action.DELETE, None))
+
+    def test_batch_plan_rejects_conflicting_systems(self):
+        other = DataProduct(**{**DATA_PRODUCT, "id": "urn:dmb:dp:finance:sales:1"})
+        renamed = DataProduct(
+            **{**DATA_PRODUCT, "id": "urn:dmb:dp:finance:sales:2", "name": "Orders"}
+        )
+
+        batch = plan_data_products(
+            [self.data_product, other, renamed], _landscape([], [])
+        )
+
+        self.assertEqual(
+            [plan.data_product_id for plan in batch.plans],
+            [self.data_product.id, renamed.id],
+        )
+        self.assertIn("also drawn as system 'Sales'", batch.errors[other.id])
+        self.assertTrue(batch.has_changes)
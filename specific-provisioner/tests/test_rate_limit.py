@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from src.icepanel.rate_limit import (
+    RetryPolicy,
+    TokenBucket,
+    parse_retry_after,
+    shared_bucket,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+        self.assertEqual([bucket.reserve() for _ in range(2)], [0.0, 0.0])
+        # waiting callers queue up, half a second apart
+        self.assertEqual(bucket.reserve(), 0.5)
+        self.assertEqual(bucket.reserve(), 1.0)
+
+        clock.now = 10.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_pause_holds_every_caller(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=0, burst=1, clock=clock)
+        bucket.pause(3)
+        self.assertEqual(bucket.reserve(), 3.0)
+        clock.now = 2.0
+        self.assertEqual(bucket.reserve(), 1.0)
+        clock.now = 4.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_shared_per_api_key(self):
+        self.assertIs(shared_bucket("k1", 1, 1), shared_bucket("k1", 1, 1))
+        self.assertIsNot(shared_bucket("k1", 1, 1), shared_bucket("k2", 1, 1))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff_is_bounded_and_jittered(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=1, max_delay=4)
+        for attempt in range(1, 10):
+            delay = policy.backoff(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4, 2 ** (attempt - 1)))
+        self.assertIsNone(policy.backoff(10))
+
+    def test_retry_after_is_a_lower_bound(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=5)
+        self.assertEqual(policy.backoff(1, retry_after=2), 2)
+        self.assertIsNone(policy.backoff(1, retry_after=6))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        later = datetime.now(timezone.utc) + timedelta(seconds=30)
+        self.assertAlmostEqual(
+            parse_retry_after(format_datetime(later, usegmt=True)), 30, delta=2
+        )
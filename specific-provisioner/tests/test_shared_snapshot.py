@@ -0,0 +1,254 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from src.icepanel.landscape_index import LandscapeGoneError, LandscapeIndex
+from src.icepanel.planner import Action, plan_data_product
+from src.icepanel.shared_snapshot import (
+    SharedLandscapeSnapshotCache,
+    SharedSnapshotStore,
+    StoredLandscapeIndex,
+)
+from src.models.data_product_descriptor import DataProduct
+from src.models.icepanel import IcePanelData, buildConnection
+from tests.test_landscape_index import _object
+from tests.test_planner import DATA_PRODUCT, _provisioned_landscape
+from tests.test_snapshot_cache import FakeClient, _export
+
+
+def _data() -> IcePanelData:
+    connection = buildConnection("dependsOn", "c1", "c2")
+    connection.id = "conn1"
+    loop = buildConnection("dependsOn", "c2", "c2")
+    loop.id = "conn2"
+    objects = [
+        _object("root", "Root", None, type="root"),
+        _object("dp1", "Data Product", "root", type="system"),
+        _object("c1", "Component", "dp1"),
+        _object("c2", "Other", "dp1"),
+        _object("c3", "Component", "dp2"),
+        _object("c4", "Component", "dp1"),
+    ]
+    return IcePanelData(
+        domains={"d1": {"id": "d1", "name": "Default domain"}},
+        flows={},
+        modelConnections={"conn1": connection, "conn2": loop},
+        modelObjects={obj.id: obj for obj in objects},
+        tagGroups={},
+        tags={},
+        teams={},
+    )
+
+
+class TestSharedSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.store = SharedSnapshotStore(":memory:")
+        self.store.open()
+        self.addCleanup(self.store.close)
+
+    def _publish(self, data: IcePanelData, epoch: int = 0):
+        return self.store.publish("land1", data, "hash", '"v1"', None, epoch)
+
+    def test_stored_index_answers_like_the_in_memory_one(self):
+        data = _data()
+        stored = StoredLandscapeIndex(self.store, self._publish(data))
+        index = LandscapeIndex(data)
+
+        self.assertEqual(stored.root, index.root)
+        for parent_id, name in [
+            ("dp1", "Component"),
+            ("dp2", "Component"),
+            ("root", "Component"),
+            (None, "Root"),
+        ]:
+            self.assertEqual(
+                stored.get_object(parent_id, name), index.get_object(parent_id, name)
+            )
+        self.assertEqual(stored.get_children("dp1"), index.get_children("dp1"))
+        for object_id in ["c1", "c2", "c3"]:
+            self.assertEqual(
+                stored.get_connections_of(object_id),
+                index.get_connections_of(object_id),
+            )
+        self.assertEqual(
+            stored.get_connection("c1", "c2", "dependsOn"),
+            index.get_connection("c1", "c2", "dependsOn"),
+        )
+        self.assertIsNone(stored.get_connection("c2", "c1", "dependsOn"))
+        self.assertEqual(stored.get_domain("Default domain").id, "d1")
+        self.assertIsNone(stored.get_domain("Missing"))
+
+    def test_planner_runs_on_a_stored_index(self):
+        data_product = DataProduct(**DATA_PRODUCT)
+        data = _provisioned_landscape(data_product).data
+        stored = StoredLandscapeIndex(self.store, self._publish(data))
+
+        plan = plan_data_product(data_product, stored)
+
+        self.assertFalse(plan.has_changes)
+        self.assertEqual(plan.count(Action.NOOP), 4)
+
+    def test_readers_keep_their_generation(self):
+        first = self._publish(_data())
+        reader = StoredLandscapeIndex(self.store, first)
+        self._publish(_data())
+        self.assertEqual(reader.get_object("dp1", "Other").id, "c2")
+
+        head = self._publish(_data())
+        self.assertEqual(head.generation, 3)
+        # only the current and the previous generations are kept
+        self.assertIsNone(reader.get_object("dp1", "Other"))
+        loaded = self.store.load_data(head)
+        self.assertEqual(loaded.modelObjects.keys(), _data().modelObjects.keys())
+
+    def test_reading_keeps_the_generation_of_an_open_index(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = SharedSnapshotStore(os.path.join(directory.name, "snapshots.sqlite3"))
+        store.open()
+        self.addCleanup(store.close)
+        self.store = store
+        reader = StoredLandscapeIndex(store, self._publish(_data()))
+
+        with reader.reading():
+            self.assertEqual(reader.get_object("dp1", "Other").id, "c2")
+            self._publish(_data())
+            self._publish(_data())
+            # the whole plan reads the generation it started with
+            self.assertEqual(reader.get_object("dp1", "Other").id, "c2")
+            self.assertEqual(len(reader.get_children("dp1")), 3)
+
+        self.assertIsNone(reader.get_object("dp1", "Other"))
+
+    def test_reading_a_dropped_generation_is_gone(self):
+        reader = StoredLandscapeIndex(self.store, self._publish(_data()))
+        with reader.reading():
+            self.assertEqual(reader.get_object("dp1", "Other").id, "c2")
+
+        self._publish(_data())
+        self._publish(_data())
+
+        with self.assertRaises(LandscapeGoneError):
+            with reader.reading():
+                pass
+
+    def test_publish_after_an_expiration_is_stale(self):
+        epoch = self.store.epoch("land1")
+        self.store.expire("land1")
+
+        head = self._publish(_data(), epoch=epoch)
+
+        self.assertEqual(head.refreshed_at, 0)
+        self.assertGreater(self._publish(_data(), epoch=epoch + 1).refreshed_at, 0)
+
+    def test_lease_is_exclusive_until_released_or_expired(self):
+        self.assertTrue(self.store.try_lease("land1", "a", 30))
+        self.assertFalse(self.store.try_lease("land1", "b", 30))
+        self.assertTrue(self.store.try_lease("land1", "a", 30))
+        self.assertTrue(self.store.try_lease("land2", "b", 30))
+
+        self.store.release_lease("land1", "a")
+        self.assertTrue(self.store.try_lease("land1", "b", -1))
+        # expired right away
+        self.assertTrue(self.store.try_lease("land1", "a", 30))
+
+    def test_write_leases_are_granted_all_or_none(self):
+        self.assertTrue(self.store.try_write_leases(["a", "b"], "p1", 30))
+        self.assertFalse(self.store.try_write_leases(["c", "b"], "p2", 30))
+        # nothing was leased by the refused attempt
+        self.assertTrue(self.store.try_write_leases(["c"], "p3", 30))
+        self.assertTrue(self.store.try_write_leases(["a", "b"], "p1", 30))
+
+        self.store.release_write_leases(["a", "b"], "p1")
+        self.assertTrue(self.store.try_write_leases(["b"], "p2", -1))
+        # expired
+        self.assertTrue(self.store.try_write_leases(["b"], "p1", 30))
+
+
+class TestSharedLandscapeSnapshotCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "snapshots.sqlite3")
+        self.client = FakeClient()
+        # one store and cache per simulated worker process
+        self.caches = []
+        for _ in range(2):
+            store = SharedSnapshotStore(path)
+            store.open()
+            self.addCleanup(store.close)
+            self.caches.append(
+                SharedLandscapeSnapshotCache(
+                    self.client,  # type: ignore[arg-type]
+                    store,
+                    ttl=60,
+                    poll_interval=0.01,
+                )
+            )
+
+    async def test_workers_share_a_single_download(self):
+        self.client.gate = asyncio.Event()
+        reads = [
+            asyncio.ensure_future(cache.get_snapshot())
+            for cache in self.caches
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        self.client.gate.set()
+        snapshots = await asyncio.gather(*reads)
+
+        self.assertEqual(len(self.client.calls), 1)
+        self.assertEqual(len({s.content_hash for s in snapshots}), 1)
+        index = snapshots[0].index
+        self.assertEqual(index.get_domain("Default domain").id, "d1")
+        self.assertEqual(sum(c.stats.parses for c in self.caches), 1)
+
+    async def test_expiration_applies_to_every_worker(self):
+        first, second = self.caches
+        await first.get_snapshot()
+        await second.get_snapshot()
+        self.assertEqual(len(self.client.calls), 1)
+
+        self.client.body = _export("Renamed domain")
+        self.client.etag = '"v2"'
+        await first.expire()
+        snapshot = await second.get_snapshot()
+
+        self.assertEqual(len(self.client.calls), 2)
+        self.assertEqual(self.client.calls[1]["etag"], '"v1"')
+        self.assertEqual(snapshot.index.get_domain("Renamed domain").id, "d1")
+        self.assertEqual((await first.get()).domains["d1"].name, "Renamed domain")
+        self.assertEqual(len(self.client.calls), 2)
+
+    async def test_not_modified_export_is_revalidated(self):
+        first, second = self.caches
+        await first.get_snapshot()
+        await second.expire()
+
+        snapshot = await first.get_snapshot()
+
+        self.assertEqual(first.stats.revalidations, 1)
+        self.assertGreater(snapshot.fetched_at, 0)
+
+    async def test_reads_do_not_wait_for_the_writer(self):
+        first, _ = self.caches
+        snapshot = await first.get_snapshot()
+
+        # held while a publication writes its rows
+        with first._store._lock:
+            found = await asyncio.wait_for(
+                asyncio.to_thread(snapshot.index.get_domain, "Default domain"),
+                timeout=1,
+            )
+
+        self.assertEqual(found.id, "d1")
+
+    async def test_invalidate_drops_the_shared_snapshot(self):
+        first, second = self.caches
+        await first.get_snapshot()
+
+        self.assertEqual(await second.invalidate(), 1)
+        self.assertIsNone(first.peek())
+        await first.get_snapshot()
+        self.assertEqual(self.client.calls[1]["etag"], None)
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import json
+import unittest
+
+from src.icepanel.client import ExportResponse
+from src.icepanel.export_reader import ExportReader
+from src.icepanel.snapshot_cache import LandscapeSnapshotCache
+
+
+def _export(domain_name: str) -> bytes:
+    return json.dumps(
+        {
+            "domains": {"d1": {"id": "d1", "name": domain_name}},
+            "flows": {},
+            "modelConnections": {},
+            "modelObjects": {},
+            "tagGroups": {},
+            "tags": {},
+            "teams": {},
+        }
+    ).encode()
+
+
+class FakeClient:
+    landscape_id = "land1"
+
+    def __init__(self):
+        self.body = _export("Default domain")
+        self.etag: str | None = '"v1"'
+        self.calls: list[dict] = []
+        # when set, downloads wait for it
+        self.gate: asyncio.Event | None = None
+        self.error: Exception | None = None
+
+    async def stream_export(
+        self, landscape_id=None, etag=None, last_modified=None, content_hash=None
+    ):
+        self.calls.append({"landscape_id": landscape_id, "etag": etag})
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        if etag is not None and etag == self.etag:
+            return ExportResponse(etag=etag, not_modified=True)
+        if content_hash == hashlib.sha256(self.body).hexdigest():
+            # hashed, not parsed
+            return ExportResponse(
+                etag=self.etag, not_modified=True, content_hash=content_hash
+            )
+        reader = ExportReader()
+        reader.feed(self.body)
+        return ExportResponse(
+            etag=self.etag, data=reader.close(), content_hash=reader.content_hash
+        )
+
+
+class TestLandscapeSnapshotCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.client = FakeClient()
+        self.cache = LandscapeSnapshotCache(
+            self.client, ttl=10, clock=lambda: self.now  # type: ignore[arg-type]
+        )
+
+    async def test_fresh_snapshot_is_served_without_io(self):
+        first = await self.cache.get()
+        self.now = 5
+        second = await self.cache.get()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.client.calls), 1)
+        self.assertEqual(self.cache.stats.hits, 1)
+
+    async def test_stale_snapshot_is_revalidated_with_etag(self):
+        first = await self.cache.get()
+        self.now = 11
+        second = await self.cache.get()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.client.calls[1]["etag"], '"v1"')
+        self.assertEqual(self.cache.stats.revalidations, 1)
+        self.assertEqual(self.cache.stats.parses, 1)
+
+    async def test_unchanged_body_without_validators_is_not_parsed_again(self):
+        self.client.etag = None
+        first = await self.cache.get()
+        await self.cache.expire()
+        second = await self.cache.get()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.cache.stats.parses, 1)
+
+    async def test_changed_body_is_parsed_again(self):
+        await self.cache.get()
+        self.client.body = _export("Renamed domain")
+        self.client.etag = '"v2"'
+        await self.cache.expire()
+        data = await self.cache.get()
+
+        self.assertEqual(data.domains["d1"].name, "Renamed domain")
+        self.assertEqual(self.cache.stats.parses, 2)
+
+    async def test_invalidate(self):
+        await self.cache.get()
+        await self.cache.get("land2")
+
+        self.assertEqual(await self.cache.invalidate("land2"), 1)
+        self.assertEqual(await self.cache.invalidate("land2"), 0)
+        self.assertIsNotNone(self.cache.peek())
+        self.assertEqual(await self.cache.invalidate(), 1)
+        self.assertIsNone(self.cache.peek())
+
+    async def test_concurrent_reads_share_one_download(self):
+        self.client.gate = asyncio.Event()
+        reads = [asyncio.create_task(self.cache.get()) for _ in range(5)]
+        other = asyncio.create_task(self.cache.get("land2"))
+        await asyncio.sleep(0)
+        self.client.gate.set()
+        results = await asyncio.gather(*reads, other)
+
+        self.assertEqual(len(self.client.calls), 2)
+        self.assertTrue(all(data is results[0] for data in results[:5]))
+        self.assertEqual(self.cache.stats.coalesced, 4)
+        self.assertEqual(self.cache.stats.parses, 2)
+
+    async def test_download_error_reaches_every_waiter(self):
+        self.client.gate = asyncio.Event()
+        self.client.error = ValueError("broken export")
+        reads = [asyncio.create_task(self.cache.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.client.gate.set()
+        results = await asyncio.gather(*reads, return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(len(self.client.calls), 1)
+
+        # the failed download is not reused
+        self.client.error = None
+        await self.cache.get()
+        self.assertEqual(len(self.client.calls), 2)
+
+    async def test_cancelled_read_does_not_cancel_the_download(self):
+        self.client.gate = asyncio.Event()
+        first = asyncio.create_task(self.cache.get())
+        second = asyncio.create_task(self.cache.get())
+        await asyncio.sleep(0)
+        first.cancel()
+        self.client.gate.set()
+
+        data = await second
+        self.assertEqual(data.domains["d1"].name, "Default domain")
+        self.assertIsNotNone(self.cache.peek())
+
+    async def test_reads_after_expire_do_not_join_older_download(self):
+        self.client.gate = asyncio.Event()
+        before = asyncio.create_task(self.cache.get())
+        await asyncio.sleep(0)
+        await self.cache.expire()
+        after = asyncio.create_task(self.cache.get())
+        await asyncio.sleep(0)
+        self.client.gate.set()
+        await asyncio.gather(before, after)
+
+        self.assertEqual(len(self.client.calls), 2)
+        self.assertEqual(self.cache.stats.coalesced, 0)
@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+
+import httpx
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from src.icepanel.client import IcePanelClient
+from src.icepanel.snapshot_cache import LandscapeSnapshotCache
+from src.models.data_product_descriptor import DataProduct
+from src.provisioning.job_store import JobStore
+from src.provisioning.jobs import JobManager
+from src.provisioning.service import provision_data_product
+from tests.test_main import _icepanel_handler
+from tests.test_planner import DATA_PRODUCT
+
+exporter = InMemorySpanExporter()
+
+
+def setUpModule():
+    # the global provider can only be set once per process
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        exporter.clear()
+        self.traceparents: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.traceparents.append(request.headers.get("traceparent", ""))
+            return _icepanel_handler(request)
+
+        self.client = IcePanelClient(
+            landscape_id="land1",
+            api_key="key",
+            transport=httpx.MockTransport(handler),
+        )
+        await self.client.open()
+        self.addAsyncCleanup(self.client.close)
+
+    async def test_provisioning_spans(self):
+        data_product = DataProduct(**DATA_PRODUCT)
+        await provision_data_product(
+            data_product,
+            self.client,
+            LandscapeSnapshotCache(self.client, ttl=60),
+            concurrency=4,
+        )
+
+        spans = {span.context.span_id: span for span in exporter.get_finished_spans()}
+        names = [span.name for span in spans.values()]
+        self.assertEqual(names.count("icepanel.post"), 4)
+        for name in ["icepanel.fetch_export", "icepanel.plan", "icepanel.execute"]:
+            self.assertIn(name, names)
+
+        root = next(s for s in spans.values() if s.name == "provision_data_product")
+        self.assertIsNone(root.parent)
+        self.assertEqual(root.attributes["icepanel.landscape_id"], "land1")
+        self.assertEqual(root.attributes["dataproduct.ids"], (data_product.id,))
+        self.assertEqual(
+            root.attributes["dataproduct.components"], len(data_product.components)
+        )
+        export = next(s for s in spans.values() if s.name == "icepanel.fetch_export")
+        self.assertGreater(export.attributes["icepanel.export.bytes"], 0)
+        plan = next(s for s in spans.values() if s.name == "icepanel.plan")
+        self.assertEqual(plan.attributes["icepanel.plan.writes"], 4)
+
+        # every call to IcePanel carries the context of its own span
+        self.assertEqual(len(self.traceparents), 5)
+        for traceparent in self.traceparents:
+            _, trace_id, span_id, _ = traceparent.split("-")
+            span = spans[int(span_id, 16)]
+            self.assertEqual(int(trace_id, 16), root.context.trace_id)
+            self.assertIn(span.name, ["icepanel.fetch_export", "icepanel.post"])
+            status = 200 if span.name == "icepanel.fetch_export" else 201
+            self.assertEqual(span.attributes["http.status_code"], status)
+
+    async def test_jobs_continue_the_submitting_trace(self):
+        async def handler(job, progress):
+            return "done"
+
+        manager = JobManager(
+            JobStore(":memory:"),
+            {"done": handler},
+            workers=1,
+            queue_size=1,
+            retention=60,
+        )
+        await manager.start()
+        self.addAsyncCleanup(manager.stop)
+        tracer = trace.get_tracer(__name__)
+        with tracer.start_as_current_span("request") as request:
+            job = await manager.submit("done", "{}", data_product_id="dp1")
+        for _ in range(100):
+            if manager.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+
+        span = next(s for s in exporter.get_finished_spans() if s.name == "job done")
+        self.assertEqual(span.parent.span_id, request.get_span_context().span_id)
+        self.assertEqual(span.attributes["job.token"], job.token)
+        self.assertEqual(span.attributes["dataproduct.id"], "dp1")
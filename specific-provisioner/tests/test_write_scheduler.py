@@ -0,0 +1,194 @@
+import asyncio
+import itertools
+import os
+import tempfile
+import unittest
+
+from src.icepanel.client import ExportResponse
+from src.icepanel.shared_snapshot import SharedSnapshotStore
+from src.icepanel.snapshot_cache import LandscapeSnapshotCache
+from src.models.data_product_descriptor import DataProduct
+from src.models.icepanel import IcePanelData
+from src.provisioning.service import provision_data_product
+from src.provisioning.write_scheduler import WriteScheduler, subtree_keys
+from tests.test_planner import DATA_PRODUCT, _root
+
+
+class LandscapeClient:
+    """
+    In-memory IcePanel landscape: exports reflect the writes applied so far,
+    and every write takes a little time so that concurrent callers interleave.
+    """
+
+    landscape_id = "land1"
+
+    def __init__(self):
+        self.objects = {"root": _root()}
+        self.connections = {}
+        self._ids = itertools.count()
+        self._version = 0
+
+    async def stream_export(
+        self, landscape_id=None, etag=None, last_modified=None, content_hash=None
+    ):
+        await asyncio.sleep(0.001)
+        data = IcePanelData(
+            domains={"d1": {"id": "d1", "name": "Default domain"}},
+            flows={},
+            modelConnections=dict(self.connections),
+            modelObjects=dict(self.objects),
+            tagGroups={},
+            tags={},
+            teams={},
+        )
+        return ExportResponse(data=data, content_hash=str(self._version))
+
+    async def _write(self, collection, model):
+        await asyncio.sleep(0.005)
+        new_id = f"id{next(self._ids)}"
+        collection[new_id] = model.model_copy(update={"id": new_id})
+        self._version += 1
+        return new_id
+
+    async def post_component(self, component):
+        return await self._write(self.objects, component)
+
+    async def post_connection(self, connection):
+        return await self._write(self.connections, connection)
+
+    async def patch(self, objectDict, objectType, objId):
+        return objId
+
+
+def _data_product(name: str) -> DataProduct:
+    return DataProduct(**{**DATA_PRODUCT, "id": f"urn:dmb:dp:{name}", "name": name})
+
+
+class TestWriteScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_same_keys_are_serialized(self):
+        scheduler = WriteScheduler()
+        order = []
+
+        async def run(name):
+            async with scheduler.hold(["a"]):
+                order.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} out")
+
+        await asyncio.gather(run("first"), run("second"))
+
+        self.assertEqual(order, ["first in", "first out", "second in", "second out"])
+        self.assertEqual(scheduler.contended, 1)
+        self.assertEqual(scheduler.held, 0)
+
+    async def test_unrelated_keys_run_in_parallel(self):
+        scheduler = WriteScheduler()
+        inside = asyncio.Event()
+
+        async def first():
+            async with scheduler.hold(["a"]):
+                await inside.wait()
+
+        async def second():
+            async with scheduler.hold(["b"]):
+                inside.set()
+
+        await asyncio.wait_for(asyncio.gather(first(), second()), timeout=1)
+        self.assertEqual(scheduler.contended, 0)
+
+    async def test_overlapping_key_sets_do_not_deadlock(self):
+        scheduler = WriteScheduler()
+
+        async def run(keys):
+            async with scheduler.hold(keys):
+                await asyncio.sleep(0.001)
+
+        await asyncio.wait_for(
+            asyncio.gather(*(run(["a", "b"]) for _ in range(5)), run(["b", "a"])),
+            timeout=1,
+        )
+
+    async def test_processes_sharing_a_store_are_serialized(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "snapshots.sqlite3")
+        # one store and scheduler per simulated worker process
+        schedulers = []
+        for _ in range(2):
+            store = SharedSnapshotStore(path)
+            store.open()
+            self.addCleanup(store.close)
+            schedulers.append(WriteScheduler(leases=store, poll_interval=0.01))
+        order = []
+
+        async def run(scheduler, name):
+            async with scheduler.hold(["a", "b"]):
+                order.append(f"{name} in")
+                await asyncio.sleep(0.05)
+                order.append(f"{name} out")
+
+        await asyncio.wait_for(
+            asyncio.gather(run(schedulers[0], "first"), run(schedulers[1], "second")),
+            timeout=5,
+        )
+
+        self.assertIn(
+            order,
+            [
+                ["first in", "first out", "second in", "second out"],
+                ["second in", "second out", "first in", "first out"],
+            ],
+        )
+        self.assertEqual(sum(s.contended for s in schedulers), 1)
+
+    async def test_write_leases_are_renewed_while_held(self):
+        store = SharedSnapshotStore(":memory:")
+        store.open()
+        self.addCleanup(store.close)
+        scheduler = WriteScheduler(leases=store, lease=0.06)
+
+        async with scheduler.hold(["a"]):
+            await asyncio.sleep(0.15)
+            self.assertFalse(store.try_write_leases(["a"], "other", 30))
+        self.assertTrue(store.try_write_leases(["a"], "other", 30))
+
+    async def test_concurrent_provisionings_do_not_duplicate_objects(self):
+        client = LandscapeClient()
+        cache = LandscapeSnapshotCache(client, ttl=60)  # type: ignore[arg-type]
+        scheduler = WriteScheduler()
+        data_product = _data_product("Sales")
+
+        await asyncio.gather(
+            *(
+                provision_data_product(
+                    data_product, client, cache, 4, scheduler=scheduler  # type: ignore[arg-type]  # noqa: E501
+                )
+                for _ in range(3)
+            )
+        )
+
+        names = [obj.name for obj in client.objects.values()]
+        self.assertEqual(names.count("Sales"), 1)
+        self.assertEqual(len(client.objects), 4)
+        self.assertEqual(len(client.connections), 1)
+
+    async def test_unrelated_data_products_are_provisioned_together(self):
+        client = LandscapeClient()
+        cache = LandscapeSnapshotCache(client, ttl=60)  # type: ignore[arg-type]
+        scheduler = WriteScheduler()
+
+        await asyncio.gather(
+            *(
+                provision_data_product(
+                    _data_product(name), client, cache, 4, scheduler=scheduler  # type: ignore[arg-type]  # noqa: E501
+                )
+                for name in ("Sales", "Orders", "Invoices")
+            )
+        )
+
+        self.assertEqual(scheduler.contended, 0)
+        self.assertEqual(len(client.objects), 1 + 3 * 3)
+
+    def test_subtree_keys(self):
+        keys = subtree_keys("land1", _data_product("Sales"))
+        self.assertEqual(keys, ["land1/dp/urn:dmb:dp:Sales", "land1/system/Sales"])